@@ -8,9 +8,11 @@ import os
 from streamlit_autorefresh import st_autorefresh
 from streamlit_lottie import st_lottie
 import requests
-import sys
-import subprocess
 import time
+from storage import posts_exist
+from downsample import downsample_lines
+from dashboard_data import pin_version, load_rollup, keyword_counts, load_rising_posts
+from pipeline import DEFAULT_STAGES, read_status, request_run
 
 # Load environment variables
 load_dotenv()
@@ -30,6 +32,8 @@ def load_lottieurl(url):
 
 # Page settings
 st.set_page_config(page_title="TrendVision", layout="wide", initial_sidebar_state="expanded")
+# Read one store snapshot for this whole rerun
+pin_version()
 
 # Auto-refresh every 60 seconds
 st_autorefresh(interval=60000, key="main_refresh")
@@ -58,7 +62,7 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # Functional Top Navigation Bar
-nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1])
+nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1, 1])
 with nav_cols[0]: 
     if st.button("🏠 Home", use_container_width=True): st.switch_page("UI.py")
 with nav_cols[1]: 
@@ -72,6 +76,8 @@ with nav_cols[4]:
 with nav_cols[5]: 
     if st.button("⚔️ Compare", use_container_width=True): st.switch_page("pages/6_subreddit_comparison.py")
 with nav_cols[6]: 
+    if st.button("🌱 Topics", use_container_width=True): st.switch_page("pages/7_emerging_topics.py")
+with nav_cols[7]: 
     if st.button("⚙️ Settings", use_container_width=True): st.switch_page("pages/4_settings.py")
 
 # Hero Section
@@ -86,46 +92,29 @@ with col_hero_2:
         st_lottie(lottie_ai, height=180)
 
 # Load data safely
-if os.path.exists("data/reddit_posts.csv"):
-    df = pd.read_csv("data/reddit_posts.csv")
-    if 'sentiment' not in df.columns:
-        df['sentiment'] = 0
-    else:
-        df['sentiment'] = pd.to_numeric(df['sentiment'], errors='coerce').fillna(0)
-    if 'date' not in df.columns and 'created_utc' in df.columns:
-        df['date'] = pd.to_datetime(df['created_utc'], unit='s').dt.date
-else:
+# Pre-aggregated (date, subreddit, keyword) rollup: small no matter how many posts are stored
+daily = load_rollup()
+if daily is None:
     st.info("👋 Welcome! Let's initialize your data pipeline to get started.")
     
-    if st.button("🚀 Initialize System & Fetch Data", type="primary"):
-        with st.spinner("Running pipeline... (This may take a minute)"):
-            # 1. Fetch Data
-            result = subprocess.run([sys.executable, "app.py"], capture_output=True, text=True)
-            
-            if not os.path.exists("data/reddit_posts.csv"):
-                st.error("❌ Data fetch failed. Please check your .env file for valid Reddit credentials.")
-                st.markdown("### Error Log:")
-                stdout = result.stdout if result.stdout else ""
-                stderr = result.stderr if result.stderr else ""
-                st.code(stdout + "\n" + stderr)
-                st.stop()
-
-            # 2. NLP & Forecast
-            try:
-                subprocess.run([sys.executable, os.path.join("nlp", "keywords.py")], check=True)
-                subprocess.run([sys.executable, os.path.join("nlp", "sentiment.py")], check=True)
-                subprocess.run([sys.executable, os.path.join("forecast", "forecast.py")], check=True)
-            except subprocess.CalledProcessError as e:
-                st.error(f"Pipeline step failed: {e}")
-        st.success("Pipeline finished! Reloading...")
-        time.sleep(2)
+    # The first run goes through the scheduler like every other run; this page only queues it
+    status = read_status()
+    heartbeat = status.get("scheduler", {}).get("heartbeat", {}).get("at")
+    if status.get("requests"):
+        st.info("⏳ Initial pipeline run queued. This page refreshes once data is available.")
+        st_autorefresh(interval=10000, key="init_refresh")
+    elif st.button("🚀 Initialize System & Fetch Data", type="primary"):
+        request_run(DEFAULT_STAGES)
         st.rerun()
+    if not heartbeat or time.time() - heartbeat > 2 * 60:
+        st.warning("The scheduler is not running, so queued runs will not start. Run `python scheduler.py` "
+                   "alongside the dashboard (with Reddit credentials in `.env`).")
 
     st.stop()
 
 # AI-Powered Smart UI Logic
-avg_sent = df['sentiment'].mean()
-total_vol = len(df)
+total_vol = int(daily['posts'].sum())
+avg_sent = daily['sentiment_sum'].sum() / total_vol if total_vol else 0.0
 
 def get_ai_briefing(sentiment, volume):
     if volume < 10: return "System warming up. Fetch more data for deep insights."
@@ -133,9 +122,10 @@ def get_ai_briefing(sentiment, volume):
     if sentiment < -0.2: return "⚠️ Caution: Negative sentiment spike detected. Potential controversy brewing."
     return "⚖️ Stable trends. Consistent engagement across monitored subreddits."
 
-def get_smart_recommendation(df):
-    top_sub = df['subreddit'].mode().iat[0] if 'subreddit' in df.columns else "N/A"
-    if df['sentiment'].mean() < 0:
+def get_smart_recommendation(daily):
+    sub_counts = daily.groupby('subreddit')['posts'].sum()
+    top_sub = sub_counts.idxmax() if not sub_counts.empty else "N/A"
+    if daily['sentiment_sum'].sum() < 0:
         return f"🔍 **Deep Dive Needed**: Sentiment in r/{top_sub} is dropping. Check 'Keyword Analysis'."
     return f"🚀 **Growth Opportunity**: r/{top_sub} is showing high engagement. Check 'AI Forecast'."
 
@@ -148,7 +138,7 @@ st.markdown(f"""
         </div>
         <div class="glass-card" style="flex: 1; padding: 15px; border-color: var(--secondary);">
             <h5 style="margin:0; color:var(--secondary);">💡 Next Best Action</h5>
-            <p style="margin:5px 0 0 0; font-size:0.9rem;">{get_smart_recommendation(df)}</p>
+            <p style="margin:5px 0 0 0; font-size:0.9rem;">{get_smart_recommendation(daily)}</p>
         </div>
     </div>
 """, unsafe_allow_html=True)
@@ -157,12 +147,13 @@ st.write("")
 
 st.write("")
 c1, c2, c3, c4 = st.columns(4)
-with c1: st.markdown('<div class="glass-card">', unsafe_allow_html=True); st.metric("Total Posts", int(df.shape[0])); st.markdown('</div>', unsafe_allow_html=True)
+with c1: st.markdown('<div class="glass-card">', unsafe_allow_html=True); st.metric("Total Posts", total_vol); st.markdown('</div>', unsafe_allow_html=True)
 with c2: st.markdown('<div class="glass-card">', unsafe_allow_html=True); st.metric("Avg Sentiment", round(avg_sent, 3)); st.markdown('</div>', unsafe_allow_html=True)
 with c3: 
-    top_kw = df['keyword'].mode().iat[0] if 'keyword' in df.columns and not df['keyword'].isna().all() else "N/A"
+    kw_counts = keyword_counts(daily)
+    top_kw = kw_counts.index[0] if not kw_counts.empty else "N/A"
     st.markdown('<div class="glass-card">', unsafe_allow_html=True); st.metric("Top Keyword", top_kw); st.markdown('</div>', unsafe_allow_html=True)
-with c4: st.markdown('<div class="glass-card">', unsafe_allow_html=True); st.metric("Last Update", str(df['date'].max() if 'date' in df.columns else 'N/A')); st.markdown('</div>', unsafe_allow_html=True)
+with c4: st.markdown('<div class="glass-card">', unsafe_allow_html=True); st.metric("Last Update", str(daily['date'].max() if not daily.empty else 'N/A')); st.markdown('</div>', unsafe_allow_html=True)
 
 # Dashboard Widgets
 st.markdown("---")
@@ -171,7 +162,7 @@ col_dash_1, col_dash_2 = st.columns([1, 2])
 
 with col_dash_1:
     # Global Sentiment Gauge
-    avg_sentiment = df['sentiment'].mean()
+    avg_sentiment = avg_sent
     fig_gauge = go.Figure(go.Indicator(
         mode = "gauge+number",
         value = avg_sentiment,
@@ -194,12 +185,28 @@ with col_dash_1:
 
 with col_dash_2:
     # Activity Trend
-    daily_counts = df.groupby('date').size().reset_index(name='counts')
+    daily_counts = downsample_lines(daily.groupby('date')['posts'].sum().reset_index(name='counts'), 'date', 'counts')
     fig_trend = px.area(daily_counts, x='date', y='counts', title="📈 Activity Volume Trend", color_discrete_sequence=['#00BFA6'])
     fig_trend.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='#fafafa', height=300)
     st.plotly_chart(fig_trend, use_container_width=True)
 
 st.markdown("### 📡 Recent Signals")
+rising = load_rising_posts(10)
+if rising is None or rising.empty:
+    st.caption("No posts gaining traction right now. Velocity appears once posts have been seen in more than one fetch.")
+else:
+    signals = rising.rename(columns={'title': 'Post', 'subreddit': 'Subreddit', 'score': 'Score',
+                                     'score_velocity': 'Upvotes/h', 'comment_velocity': 'Comments/h',
+                                     'score_acceleration': 'Acceleration'})
+    st.dataframe(
+        signals[['Post', 'Subreddit', 'Score', 'Upvotes/h', 'Comments/h', 'Acceleration']],
+        use_container_width=True, hide_index=True,
+        column_config={
+            'Upvotes/h': st.column_config.NumberColumn(format="%.0f"),
+            'Comments/h': st.column_config.NumberColumn(format="%.1f"),
+            'Acceleration': st.column_config.NumberColumn(format="%+.0f", help="Change in upvotes/h versus the previous window"),
+        },
+    )
 
 # Instructions
 st.markdown("### 🧭 Navigation")
@@ -1,39 +1,114 @@
 # alerts.py — detect spikes and send Slack messages
 import os, pandas as pd
 from dotenv import load_dotenv
+from storage import posts_exist, read_posts
+from spike_detector import SpikeDetector
+from alert_dispatcher import AlertDispatcher
 load_dotenv()
-SLACK_TOKEN = os.getenv("SLACK_BOT_TOKEN")
-SLACK_CHANNEL = os.getenv("SLACK_CHANNEL", "#general")
-
-def send_slack_alert(message):
-    if not SLACK_TOKEN:
-        print("Slack token not set; skipping alert.")
-        return
-    from slack_sdk import WebClient
-    client = WebClient(token=SLACK_TOKEN)
+
+# Emerging topics (topic_trends.py) alert at this hourly score with enough recent posts
+TOPIC_ALERT_SCORE = float(os.getenv("TOPIC_ALERT_SCORE", "4"))
+TOPIC_ALERT_MIN_POSTS = int(os.getenv("TOPIC_ALERT_MIN_POSTS", "10"))
+# A post gaining upvotes this fast (per hour, snapshots.py) and still speeding up is alerted
+VELOCITY_ALERT_PER_HOUR = float(os.getenv("VELOCITY_ALERT_PER_HOUR", "500"))
+
+def send_slack_alert(message, dedup_key=None):
+    """Queue a message and deliver everything pending through the shared transport."""
+    dispatcher = AlertDispatcher()
+    dispatcher.enqueue(message, dedup_key)
+    dispatcher.flush()
+    dispatcher.close()
+
+def queue_alerts(messages, dispatcher=None):
+    """Queue (text, dedup_key) pairs; returns how many were not dropped by dedup or cooldown.
+    With no dispatcher of the caller's they are sent right away; otherwise the caller flushes."""
+    own = dispatcher is None
+    if own:
+        dispatcher = AlertDispatcher()
+    queued = sum(dispatcher.enqueue(text, key) for text, key in messages)
+    if own:
+        dispatcher.flush()
+        dispatcher.close()
+    return queued
+
+def format_spike(alert):
+    kind, _, name = alert['key'].partition(":")
+    label = {"keyword": f"keyword '{name}'", "subreddit": f"r/{name}"}.get(kind, "all posts")
+    start = pd.to_datetime(alert['bucket_start'], unit='s').strftime('%Y-%m-%d %H:%M')
+    return (f"🚀 Spike detected for {label}: {alert['count']} posts since {start} UTC "
+            f"(baseline {alert['baseline']:.1f}, z={alert['z']:.1f})")
+
+def check_for_spikes(df=None, now=None, dispatcher=None):
+    """Feed posts not yet seen by the streaming detector and alert on any spikes.
+    now defaults to the wall clock; replays pass the time of the posts being replayed.
+    Pass a dispatcher to batch the alerts with other checks (see queue_alerts)."""
+    detector = SpikeDetector()
+    if df is None:
+        if not posts_exist():
+            print("No posts stored; skipping spikes check.")
+            return []
+        # Only posts past the detector's watermark are evaluated; pruning by date keeps the read small
+        since = detector.watermark - detector.bucket_seconds if detector.watermark else None
+        df = read_posts(columns=['created_utc', 'subreddit', 'keyword'], since=since)
+    alerts = detector.process(df, now)
+    detector.save()
+    detector.close()
+    # Keys still in cooldown from an earlier alert are dropped
+    queued = queue_alerts(((format_spike(alert), alert['key']) for alert in alerts), dispatcher)
+    if not alerts:
+        print("No spikes detected.")
+    elif not queued:
+        print(f"{len(alerts)} spikes detected, all within their alert cooldown.")
+    return alerts
+
+def format_topic(row):
+    return (f"🌱 Emerging topic '{row['name']}': {row['recent_posts']} recent posts, "
+            f"{row['growth']:.1f}× its baseline (score {row['score']:.1f}, sentiment {row['sentiment']:+.2f})")
+
+def check_emerging_topics(ranking=None, dispatcher=None):
+    """Alert on topics whose hourly trend score crosses TOPIC_ALERT_SCORE."""
+    if ranking is None:
+        import topic_trends
+        ranking = topic_trends.read_ranking()
+    if ranking is None or ranking.empty:
+        return []
+    hot = ranking[(ranking['freq'] == "hourly") & (ranking['score'] >= TOPIC_ALERT_SCORE)
+                  & (ranking['recent_posts'] >= TOPIC_ALERT_MIN_POSTS)]
+    if hot.empty:
+        print("No emerging topics.")
+        return []
+    queue_alerts(((format_topic(row), f"topic:{row['topic']}") for _, row in hot.iterrows()), dispatcher)
+    return hot.to_dict("records")
+
+def format_rising(row):
+    return (f"🔥 Post taking off in r/{row['subreddit']}: \"{row['title']}\" "
+            f"+{row['score_velocity']:.0f} upvotes/h, +{row['comment_velocity']:.0f} comments/h (score {row['score']})")
+
+def check_rising_posts(threshold=VELOCITY_ALERT_PER_HOUR, dispatcher=None):
+    """Alert on posts whose upvote velocity crosses the threshold while still accelerating."""
+    import snapshots
+    rising = snapshots.rising_posts(top_n=50)
+    if rising is None or rising.empty:
+        return []
+    hot = rising[(rising['score_velocity'] >= threshold) & (rising['score_acceleration'] >= 0)
+                 & rising['title'].notna()]
+    if hot.empty:
+        print("No rising posts.")
+        return []
+    queue_alerts(((format_rising(row), f"post:{row['post_id']}") for _, row in hot.iterrows()), dispatcher)
+    return hot.to_dict("records")
+
+def run_checks(df=None, ranking=None):
+    """Every check, delivered as one digest."""
+    dispatcher = AlertDispatcher()
     try:
-        client.chat_postMessage(channel=SLACK_CHANNEL, text=message)
-        print("Slack alert sent.")
-    except Exception as e:
-        print("Slack send error:", e)
-
-def check_for_spikes(multiplier=3):
-    p = "data/reddit_posts.csv"
-    if not os.path.exists(p):
-        print("No reddit_posts.csv; skipping spikes check.")
-        return
-    df = pd.read_csv(p)
-    if df.empty or 'created_utc' not in df.columns:
-        return
-    df['date'] = pd.to_datetime(df['created_utc'], unit='s').dt.date
-    counts = df.groupby('date').size().sort_index()
-    if len(counts) < 2:
-        return
-    latest = counts.iloc[-1]
-    baseline = counts.iloc[:-1].tail(7).mean() if len(counts) > 1 else 0
-    if baseline > 0 and latest > baseline * multiplier:
-        top_kw = df['keyword'].value_counts().idxmax() if 'keyword' in df.columns and not df['keyword'].isna().all() else "N/A"
-        send_slack_alert(f"🚀 Spike detected: {latest} posts today (baseline {baseline:.1f}). Top keyword: {top_kw}")
+        check_for_spikes(df, dispatcher=dispatcher)
+        check_emerging_topics(ranking, dispatcher=dispatcher)
+        check_rising_posts(dispatcher=dispatcher)
+        dispatcher.flush()
+    finally:
+        # Alerts queued before a failing check stay in the queue for the next flush
+        dispatcher.close()
 
 if __name__ == "__main__":
-    check_for_spikes()
+    run_checks()
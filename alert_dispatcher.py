@@ -0,0 +1,122 @@
+# alert_dispatcher.py — Queued, deduplicated alert delivery
+# Alerts are written to an on-disk queue (data/alert_queue.db) with a dedup key
+# (e.g. "keyword:ai"). A key that was delivered within the cooldown, or that is
+# already waiting in the queue, is dropped. flush() coalesces everything
+# pending into one digest message and sends it through a transport that keeps
+# its client/connection for the life of the process.
+import os
+import time
+import sqlite3
+import requests
+from dotenv import load_dotenv
+load_dotenv()
+
+QUEUE_DB = os.path.join("data", "alert_queue.db")
+SLACK_TOKEN = os.getenv("SLACK_BOT_TOKEN")
+SLACK_CHANNEL = os.getenv("SLACK_CHANNEL", "#general")
+# slack, webhook or console; defaults to slack when a token is set, else webhook when a URL is set
+ALERT_TRANSPORT = os.getenv("ALERT_TRANSPORT", "").lower()
+ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL")
+COOLDOWN_MINUTES = float(os.getenv("ALERT_COOLDOWN_MINUTES", "60"))
+DIGEST_MAX_LINES = 20
+
+
+class SlackTransport:
+    def __init__(self, token=SLACK_TOKEN, channel=SLACK_CHANNEL):
+        from slack_sdk import WebClient
+        self.client = WebClient(token=token)
+        self.channel = channel
+
+    def send(self, text):
+        self.client.chat_postMessage(channel=self.channel, text=text)
+
+
+class WebhookTransport:
+    """POSTs {"text": ...} as JSON, e.g. to a Slack incoming webhook or a local test stub."""
+
+    def __init__(self, url=ALERT_WEBHOOK_URL, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send(self, text):
+        r = self.session.post(self.url, json={"text": text}, timeout=self.timeout)
+        r.raise_for_status()
+
+
+class ConsoleTransport:
+    def send(self, text):
+        print(f"[alert] {text}")
+
+
+_transport = None
+def get_transport():
+    """Process-wide transport chosen from the environment, created once and reused."""
+    global _transport
+    if _transport is None:
+        kind = ALERT_TRANSPORT or ("slack" if SLACK_TOKEN else "webhook" if ALERT_WEBHOOK_URL else "console")
+        if kind == "slack":
+            _transport = SlackTransport()
+        elif kind == "webhook":
+            _transport = WebhookTransport()
+        else:
+            print("No alert transport configured (SLACK_BOT_TOKEN / ALERT_WEBHOOK_URL); printing alerts.")
+            _transport = ConsoleTransport()
+    return _transport
+
+
+class AlertDispatcher:
+    def __init__(self, transport=None, path=QUEUE_DB, cooldown_minutes=COOLDOWN_MINUTES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.transport = transport
+        self.cooldown = cooldown_minutes * 60
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS queue (id INTEGER PRIMARY KEY, dedup_key TEXT, text TEXT, created REAL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS delivered (dedup_key TEXT PRIMARY KEY, last_sent REAL)")
+        self.conn.commit()
+
+    def enqueue(self, text, dedup_key=None):
+        """Queue an alert; returns False if it was dropped as a duplicate or still cooling down."""
+        now = time.time()
+        if dedup_key is not None:
+            row = self.conn.execute("SELECT last_sent FROM delivered WHERE dedup_key = ?", (dedup_key,)).fetchone()
+            if row and now - row[0] < self.cooldown:
+                return False
+            if self.conn.execute("SELECT 1 FROM queue WHERE dedup_key = ?", (dedup_key,)).fetchone():
+                return False
+        self.conn.execute("INSERT INTO queue (dedup_key, text, created) VALUES (?, ?, ?)", (dedup_key, text, now))
+        self.conn.commit()
+        return True
+
+    def pending(self):
+        return self.conn.execute("SELECT id, dedup_key, text FROM queue ORDER BY id").fetchall()
+
+    def flush(self):
+        """Send everything queued as one message; pending alerts stay queued if delivery fails."""
+        rows = self.pending()
+        if not rows:
+            return 0
+        if len(rows) == 1:
+            text = rows[0][2]
+        else:
+            lines = [f"• {r[2]}" for r in rows[:DIGEST_MAX_LINES]]
+            if len(rows) > DIGEST_MAX_LINES:
+                lines.append(f"…and {len(rows) - DIGEST_MAX_LINES} more")
+            text = f"🚨 {len(rows)} TrendVision alerts\n" + "\n".join(lines)
+        try:
+            (self.transport or get_transport()).send(text)
+        except Exception as e:
+            print("Alert send error:", e)
+            return 0
+        now = time.time()
+        self.conn.executemany("DELETE FROM queue WHERE id = ?", ((r[0],) for r in rows))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO delivered (dedup_key, last_sent) VALUES (?, ?)",
+            ((r[1], now) for r in rows if r[1] is not None),
+        )
+        self.conn.commit()
+        print(f"Alert sent ({len(rows)} coalesced).")
+        return len(rows)
+
+    def close(self):
+        self.conn.close()
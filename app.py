@@ -3,7 +3,12 @@ import praw
 import pandas as pd
 import os
 import sys
+import threading
 from dotenv import load_dotenv
+from storage import append_posts, POSTS_DIR
+from ingest_state import IngestState, STATE_DB
+import snapshots
+from fetcher import TokenBucket, RateLimitedRequestor, fetch_concurrently, REQUESTS_PER_MIN
 
 # Load environment variables
 load_dotenv()
@@ -12,6 +17,48 @@ REDDIT_CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
 REDDIT_CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
 REDDIT_USER_AGENT = os.getenv("REDDIT_USER_AGENT", "TrendVision/1.0")
 SUBREDDITS = os.getenv("SUBREDDITS", "technology").split("+")
+# Posts per listing on the first run; later runs page through /new until the high-water mark
+FETCH_LIMIT = 50
+BACKFILL_LIMIT = int(os.getenv("INGEST_BACKFILL_LIMIT", "500"))
+# Optional endpoint overrides, e.g. to point the fetcher at a local fake Reddit
+REDDIT_OAUTH_URL = os.getenv("REDDIT_OAUTH_URL")
+REDDIT_URL = os.getenv("REDDIT_URL")
+
+def make_reddit(limiter):
+    endpoints = {}
+    if REDDIT_OAUTH_URL:
+        endpoints["oauth_url"] = REDDIT_OAUTH_URL
+    if REDDIT_URL:
+        endpoints["reddit_url"] = REDDIT_URL
+    return praw.Reddit(
+        client_id=REDDIT_CLIENT_ID,
+        client_secret=REDDIT_CLIENT_SECRET,
+        user_agent=REDDIT_USER_AGENT,
+        requestor_class=RateLimitedRequestor,
+        requestor_kwargs={"limiter": limiter},
+        **endpoints
+    )
+
+def fetch_new(reddit, sub, mark):
+    """(posts newer than mark, reached): reached is False when BACKFILL_LIMIT ran out before the mark."""
+    posts = []
+    limit = FETCH_LIMIT if mark is None else BACKFILL_LIMIT
+    # New is newest-first: stop once past what was stored last run. Posts from the mark's own
+    # second are kept (several can share it); the seen-ID filter drops the ones already stored.
+    for post in reddit.subreddit(sub).new(limit=limit):
+        if mark is not None and post.created_utc < mark:
+            return posts, True
+        posts.append(process_post(post, sub))
+    return posts, mark is None or len(posts) < limit
+
+def fetch_subreddit(reddit, sub, mark):
+    """(posts, oldest): oldest is the created_utc where /new ran out short of the mark, else None."""
+    posts, reached = fetch_new(reddit, sub, mark)
+    oldest = None if reached or not posts else posts[-1]['created_utc']
+    # Hot is not time-ordered; unseen posts are filtered by ID afterwards
+    for post in reddit.subreddit(sub).hot(limit=FETCH_LIMIT):
+        posts.append(process_post(post, sub))
+    return posts, oldest
 
 def fetch_reddit_data():
     print("🚀 Starting Reddit data fetch...")
@@ -21,42 +68,69 @@ def fetch_reddit_data():
     
     print(f"   Using User-Agent: {REDDIT_USER_AGENT}")
 
+    # One shared request budget; PRAW clients are not thread-safe, so one per worker thread
+    limiter = TokenBucket(REQUESTS_PER_MIN / 60.0)
     try:
-        reddit = praw.Reddit(
-            client_id=REDDIT_CLIENT_ID,
-            client_secret=REDDIT_CLIENT_SECRET,
-            user_agent=REDDIT_USER_AGENT
-        )
+        make_reddit(limiter)
     except Exception as e:
         print(f"❌ Error initializing Reddit client: {e}")
         return
 
+    state = IngestState()
+    marks = {sub: state.high_water_mark(sub) for sub in SUBREDDITS}
+    local = threading.local()
+
+    def fetch_one(sub):
+        if not hasattr(local, "reddit"):
+            local.reddit = make_reddit(limiter)
+        return fetch_subreddit(local.reddit, sub, marks[sub])
+
+    print(f"   Scanning {len(SUBREDDITS)} subreddits concurrently...")
     all_posts = []
-    for sub in SUBREDDITS:
-        print(f"   Scanning r/{sub}...")
-        try:
-            subreddit = reddit.subreddit(sub)
-            # Fetch Hot and New posts
-            limit = 50
-            for post in subreddit.hot(limit=limit):
-                all_posts.append(process_post(post, sub))
-            for post in subreddit.new(limit=limit):
-                all_posts.append(process_post(post, sub))
-        except Exception as e:
-            print(f"   ⚠️ Could not fetch r/{sub}: {e}")
-            if "401" in str(e):
+    for sub, result, error in fetch_concurrently(SUBREDDITS, fetch_one):
+        if error is not None:
+            print(f"   ⚠️ Could not fetch r/{sub}: {error}")
+            if "401" in str(error):
                 print("      👉 Tip: 401 means 'Unauthorized'. Check your Client ID and Secret.")
+            continue
+        posts, oldest = result
+        print(f"   r/{sub}: {len(posts)} posts")
+        if oldest is None:
+            state.reached(sub)
+        else:
+            note_short_run(state, sub, oldest)
+        all_posts.extend(posts)
 
     if not all_posts:
+        state.close()
         print("⚠️ No posts found. Check your internet connection or API credentials.")
         return
 
     df = pd.DataFrame(all_posts)
     df = df.drop_duplicates(subset=['id'])
-    
-    os.makedirs("data", exist_ok=True)
-    df.to_csv("data/reddit_posts.csv", index=False)
-    print(f"✅ Saved {len(df)} unique posts to data/reddit_posts.csv")
+    # Already-stored posts from hot still give a fresh score/comment snapshot
+    snapshots.record(df)
+    df = df[~df['id'].isin(state.seen(df['id']))]
+
+    if df.empty:
+        state.close()
+        print("✅ No new posts since the last run.")
+        return df
+
+    append_posts(df)
+    state.record(df)
+    state.close()
+    print(f"✅ Appended {len(df)} new posts to {POSTS_DIR}/")
+    return df
+
+def note_short_run(state, sub, oldest):
+    """Keep the mark of a listing that stopped short of it, or give the gap up after repeated tries."""
+    mark = state.high_water_mark(sub)
+    if state.short_run(sub, oldest):
+        print(f"   ⚠️ r/{sub}: {BACKFILL_LIMIT} newest posts did not reach the last run; mark kept")
+    else:
+        print(f"   ❌ r/{sub}: posts between {pd.to_datetime(mark, unit='s')} and {pd.to_datetime(oldest, unit='s')} UTC "
+              f"could not be fetched and are lost; recorded in {STATE_DB}")
 
 def process_post(post, sub):
     return {
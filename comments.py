@@ -0,0 +1,218 @@
+# comments.py — Incremental comment ingestion
+# Only posts from the last COMMENT_LOOKBACK_DAYS are considered. Their current
+# num_comments is fetched in batches of 100, and a post is refetched only if
+# its count grew since we last read its comments (the same lookup records
+# score/comment snapshots, see snapshots.py). Each comment tree is walked
+# breadth-first within a per-post budget (comments, depth, and "load more"
+# requests). New comments are buffered and written in chunks as Parquet parts
+# under data/comments/day=YYYY-MM-DD/, linked to posts by post_id.
+import os
+import sys
+import time
+import uuid
+import sqlite3
+import threading
+from collections import deque
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+from storage import DATA_DIR, PARTITION_COL, posts_exist, read_posts
+import snapshots
+from fetcher import TokenBucket, fetch_concurrently, MAX_WORKERS, REQUESTS_PER_MIN
+load_dotenv()
+
+COMMENTS_DIR = os.path.join(DATA_DIR, "comments")
+STATE_DB = os.path.join(DATA_DIR, "comment_state.db")
+MAX_PER_POST = int(os.getenv("COMMENT_MAX_PER_POST", "200"))
+MAX_DEPTH = int(os.getenv("COMMENT_MAX_DEPTH", "3"))
+# Extra "load more comments" requests per post; 0 keeps one request per post
+MORE_LIMIT = int(os.getenv("COMMENT_MORE_LIMIT", "0"))
+LOOKBACK_DAYS = float(os.getenv("COMMENT_LOOKBACK_DAYS", "3"))
+MAX_POSTS = int(os.getenv("COMMENT_MAX_POSTS", "200"))
+CHUNK_ROWS = int(os.getenv("COMMENT_CHUNK_ROWS", "5000"))
+
+COMMENT_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("post_id", pa.string()),
+    ("parent_id", pa.string()),
+    ("body", pa.string()),
+    ("score", pa.int64()),
+    ("created_utc", pa.float64()),
+    ("depth", pa.int64()),
+])
+
+
+class CommentState:
+    """Comment count per post at its last fetch, and the comment ids already stored."""
+
+    def __init__(self, path=STATE_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS posts (post_id TEXT PRIMARY KEY, num_comments INTEGER, fetched_at REAL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY)")
+        self.conn.commit()
+
+    def grown(self, counts):
+        """{post_id: comments gained since the last fetch} for posts whose count went up."""
+        known = {}
+        ids = list(counts)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            known.update(self.conn.execute(
+                f"SELECT post_id, num_comments FROM posts WHERE post_id IN ({placeholders})", chunk))
+        return {pid: n - known.get(pid, 0) for pid, n in counts.items() if n > known.get(pid, 0)}
+
+    def unseen(self, rows):
+        ids = [r["id"] for r in rows]
+        found = set()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(r[0] for r in self.conn.execute(f"SELECT id FROM seen WHERE id IN ({placeholders})", chunk))
+        return [r for r in rows if r["id"] not in found]
+
+    def record(self, post_id, num_comments, rows):
+        self.conn.executemany("INSERT OR IGNORE INTO seen (id) VALUES (?)", ((r["id"],) for r in rows))
+        self.conn.execute("INSERT OR REPLACE INTO posts (post_id, num_comments, fetched_at) VALUES (?, ?, ?)",
+                          (post_id, int(num_comments), time.time()))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class ChunkWriter:
+    """Buffers comment rows and writes them as day-partitioned Parquet parts every chunk_rows rows."""
+
+    def __init__(self, root=COMMENTS_DIR, chunk_rows=CHUNK_ROWS):
+        self.root = root
+        self.chunk_rows = chunk_rows
+        self.rows = []
+        self.written = 0
+
+    def add(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        df = pd.DataFrame(self.rows, columns=COMMENT_SCHEMA.names)
+        days = pd.to_datetime(df["created_utc"], unit="s", utc=True).dt.strftime("%Y-%m-%d").fillna("unknown")
+        for day, part in df.groupby(days, sort=False):
+            part_dir = os.path.join(self.root, f"{PARTITION_COL}={day}")
+            os.makedirs(part_dir, exist_ok=True)
+            path = os.path.join(part_dir, f"part-{uuid.uuid4().hex}.parquet")
+            # Written under a dot-name and renamed, so readers never pick up a partial file
+            tmp = os.path.join(part_dir, f".{os.path.basename(path)}.tmp")
+            pq.write_table(pa.Table.from_pandas(part, schema=COMMENT_SCHEMA, preserve_index=False), tmp, compression="zstd")
+            os.replace(tmp, path)
+        self.written += len(self.rows)
+        self.rows = []
+
+
+def iter_comments(submission, max_comments=MAX_PER_POST, max_depth=MAX_DEPTH, more_limit=MORE_LIMIT):
+    """Yield up to max_comments comment rows, breadth-first, no deeper than max_depth levels."""
+    submission.comment_sort = "top"
+    submission.comment_limit = max_comments
+    submission.comments.replace_more(limit=more_limit)
+    queue = deque((c, 0) for c in submission.comments)
+    count = 0
+    while queue and count < max_comments:
+        comment, depth = queue.popleft()
+        yield {
+            "id": comment.id,
+            "post_id": submission.id,
+            "parent_id": comment.parent_id,
+            "body": comment.body,
+            "score": int(comment.score or 0),
+            "created_utc": float(comment.created_utc),
+            "depth": depth,
+        }
+        count += 1
+        if depth + 1 < max_depth:
+            queue.extend((reply, depth + 1) for reply in comment.replies)
+
+
+def current_stats(reddit, post_ids):
+    """Live score and num_comments per post; PRAW batches the lookups 100 ids per request."""
+    rows = [(s.id, int(s.score or 0), int(s.num_comments or 0))
+            for s in reddit.info(fullnames=[f"t3_{pid}" for pid in post_ids])]
+    return pd.DataFrame(rows, columns=['id', 'score', 'num_comments'])
+
+
+def read_comments(columns=None, since=None):
+    """Load stored comments; since filters on comment created_utc."""
+    if not os.path.isdir(COMMENTS_DIR):
+        return pd.DataFrame(columns=columns or COMMENT_SCHEMA.names)
+    partitioning = ds.partitioning(pa.schema([(PARTITION_COL, pa.string())]), flavor="hive")
+    dataset = ds.dataset(COMMENTS_DIR, format="parquet", partitioning=partitioning)
+    names = [c for c in (columns or COMMENT_SCHEMA.names) if c in dataset.schema.names]
+    flt = None
+    if since is not None:
+        since_day = pd.to_datetime(since, unit="s", utc=True).strftime("%Y-%m-%d")
+        flt = (ds.field(PARTITION_COL) >= since_day) & (ds.field("created_utc") >= float(since))
+    return dataset.to_table(columns=names, filter=flt).to_pandas()
+
+
+def run(posts=None):
+    from app import make_reddit, REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET
+    if not REDDIT_CLIENT_ID or not REDDIT_CLIENT_SECRET:
+        print("⚠️ Reddit credentials missing; skipping comment ingestion.")
+        return 0
+    since = time.time() - LOOKBACK_DAYS * 86400
+    if posts is None:
+        if not posts_exist():
+            raise SystemExit("No posts in data/posts/. Run app.py first.")
+        posts = read_posts(columns=['id', 'created_utc'], since=since)
+    else:
+        posts = posts[pd.to_numeric(posts['created_utc'], errors='coerce') >= since]
+    if posts.empty:
+        print("No recent posts; no comments to fetch.")
+        return 0
+
+    limiter = TokenBucket(REQUESTS_PER_MIN / 60.0)
+    reddit = make_reddit(limiter)
+    stats = current_stats(reddit, posts['id'].astype(str).tolist())
+    # The same lookup feeds the score/comment history used for velocity
+    snapshots.record(stats)
+    counts = dict(zip(stats['id'], stats['num_comments']))
+    state = CommentState()
+    grown = state.grown(counts)
+    # Posts that gained the most comments first, within the per-run budget
+    todo = sorted(grown, key=grown.get, reverse=True)[:MAX_POSTS]
+    print(f"💬 {len(grown)} of {len(counts)} recent posts have new comments; fetching {len(todo)}...")
+
+    local = threading.local()
+    def fetch_one(post_id):
+        if not hasattr(local, "reddit"):
+            local.reddit = make_reddit(limiter)
+        return list(iter_comments(local.reddit.submission(id=post_id)))
+
+    writer = ChunkWriter()
+    window = max(1, MAX_WORKERS * 4)
+    for start in range(0, len(todo), window):
+        # A window at a time so at most window × MAX_PER_POST comments are held in memory
+        for post_id, rows, error in fetch_concurrently(todo[start:start + window], fetch_one):
+            if error is not None:
+                print(f"   ⚠️ Could not fetch comments for {post_id}: {error}")
+                continue
+            fresh = state.unseen(rows)
+            writer.add(fresh)
+            state.record(post_id, counts[post_id], fresh)
+        writer.flush()
+        state.commit()
+    state.close()
+    print(f"✅ Stored {writer.written} new comments in {COMMENTS_DIR}/")
+    return writer.written
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    run()
@@ -0,0 +1,171 @@
+# dashboard_data.py — Shared, cached data access for the Streamlit pages
+# Frames are cached per store version, so page switches and the 60s
+# auto-refresh only re-read Parquet after the pipeline has written new data.
+# Each page calls pin_version() once at the top of its run; every load in that
+# rerun reads the same snapshot even if the pipeline commits a new one midway.
+import os
+import pandas as pd
+import streamlit as st
+from storage import posts_exist, read_posts, store_version
+import rollups
+import topic_trends
+import snapshots
+from post_grid import PostGrid
+from nlp.embeddings import EMBEDDING_DIR
+
+FORECAST_PATH = os.path.join("data", "forecast.csv")
+SERIES_FORECAST_PATH = os.path.join("data", "forecast_series.parquet")
+
+
+def pin_version():
+    """Pin the current store snapshot for the rest of this rerun."""
+    st.session_state["store_version"] = store_version()
+    return st.session_state["store_version"]
+
+
+def pinned_version():
+    return st.session_state.get("store_version") or pin_version()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _load_posts(version, columns):
+    df = read_posts(columns=list(columns) if columns else None, version=version)
+    if columns is None or 'sentiment' in columns:
+        if 'sentiment' not in df.columns:
+            df['sentiment'] = 0.0
+        else:
+            df['sentiment'] = pd.to_numeric(df['sentiment'], errors='coerce').fillna(0)
+    if 'created_utc' in df.columns:
+        df['created_utc'] = pd.to_numeric(df['created_utc'], errors='coerce')
+        df['date'] = pd.to_datetime(df['created_utc'], unit='s').dt.date
+    for col in ('score', 'num_comments'):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+
+def load_posts(columns=None):
+    """Posts with only the given columns, normalized: numeric sentiment/score/num_comments and a `date` column
+    when created_utc is loaded. Returns None when there is no data yet."""
+    if not posts_exist():
+        return None
+    columns = tuple(columns) if columns else None
+    try:
+        return _load_posts(pinned_version(), columns)
+    except FileNotFoundError:
+        # The pinned snapshot was pruned by later writes; move to the current one
+        return _load_posts(pin_version(), columns)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _post_grid(version, columns):
+    return PostGrid(_load_posts(version, columns))
+
+
+def post_grid(columns):
+    """Indexed, shared PostGrid over the given columns for server-side paging, or None when there is no data.
+    Unlike load_posts, its frame is not copied per rerun; treat grid.df as read-only."""
+    if not posts_exist():
+        return None
+    columns = tuple(columns)
+    try:
+        return _post_grid(pinned_version(), columns)
+    except FileNotFoundError:
+        return _post_grid(pin_version(), columns)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_rollup(mtime, version):
+    daily = rollups.read_daily()
+    if daily is None:
+        # Data from before rollups existed: aggregate once here until the pipeline materializes them
+        daily = rollups.build_daily(read_posts(columns=rollups.ROLLUP_SOURCE_COLUMNS, version=version))
+    return daily
+
+
+def load_rollup():
+    """Daily (date, subreddit, keyword) rollup with posts and sentiment/score/comment sums."""
+    if not posts_exist():
+        return None
+    if os.path.exists(rollups.DAILY_PATH):
+        return _load_rollup(os.path.getmtime(rollups.DAILY_PATH), None)
+    return _load_rollup(None, pinned_version())
+
+
+def keyword_counts(daily):
+    """Post count per keyword, most frequent first (like value_counts on the raw column)."""
+    kw = daily.dropna(subset=['keyword'])
+    return kw.groupby('keyword')['posts'].sum().sort_values(ascending=False, kind='stable')
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_forecast(mtime):
+    df = pd.read_csv(FORECAST_PATH)
+    df['ds'] = pd.to_datetime(df['ds'])
+    return df
+
+
+def load_forecast():
+    if not os.path.exists(FORECAST_PATH):
+        return None
+    return _load_forecast(os.path.getmtime(FORECAST_PATH))
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_series_forecast(mtime):
+    return pd.read_parquet(SERIES_FORECAST_PATH)
+
+
+def load_series_forecast():
+    """Long-format per-keyword/per-subreddit forecasts from forecast/batch.py."""
+    if not os.path.exists(SERIES_FORECAST_PATH):
+        return None
+    return _load_series_forecast(os.path.getmtime(SERIES_FORECAST_PATH))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _vector_index(meta_mtime):
+    from nlp.vector_index import VectorIndex
+    return VectorIndex()
+
+
+def similar_posts(post_id, k=10):
+    """[(post_id, similarity)] nearest to post_id in the embedding index, or None before embeddings exist."""
+    meta = os.path.join(EMBEDDING_DIR, "meta.json")
+    if not os.path.exists(meta):
+        return None
+    return _vector_index(os.path.getmtime(meta)).similar_posts(post_id, k)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_parquet(path, mtime):
+    return pd.read_parquet(path)
+
+
+def load_topic_trends(freq="D"):
+    """Per-topic (topic, ts, posts, sentiment) series from topic_trends.py; freq is "D" or "h"."""
+    path = topic_trends.series_path(freq)
+    if not os.path.exists(path):
+        return None
+    return _load_parquet(path, os.path.getmtime(path))
+
+
+def load_emerging_topics():
+    """Topics ranked by trend score, one row per topic and freq (daily/hourly)."""
+    path = topic_trends.RANKING_PATH
+    if not os.path.exists(path):
+        return None
+    return _load_parquet(path, os.path.getmtime(path))
+
+
+@st.cache_data(show_spinner=False, max_entries=4, ttl=60)
+def _load_rising_posts(mtime, top_n):
+    return snapshots.rising_posts(top_n)
+
+
+def load_rising_posts(top_n=10):
+    """Posts ranked by upvote velocity from the score/comment snapshots, or None before any exist."""
+    if not os.path.exists(snapshots.STATE_DB):
+        return None
+    # Velocity moves with the clock as well as with new snapshots, hence the TTL
+    return _load_rising_posts(os.path.getmtime(snapshots.STATE_DB), top_n)
@@ -0,0 +1,130 @@
+# downsample.py — Keep chart payloads within a point budget
+# Plotly figures serialize every point to the browser, so charts fed straight
+# from the posts frame grow with the dataset. Before plotting:
+#   lines      → downsample_lines: Largest-Triangle-Three-Buckets per series,
+#                which keeps peaks and troughs that uniform sampling would drop
+#   histograms → histogram_figure: binned with NumPy here, only bar heights are sent
+#   scatters   → sample_scatter: sampled per colour group, so small groups stay visible
+#   box plots  → box_figure: quartiles and whiskers computed here, five numbers per box
+# CHART_POINT_BUDGET caps the points in one figure.
+import os
+import numpy as np
+import pandas as pd
+
+POINT_BUDGET = int(os.getenv("CHART_POINT_BUDGET", "2000"))
+
+
+def lttb(x, y, n):
+    """Positions of the n points Largest-Triangle-Three-Buckets keeps; the first and last always stay."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    m = len(x)
+    if n >= m:
+        return np.arange(m)
+    if n < 3:
+        return np.array([0, m - 1])[:max(n, 0)]
+    # n - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, m - 1, n - 1).astype(int)
+    keep = np.empty(n, dtype=int)
+    keep[0], keep[-1] = 0, m - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (m - 1, m)
+        # The point forming the largest triangle with the last kept point and the next bucket's mean
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def _as_number(s):
+    if pd.api.types.is_numeric_dtype(s):
+        return s.to_numpy(dtype=float)
+    return pd.to_datetime(s).to_numpy().astype("datetime64[ns]").astype(np.int64).astype(float)
+
+
+def downsample_lines(df, x, y, color=None, budget=POINT_BUDGET):
+    """Rows of df reduced to at most `budget` points in total, LTTB per `color` series.
+    With more series than the budget allows three points each, only the largest (by sum of y) are kept."""
+    if df is None or len(df) <= budget:
+        return df
+    groups = [df] if color is None else [g for _, g in df.groupby(color, sort=False)]
+    if len(groups) > max(1, budget // 3):
+        groups = sorted(groups, key=lambda g: g[y].sum(), reverse=True)[:max(1, budget // 3)]
+    per_series = budget // len(groups)
+    parts = []
+    for g in groups:
+        g = g[g[y].notna()].sort_values(x, kind='stable')
+        parts.append(g.iloc[lttb(_as_number(g[x]), g[y].to_numpy(dtype=float), per_series)])
+    return pd.concat(parts)
+
+
+def sample_scatter(df, budget=POINT_BUDGET, by=None, seed=0):
+    """At most `budget` rows, sampled in proportion to each `by` group. Groups too small for a
+    proportional share get one row each, largest first, while the budget lasts.
+    The seed is fixed so the same points are shown on every rerun."""
+    if df is None or len(df) <= budget:
+        return df
+    if by is None:
+        return df.sample(n=budget, random_state=seed)
+    sizes = df.groupby(by, sort=False).size()
+    quota = np.floor(sizes * budget / len(df)).astype(int)
+    spare = budget - int(quota.sum())
+    small = quota[quota == 0].index
+    top_up = sizes[small].sort_values(ascending=False, kind='stable').index[:spare]
+    quota[top_up] = 1
+    parts = [g.sample(n=min(len(g), quota[key]), random_state=seed)
+             for key, g in df.groupby(by, sort=False) if quota[key] > 0]
+    return pd.concat(parts)
+
+
+def box_stats(values):
+    """go.Box keyword arguments (quartiles, Tukey whiskers) for values; None when there are none."""
+    values = pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy(dtype=float)
+    if len(values) == 0:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    return {
+        "q1": [q1], "median": [median], "q3": [q3],
+        "lowerfence": [values[values >= q1 - 1.5 * iqr].min()],
+        "upperfence": [values[values <= q3 + 1.5 * iqr].max()],
+    }
+
+
+def box_figure(groups, colors=None, y_title=None):
+    """One box per {name: values} group, drawn from precomputed statistics instead of raw points."""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for name, values in groups.items():
+        stats = box_stats(values)
+        if stats is None:
+            continue
+        fig.add_trace(go.Box(x=[name], name=name, marker_color=(colors or {}).get(name), **stats))
+    fig.update_layout(yaxis_title=y_title)
+    return fig
+
+
+def histogram_figure(values, nbins=20, color=None, box=False):
+    """Histogram binned server-side; only nbins bar heights (and five box statistics) reach the browser."""
+    import plotly.graph_objects as go
+    label = getattr(values, "name", None) or "value"
+    values = pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy(dtype=float)
+    counts, edges = np.histogram(values, bins=nbins)
+    bars = go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), marker_color=color,
+                  name="count", showlegend=False)
+    if not box or len(values) == 0:
+        fig = go.Figure(bars)
+        fig.update_layout(xaxis_title=label, yaxis_title="count")
+        return fig
+    from plotly.subplots import make_subplots
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8], vertical_spacing=0.02)
+    fig.add_trace(go.Box(y=[""], orientation="h", marker_color=color, showlegend=False, hoverinfo="x",
+                         **box_stats(values)), row=1, col=1)
+    fig.add_trace(bars, row=2, col=1)
+    fig.update_yaxes(showticklabels=False, row=1, col=1)
+    fig.update_xaxes(title_text=label, row=2, col=1)
+    fig.update_yaxes(title_text="count", row=2, col=1)
+    return fig
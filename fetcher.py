@@ -0,0 +1,110 @@
+# fetcher.py — Concurrent, rate-limit-aware subreddit fetching
+# All worker threads share one TokenBucket. Every HTTP request PRAW makes goes
+# through RateLimitedRequestor, which takes a token first and then feeds
+# Reddit's X-Ratelimit-* response headers back into the bucket.
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import prawcore
+from prawcore.exceptions import Forbidden, NotFound, Redirect, OAuthException, ResponseException
+
+MAX_WORKERS = int(os.getenv("REDDIT_MAX_WORKERS", "8"))
+REQUESTS_PER_MIN = float(os.getenv("REDDIT_REQUESTS_PER_MIN", "100"))
+MAX_RETRIES = int(os.getenv("REDDIT_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("REDDIT_BACKOFF_SECONDS", "2"))
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec, capacity=None):
+        self.base_rate = rate_per_sec
+        self.rate = rate_per_sec
+        self.capacity = capacity or max(1.0, rate_per_sec * 5)
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate if self.rate > 0 else 1.0)
+            time.sleep(min(max(wait, 0.01), 5.0))
+
+    def update_from_headers(self, headers):
+        """Shrink or restore the budget from Reddit's rate-limit headers."""
+        try:
+            remaining = float(headers["x-ratelimit-remaining"])
+            reset = float(headers["x-ratelimit-reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if remaining < 1:
+                # Window exhausted: nobody sends until Reddit resets it
+                self.tokens = 0
+                self.blocked_until = now + reset
+                self.rate = self.base_rate
+            else:
+                # Spread what is left of the window evenly over the time to reset
+                self.tokens = min(self.tokens, remaining)
+                self.rate = min(self.base_rate, remaining / max(reset, 1.0))
+
+
+class RateLimitedRequestor(prawcore.Requestor):
+    def __init__(self, *args, limiter=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    def request(self, *args, **kwargs):
+        if self.limiter is not None:
+            self.limiter.acquire()
+        response = super().request(*args, **kwargs)
+        if self.limiter is not None:
+            self.limiter.update_from_headers(response.headers)
+        return response
+
+
+def is_retryable(error):
+    if isinstance(error, (Forbidden, NotFound, Redirect, OAuthException)):
+        return False
+    if isinstance(error, ResponseException) and error.response.status_code in (401, 403, 404):
+        return False
+    return "401" not in str(error)
+
+
+def with_retries(fn, *args, retries=MAX_RETRIES, backoff=BACKOFF_BASE):
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            # Exponential backoff with jitter so retries from different threads spread out
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+def fetch_concurrently(items, fetch_one, max_workers=MAX_WORKERS):
+    """Run fetch_one(item) across a thread pool, retrying each item with backoff.
+
+    Returns a list of (item, result, error) tuples in the same order as items.
+    """
+    def task(item):
+        try:
+            return item, with_retries(fetch_one, item), None
+        except Exception as e:
+            return item, None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items) or 1))) as pool:
+        return list(pool.map(task, items))
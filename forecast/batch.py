@@ -0,0 +1,172 @@
+# forecast/batch.py — Per-keyword / per-subreddit batch forecasting
+# Builds one daily series per keyword and subreddit (plus the total) from the
+# rollup table and forecasts them all. The default ETS engine is an additive
+# Holt-Winters model run in NumPy over every series at once. The Prophet engine
+# fits series in parallel across a process pool.
+# Output: data/forecast_series.parquet (series_id, kind, name, ds, yhat, model).
+import os
+import sys
+import importlib.util
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import rollups
+from storage import posts_exist, read_posts
+from forecast.warm_start import series_hash, model_path, load_index, save_index, fit_prophet
+
+OUTPUT_PATH = os.path.join("data", "forecast_series.parquet")
+HORIZON = 7
+# auto = Prophet when installed, else ETS
+FORECAST_ENGINE = os.getenv("FORECAST_ENGINE", "auto").lower()
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", str(os.cpu_count() or 1)))
+MIN_HISTORY_DAYS = int(os.getenv("FORECAST_MIN_DAYS", "14"))
+HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "120"))
+SEASON = 7
+ALPHAS = np.array([0.1, 0.3, 0.5, 0.8])
+BETA = 0.1
+GAMMA = 0.1
+
+
+def build_series(daily, history_days=HISTORY_DAYS):
+    """Pivot the rollup into a dense (series × day) count matrix over the last history_days."""
+    daily = daily.copy()
+    daily['date'] = pd.to_datetime(daily['date'])
+    end = daily['date'].max()
+    days = pd.date_range(end - pd.Timedelta(days=history_days - 1), end, freq='D')
+    daily = daily[daily['date'] >= days[0]]
+    frames = [daily.assign(series_id='total', kind='total', name='all')]
+    kw = daily.dropna(subset=['keyword'])
+    frames.append(kw.assign(series_id='keyword:' + kw['keyword'], kind='keyword', name=kw['keyword']))
+    sub = daily.dropna(subset=['subreddit'])
+    frames.append(sub.assign(series_id='subreddit:' + sub['subreddit'], kind='subreddit', name=sub['subreddit']))
+    long = pd.concat(frames, ignore_index=True)
+    matrix = long.pivot_table(index='series_id', columns='date', values='posts', aggfunc='sum', fill_value=0)
+    matrix = matrix.reindex(columns=days, fill_value=0)
+    meta = long.drop_duplicates('series_id').set_index('series_id')[['kind', 'name']].loc[matrix.index]
+    return matrix, meta
+
+
+def long_enough(matrix, min_days=MIN_HISTORY_DAYS):
+    """Series whose first non-zero day leaves at least min_days of history."""
+    values = matrix.to_numpy()
+    nonzero = values > 0
+    first = np.where(nonzero.any(axis=1), nonzero.argmax(axis=1), values.shape[1])
+    return (values.shape[1] - first) >= min_days
+
+
+def holt_winters(Y, horizon=HORIZON, season=SEASON, alphas=ALPHAS, beta=BETA, gamma=GAMMA):
+    """Additive Holt-Winters for many series at once.
+
+    Y: (series, time) array. Alpha is picked per series from `alphas` by
+    one-step-ahead squared error. Returns a (series, horizon) forecast.
+    """
+    Y = np.asarray(Y, dtype=float)
+    n, T = Y.shape
+    m = season if T >= 2 * season else 1
+    A = alphas[:, None]                                   # (a, 1) broadcasts over series
+    level = np.broadcast_to(Y[:, :m].mean(axis=1), (len(alphas), n)).copy()
+    trend = np.zeros_like(level)
+    seasonal = np.broadcast_to(Y[:, :m] - Y[:, :m].mean(axis=1, keepdims=True), (len(alphas), n, m)).copy()
+    if m == 1:
+        seasonal[:] = 0.0
+    sse = np.zeros_like(level)
+    for t in range(T):
+        y = Y[:, t]
+        s = seasonal[:, :, t % m]
+        sse += (y - (level + trend + s)) ** 2
+        new_level = A * (y - s) + (1 - A) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        if m > 1:
+            seasonal[:, :, t % m] = gamma * (y - new_level) + (1 - gamma) * s
+        level = new_level
+    best = sse.argmin(axis=0)                             # (series,)
+    rows = np.arange(n)
+    level, trend, seasonal = level[best, rows], trend[best, rows], seasonal[best, rows]
+    steps = np.arange(1, horizon + 1)
+    season_idx = (T + steps - 1) % m
+    forecast = level[:, None] + trend[:, None] * steps[None, :] + seasonal[:, season_idx]
+    return np.clip(forecast, 0, None)
+
+
+def _fit_prophet(args):
+    series_id, ds, y, horizon, unchanged = args
+    model, refitted = fit_prophet(pd.DataFrame({'ds': ds, 'y': y}), model_path(series_id), unchanged)
+    future = pd.DataFrame({'ds': pd.date_range(ds[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')})
+    return series_id, model.predict(future)['yhat'].clip(lower=0).to_numpy(), refitted
+
+
+def prophet_available():
+    return importlib.util.find_spec("prophet") is not None
+
+
+def forecast_matrix(matrix, engine=FORECAST_ENGINE, workers=FORECAST_WORKERS, horizon=HORIZON):
+    """Forecast every row of matrix; returns ({series_id: yhat array}, model name).
+
+    Prophet series whose daily counts hash the same as at their last fit reuse the
+    stored model (predict only); changed series warm-start from it. The ETS pass is a
+    single vectorized sweep over all series, so it is always recomputed.
+    """
+    if engine == "auto":
+        engine = "prophet" if prophet_available() else "ets"
+    if engine == "prophet":
+        ds = list(matrix.columns)
+        index = load_index()
+        hashes = {sid: series_hash(ds, row, engine) for sid, row in zip(matrix.index, matrix.to_numpy())}
+        tasks = [(sid, ds, row, horizon, index.get(sid) == hashes[sid])
+                 for sid, row in zip(matrix.index, matrix.to_numpy())]
+        forecasts, refits = {}, 0
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            for sid, yhat, refitted in pool.map(_fit_prophet, tasks, chunksize=8):
+                forecasts[sid] = yhat
+                refits += refitted
+        index.update(hashes)
+        save_index(index)
+        print(f"   Prophet: refit {refits} of {len(tasks)} series ({len(tasks) - refits} unchanged)")
+        return forecasts, "prophet"
+    yhat = holt_winters(matrix.to_numpy(), horizon=horizon)
+    return dict(zip(matrix.index, yhat)), "ets"
+
+
+def run(daily=None, engine=FORECAST_ENGINE):
+    if daily is None:
+        daily = rollups.read_daily()
+        if daily is None:
+            if not posts_exist():
+                raise SystemExit("❌ No data found. Run app.py first.")
+            daily = rollups.build_daily(read_posts(columns=rollups.ROLLUP_SOURCE_COLUMNS))
+    if daily.empty:
+        print("⚠️ No data to forecast.")
+        return None
+
+    matrix, meta = build_series(daily)
+    keep = long_enough(matrix)
+    skipped = int((~keep).sum())
+    matrix, meta = matrix[keep], meta[keep]
+    if matrix.empty:
+        print(f"⚠️ All {skipped} series are shorter than {MIN_HISTORY_DAYS} days; nothing to forecast.")
+        return None
+
+    forecasts, model = forecast_matrix(matrix, engine=engine)
+    future = pd.date_range(matrix.columns[-1] + pd.Timedelta(days=1), periods=HORIZON, freq='D')
+    ids = list(forecasts)
+    out = pd.DataFrame({
+        'series_id': np.repeat(ids, HORIZON),
+        'kind': np.repeat(meta.loc[ids, 'kind'].to_numpy(), HORIZON),
+        'name': np.repeat(meta.loc[ids, 'name'].to_numpy(), HORIZON),
+        'ds': np.tile(future, len(ids)),
+        'yhat': np.concatenate([forecasts[i] for i in ids]),
+        'model': model,
+    })
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    tmp = OUTPUT_PATH + ".tmp"
+    out.to_parquet(tmp, index=False)
+    os.replace(tmp, OUTPUT_PATH)
+    print(f"✅ Forecast {len(ids)} series with {model} ({skipped} too short) → {OUTPUT_PATH}")
+    return out
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    run()
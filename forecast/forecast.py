@@ -1,60 +1,84 @@
 import pandas as pd
 import sys
 import os
+import importlib.util
 import numpy as np
 
-sys.stdout.reconfigure(encoding='utf-8')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import posts_exist, read_posts
+from forecast.warm_start import series_hash, model_path, load_index, save_index, fit_prophet
 
-# Load data
-if not os.path.exists("data/reddit_posts.csv"):
-    print("❌ No data found. Run app.py first.")
-    sys.exit(1)
+# Key for the total-volume model in the warm-start index (models/forecast/)
+TOTAL_SERIES = "total_daily"
+OUTPUT_PATH = os.path.join("data", "forecast.csv")
 
-df = pd.read_csv("data/reddit_posts.csv")
-df['created_utc'] = pd.to_datetime(df['created_utc'], unit='s')
+def save(forecast):
+    # Written aside and swapped in so the dashboard never reads a partial file
+    tmp = OUTPUT_PATH + ".tmp"
+    forecast.to_csv(tmp, index=False)
+    os.replace(tmp, OUTPUT_PATH)
 
-# Count number of posts per day
-df_daily = df.groupby(df['created_utc'].dt.date).size().reset_index(name='y')
-df_daily['ds'] = pd.to_datetime(df_daily['created_utc'])
-df_daily = df_daily[['ds', 'y']]
+def run(df=None):
+    # Load data
+    if df is None:
+        if not posts_exist():
+            raise SystemExit("❌ No data found. Run app.py first.")
+        df = read_posts(columns=['created_utc'])
+    df = df[['created_utc']].copy()
+    df['created_utc'] = pd.to_datetime(df['created_utc'], unit='s')
+
+    # Count number of posts per day
+    df_daily = df.groupby(df['created_utc'].dt.date).size().reset_index(name='y')
+    df_daily['ds'] = pd.to_datetime(df_daily['created_utc'])
+    df_daily = df_daily[['ds', 'y']]
 
-if len(df_daily) < 2:
-    print("⚠️ Not enough data to forecast. Creating dummy forecast.")
-    # Create a dummy flat line if not enough data
-    dates = pd.date_range(start=pd.Timestamp.now(), periods=7)
-    forecast = pd.DataFrame({'ds': dates, 'yhat': [0]*7})
     os.makedirs("data", exist_ok=True)
-    forecast.to_csv("data/forecast.csv", index=False)
-    sys.exit(0)
-
-try:
-    from prophet import Prophet
-    # Initialize and train model
-    model = Prophet()
-    model.fit(df_daily)
-
-    # Create future dates
-    future = model.make_future_dataframe(periods=7)  # next 7 days
-
-    # Predict
-    forecast = model.predict(future)
-    print("✅ Forecast generated using Prophet.")
-
-except ImportError:
-    print("⚠️ Prophet not found. Using simple Moving Average fallback.")
-    # Fallback: Simple Moving Average + Linear Extrapolation
-    last_val = df_daily['y'].iloc[-1]
-    mean_val = df_daily['y'].mean()
-    
-    future_dates = pd.date_range(start=df_daily['ds'].max() + pd.Timedelta(days=1), periods=7)
-    # Simple logic: trend towards the mean
-    future_vals = np.linspace(last_val, mean_val, 7)
-    
-    forecast = pd.DataFrame({'ds': future_dates, 'yhat': future_vals})
-    # Append history for visualization context
-    history = df_daily.rename(columns={'y': 'yhat'})
-    forecast = pd.concat([history, forecast])
-
-# Save forecast
-forecast[['ds', 'yhat']].to_csv("data/forecast.csv", index=False)
-print("✅ Forecast saved to data/forecast.csv")
+    if len(df_daily) < 2:
+        print("⚠️ Not enough data to forecast. Creating dummy forecast.")
+        # Create a dummy flat line if not enough data
+        dates = pd.date_range(start=pd.Timestamp.now(), periods=7)
+        forecast = pd.DataFrame({'ds': dates, 'yhat': [0]*7})
+        save(forecast)
+        return forecast
+
+    if importlib.util.find_spec("prophet") is not None:
+        # Reuse the stored model if the daily counts are unchanged, else warm-start from it
+        index = load_index()
+        counts_hash = series_hash(df_daily['ds'], df_daily['y'], "prophet")
+        model, refitted = fit_prophet(df_daily, model_path(TOTAL_SERIES), index.get(TOTAL_SERIES) == counts_hash)
+        index[TOTAL_SERIES] = counts_hash
+        save_index(index)
+        if not refitted:
+            print("   Daily counts unchanged; reusing the stored Prophet model.")
+
+        # Create future dates
+        future = model.make_future_dataframe(periods=7)  # next 7 days
+
+        # Predict
+        forecast = model.predict(future)
+        print("✅ Forecast generated using Prophet.")
+
+    else:
+        print("⚠️ Prophet not found. Using simple Moving Average fallback.")
+        # Fallback: Simple Moving Average + Linear Extrapolation
+        last_val = df_daily['y'].iloc[-1]
+        mean_val = df_daily['y'].mean()
+
+        future_dates = pd.date_range(start=df_daily['ds'].max() + pd.Timedelta(days=1), periods=7)
+        # Simple logic: trend towards the mean
+        future_vals = np.linspace(last_val, mean_val, 7)
+
+        forecast = pd.DataFrame({'ds': future_dates, 'yhat': future_vals})
+        # Append history for visualization context
+        history = df_daily.rename(columns={'y': 'yhat'})
+        forecast = pd.concat([history, forecast])
+
+    # Save forecast
+    forecast = forecast[['ds', 'yhat']]
+    save(forecast)
+    print("✅ Forecast saved to data/forecast.csv")
+    return forecast
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    run()
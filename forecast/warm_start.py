@@ -0,0 +1,92 @@
+# forecast/warm_start.py — Persisted Prophet state for incremental forecasting
+# Each series keeps its last fitted model (Prophet JSON) and a content hash of
+# the daily counts it was fitted on. Unchanged series reuse the stored model
+# without refitting; changed series start Stan from the previous parameters.
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = os.path.join("models", "forecast")
+INDEX_PATH = os.path.join(MODEL_DIR, "index.json")
+
+
+def series_hash(ds, y, engine=""):
+    """Hash of the non-zero (day, count) points, so trailing empty days do not count as changes."""
+    ds = pd.to_datetime(pd.Series(ds)).dt.strftime("%Y-%m-%d").to_numpy()
+    y = np.asarray(y, dtype=float)
+    nz = y != 0
+    h = hashlib.sha1(engine.encode())
+    h.update("|".join(ds[nz]).encode())
+    h.update(y[nz].tobytes())
+    return h.hexdigest()
+
+
+def model_path(series_id):
+    return os.path.join(MODEL_DIR, hashlib.sha1(series_id.encode("utf-8")).hexdigest() + ".json")
+
+
+def load_index():
+    try:
+        with open(INDEX_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    tmp = INDEX_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, INDEX_PATH)
+
+
+def stan_init(model):
+    """Fitted parameters of a Prophet model in the form fit(init=...) expects."""
+    res = {}
+    for pname in ['k', 'm', 'sigma_obs']:
+        res[pname] = float(model.params[pname][0][0])
+    for pname in ['delta', 'beta']:
+        res[pname] = model.params[pname][0].tolist()
+    return res
+
+
+def load_model(path):
+    from prophet.serialize import model_from_json
+    try:
+        with open(path) as f:
+            return model_from_json(f.read())
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_model(model, path):
+    from prophet.serialize import model_to_json
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(model_to_json(model))
+    os.replace(tmp, path)
+
+
+def fit_prophet(history, path, unchanged):
+    """Return (model, refitted). Reuses the stored model when the input is unchanged;
+    otherwise warm-starts from it and falls back to a cold fit if shapes no longer match."""
+    from prophet import Prophet
+    previous = load_model(path) if os.path.exists(path) else None
+    if unchanged and previous is not None:
+        return previous, False
+    model = Prophet()
+    if previous is not None:
+        try:
+            model.fit(history, init=stan_init(previous))
+        except Exception:
+            # e.g. a new seasonality or changepoint count changed the parameter shapes
+            model = Prophet()
+            model.fit(history)
+    else:
+        model.fit(history)
+    save_model(model, path)
+    return model, True
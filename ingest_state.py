@@ -0,0 +1,99 @@
+# ingest_state.py — Persistent seen-ID index and per-subreddit high-water marks
+# Lets app.py fetch and append only posts it has not stored yet.
+import os
+import time
+import sqlite3
+from storage import DATA_DIR, posts_exist, read_posts
+
+STATE_DB = os.path.join(DATA_DIR, "ingest_state.db")
+# Consecutive runs a mark is held for a listing that cannot reach it before the gap is given up
+MAX_SHORT_RUNS = int(os.getenv("INGEST_MAX_SHORT_RUNS", "3"))
+
+
+class IngestState:
+    def __init__(self, path=STATE_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS marks (subreddit TEXT PRIMARY KEY, created_utc REAL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS holds (subreddit TEXT PRIMARY KEY, short_runs INTEGER)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS gaps (subreddit TEXT, from_utc REAL, to_utc REAL, recorded REAL)")
+        self.conn.commit()
+        # Subreddits whose mark must not move this session (their listing stopped short of it)
+        self.held = set()
+        if self._is_empty():
+            self._seed_from_store()
+
+    def _is_empty(self):
+        return self.conn.execute("SELECT 1 FROM seen LIMIT 1").fetchone() is None
+
+    def _seed_from_store(self):
+        # First run against an existing store: index what is already there
+        if not posts_exist():
+            return
+        df = read_posts(columns=['id', 'subreddit', 'created_utc'])
+        if not df.empty:
+            self.record(df)
+
+    def high_water_mark(self, subreddit):
+        row = self.conn.execute("SELECT created_utc FROM marks WHERE subreddit = ?", (subreddit,)).fetchone()
+        return row[0] if row else None
+
+    def reached(self, subreddit):
+        """The listing reached the mark: it may move forward again."""
+        self.held.discard(subreddit)
+        self.conn.execute("DELETE FROM holds WHERE subreddit = ?", (subreddit,))
+        self.conn.commit()
+
+    def short_run(self, subreddit, oldest):
+        """The listing ran out before the mark; `oldest` is the oldest post it returned.
+
+        The mark is kept so the next run tries again, for up to MAX_SHORT_RUNS runs in a row.
+        After that the posts between the mark and `oldest` are recorded as a gap (lost data)
+        and the mark is allowed to move on. Returns True while the mark is held.
+        """
+        self.conn.execute("INSERT INTO holds (subreddit, short_runs) VALUES (?, 1) "
+                          "ON CONFLICT(subreddit) DO UPDATE SET short_runs = short_runs + 1", (subreddit,))
+        runs = self.conn.execute("SELECT short_runs FROM holds WHERE subreddit = ?", (subreddit,)).fetchone()[0]
+        if runs <= MAX_SHORT_RUNS:
+            self.conn.commit()
+            self.held.add(subreddit)
+            return True
+        mark = self.high_water_mark(subreddit)
+        self.conn.execute("INSERT INTO gaps (subreddit, from_utc, to_utc, recorded) VALUES (?, ?, ?, ?)",
+                          (subreddit, mark, oldest, time.time()))
+        self.conn.execute("DELETE FROM holds WHERE subreddit = ?", (subreddit,))
+        self.conn.commit()
+        self.held.discard(subreddit)
+        return False
+
+    def gaps(self):
+        """(subreddit, from_utc, to_utc, recorded) for every stretch of posts that was given up."""
+        return self.conn.execute("SELECT subreddit, from_utc, to_utc, recorded FROM gaps ORDER BY recorded").fetchall()
+
+    def seen(self, ids):
+        """Return the subset of ids that are already stored."""
+        ids = list(ids)
+        found = set()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(f"SELECT id FROM seen WHERE id IN ({placeholders})", chunk)
+            found.update(r[0] for r in rows)
+        return found
+
+    def record(self, df):
+        """Mark posts as stored and advance each subreddit's high-water mark (unless held)."""
+        if df.empty:
+            return
+        self.conn.executemany("INSERT OR IGNORE INTO seen (id) VALUES (?)", ((str(i),) for i in df['id']))
+        marks = df.groupby('subreddit')['created_utc'].max()
+        self.conn.executemany(
+            "INSERT INTO marks (subreddit, created_utc) VALUES (?, ?) "
+            "ON CONFLICT(subreddit) DO UPDATE SET created_utc = MAX(created_utc, excluded.created_utc)",
+            ((str(sub), float(ts)) for sub, ts in marks.items() if ts == ts and sub not in self.held),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,189 @@
+# news_service.py — Cached, concurrent news for the trending keywords
+# Google News RSS (and NewsAPI when NEWS_API_KEY is set) is fetched for many
+# keywords at once on a thread pool. Parsed entries are cached in
+# data/news_cache.db. A cached keyword is only refetched once it is older than
+# NEWS_TTL_MINUTES, and RSS refetches send the stored ETag/Last-Modified so an
+# unchanged feed costs a 304. The pipeline's "news" stage prefetches the top
+# keywords; the News Monitor page reads the cache.
+# Point NEWS_RSS_URL / NEWS_API_URL at a local server to test without the internet.
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+import calendar
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus
+import requests
+from dotenv import load_dotenv
+load_dotenv()
+
+NEWS_CACHE_DB = os.path.join("data", "news_cache.db")
+NEWS_RSS_URL = os.getenv("NEWS_RSS_URL") or "https://news.google.com/rss/search?q={query}&hl=en-US&gl=US&ceid=US:en"
+NEWS_API_URL = os.getenv("NEWS_API_URL") or "https://newsapi.org/v2/everything"
+NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+NEWS_TTL_MINUTES = float(os.getenv("NEWS_TTL_MINUTES", "15"))
+NEWS_MAX_WORKERS = int(os.getenv("NEWS_MAX_WORKERS", "8"))
+NEWS_TOP_KEYWORDS = 10
+MAX_ENTRIES = 20
+TIMEOUT = 10
+
+_local = threading.local()
+def _session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+        _local.session.headers["User-Agent"] = "TrendVision/1.0"
+    return _local.session
+
+
+def _entry(title, link, published, source, provider):
+    return {"title": title or "", "link": link or "", "published": published or "",
+            "source": source or "", "provider": provider, "ts": 0.0}
+
+
+def fetch_rss(keyword, etag=None, modified=None, url_template=NEWS_RSS_URL):
+    """Returns (entries or None if the feed is unchanged, etag, last_modified)."""
+    import feedparser
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if modified:
+        headers["If-Modified-Since"] = modified
+    r = _session().get(url_template.format(query=quote_plus(keyword)), headers=headers, timeout=TIMEOUT)
+    if r.status_code == 304:
+        return None, etag, modified
+    r.raise_for_status()
+    feed = feedparser.parse(r.content)
+    entries = []
+    for e in feed.entries[:MAX_ENTRIES]:
+        item = _entry(e.get("title"), e.get("link"), e.get("published"), e.get("source", {}).get("title"), "rss")
+        if e.get("published_parsed"):
+            item["ts"] = float(calendar.timegm(e.published_parsed))
+        entries.append(item)
+    return entries, r.headers.get("ETag"), r.headers.get("Last-Modified")
+
+
+def fetch_newsapi(query, api_key=NEWS_API_KEY, page_size=MAX_ENTRIES, url=NEWS_API_URL):
+    params = {"q": query, "sortBy": "publishedAt", "pageSize": page_size, "apiKey": api_key}
+    r = _session().get(url, params=params, timeout=TIMEOUT)
+    r.raise_for_status()
+    entries = []
+    for a in r.json().get("articles", []):
+        item = _entry(a.get("title"), a.get("url"), a.get("publishedAt"), (a.get("source") or {}).get("name"), "newsapi")
+        try:
+            item["ts"] = float(calendar.timegm(time.strptime(a["publishedAt"], "%Y-%m-%dT%H:%M:%SZ")))
+        except (KeyError, TypeError, ValueError):
+            pass
+        entries.append(item)
+    return entries
+
+
+def merge_entries(*lists):
+    """Newest first, one entry per headline across providers."""
+    seen, merged = set(), []
+    for item in sorted((e for entries in lists for e in entries), key=lambda e: e["ts"], reverse=True):
+        key = item["title"].strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            merged.append(item)
+    return merged[:MAX_ENTRIES]
+
+
+class NewsService:
+    def __init__(self, path=NEWS_CACHE_DB, ttl_minutes=NEWS_TTL_MINUTES, api_key=NEWS_API_KEY,
+                 rss_url=NEWS_RSS_URL, max_workers=NEWS_MAX_WORKERS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl_minutes * 60
+        self.api_key = api_key
+        self.rss_url = rss_url
+        self.max_workers = max_workers
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS feeds (keyword TEXT PRIMARY KEY, etag TEXT, modified TEXT, "
+                          "fetched REAL, rss TEXT, newsapi TEXT)")
+        self.conn.commit()
+
+    def _rows(self, keywords):
+        placeholders = ",".join("?" * len(keywords))
+        rows = self.conn.execute(f"SELECT keyword, etag, modified, fetched, rss, newsapi FROM feeds "
+                                 f"WHERE keyword IN ({placeholders})", list(keywords)).fetchall()
+        return {r[0]: r for r in rows}
+
+    def get(self, keyword):
+        """(entries, fetched_at) from the cache only; ([], None) if never fetched."""
+        row = self._rows([keyword]).get(keyword)
+        if row is None:
+            return [], None
+        return merge_entries(json.loads(row[4] or "[]"), json.loads(row[5] or "[]")), row[3]
+
+    def stale(self, keywords):
+        cached = self._rows(keywords)
+        now = time.time()
+        return [kw for kw in keywords if kw not in cached or now - (cached[kw][3] or 0) >= self.ttl]
+
+    def _fetch(self, row):
+        keyword, etag, modified, _, rss, newsapi = row
+        errors = []
+        try:
+            fresh, etag, modified = fetch_rss(keyword, etag, modified, self.rss_url)
+            if fresh is not None:
+                rss = json.dumps(fresh)
+        except Exception as e:
+            errors.append(f"RSS: {e}")
+        if self.api_key:
+            try:
+                newsapi = json.dumps(fetch_newsapi(keyword, self.api_key))
+            except Exception as e:
+                errors.append(f"NewsAPI: {e}")
+        return (keyword, etag, modified, rss, newsapi), errors
+
+    def refresh(self, keywords, force=False):
+        """Refetch stale (or, with force, all) keywords concurrently; returns {keyword: [errors]}."""
+        keywords = list(dict.fromkeys(keywords))
+        todo = keywords if force else self.stale(keywords)
+        if not todo:
+            return {}
+        cached = self._rows(todo)
+        rows = [cached.get(kw, (kw, None, None, None, None, None)) for kw in todo]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(rows)))) as pool:
+            results = list(pool.map(self._fetch, rows))
+        now = time.time()
+        failed = {}
+        for (keyword, etag, modified, rss, newsapi), errors in results:
+            fetched = now
+            if errors:
+                # Keep serving what we have, but leave it stale so the next refresh retries
+                failed[keyword] = errors
+                fetched = cached[keyword][3] if keyword in cached else None
+            self.conn.execute("INSERT OR REPLACE INTO feeds (keyword, etag, modified, fetched, rss, newsapi) "
+                              "VALUES (?, ?, ?, ?, ?, ?)", (keyword, etag, modified, fetched, rss, newsapi))
+        self.conn.commit()
+        return failed
+
+    def close(self):
+        self.conn.close()
+
+
+def run(daily=None, top_n=NEWS_TOP_KEYWORDS):
+    """Prefetch news for the top keywords in the rollup."""
+    import rollups
+    daily = rollups.read_daily() if daily is None else daily
+    if daily is None or daily.empty:
+        print("⚠️ No rollups yet; skipping news prefetch.")
+        return []
+    kw = daily.dropna(subset=['keyword'])
+    kw = kw[kw['keyword'].astype(str).str.strip() != ""]
+    keywords = kw.groupby('keyword')['posts'].sum().sort_values(ascending=False, kind='stable').head(top_n).index.tolist()
+    service = NewsService()
+    todo = service.stale(keywords)
+    failed = service.refresh(todo)
+    service.close()
+    for keyword, errors in failed.items():
+        print(f"⚠️ News fetch for '{keyword}' failed: {'; '.join(errors)}")
+    print(f"✅ News cache: {len(todo) - len(failed)} of {len(keywords)} keywords refreshed ({len(keywords) - len(todo)} still fresh)")
+    return keywords
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    run()
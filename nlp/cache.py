@@ -0,0 +1,86 @@
+# nlp/cache.py — Persistent content-hash cache for per-title NLP results
+# Keys are sha256(stage, model, params, text) so changing the model or its
+# parameters never serves stale results. Least-recently-used rows are evicted
+# once the table grows past NLP_CACHE_MAX_ENTRIES.
+import os
+import json
+import time
+import hashlib
+import sqlite3
+
+CACHE_DB = os.path.join("data", "nlp_cache.db")
+MAX_ENTRIES = int(os.getenv("NLP_CACHE_MAX_ENTRIES", "1000000"))
+
+
+class ResultCache:
+    def __init__(self, stage, model, params=None, path=CACHE_DB, max_entries=MAX_ENTRIES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.prefix = f"{stage}\x00{model}\x00{json.dumps(params or {}, sort_keys=True, default=str)}\x00"
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, last_used REAL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self.conn.commit()
+
+    def _key(self, text):
+        return hashlib.sha256((self.prefix + text).encode("utf-8")).hexdigest()
+
+    def get_many(self, texts):
+        """Return {text: value} for every text already cached."""
+        keys = {self._key(t): t for t in set(texts)}
+        found = {}
+        key_list = list(keys)
+        for i in range(0, len(key_list), 500):
+            chunk = key_list[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for key, value in self.conn.execute(f"SELECT key, value FROM results WHERE key IN ({placeholders})", chunk):
+                found[keys[key]] = json.loads(value)
+        now = time.time()
+        self.conn.executemany("UPDATE results SET last_used = ? WHERE key = ?", ((now, self._key(t)) for t in found))
+        self.conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, results):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO results (key, value, last_used) VALUES (?, ?, ?)",
+            ((self._key(t), json.dumps(v), now) for t, v in results.items()),
+        )
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0%} hit rate)"
+
+    def close(self):
+        self.conn.close()
+
+
+def cached_map(cache, texts, compute, should_cache=lambda value: value is not None):
+    """Map texts through compute(list_of_texts) -> list, only computing cache misses.
+
+    compute returns None for a text it could not process. Such results (anything
+    should_cache rejects) are returned but not stored, so the text is retried next time.
+    """
+    texts = list(texts)
+    results = cache.get_many(texts)
+    missing = [t for t in dict.fromkeys(texts) if t not in results]
+    if missing:
+        fresh = dict(zip(missing, compute(missing)))
+        cache.put_many({t: v for t, v in fresh.items() if should_cache(v)})
+        results.update(fresh)
+    return [results[t] for t in texts]
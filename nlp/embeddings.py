@@ -0,0 +1,145 @@
+# nlp/embeddings.py — Persistent per-post title embeddings
+# Each post is encoded once with the sentence-transformers model and stored as
+# a row of a memory-mapped float16 matrix (data/embeddings/vectors.f16). The
+# post-id → row map and model name live in meta.json, which is replaced
+# atomically after the new rows are flushed, so readers only ever see rows that
+# have been fully written. Keyword extraction, topic modelling and the
+# similar-posts index all read from here instead of re-encoding titles.
+import os
+import sys
+import json
+import shutil
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EMBEDDING_DIR = os.path.join("data", "embeddings")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL") or os.getenv("KEYWORD_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+EMBEDDING_THREADS = int(os.getenv("KEYWORD_THREADS", str(os.cpu_count() or 1)))
+GROW_ROWS = 4096
+
+_encoder = None
+def get_encoder():
+    """Process-wide SentenceTransformer, shared with KeyBERT and BERTopic."""
+    global _encoder
+    if _encoder is None:
+        import torch
+        from sentence_transformers import SentenceTransformer
+        torch.set_num_threads(EMBEDDING_THREADS)
+        _encoder = SentenceTransformer(EMBEDDING_MODEL)
+    return _encoder
+
+
+def encode(texts, batch_size=EMBEDDING_BATCH_SIZE):
+    """Unit-length float32 embeddings, so inner product is cosine similarity."""
+    return get_encoder().encode(list(texts), batch_size=batch_size, normalize_embeddings=True,
+                                convert_to_numpy=True, show_progress_bar=False).astype(np.float32)
+
+
+class EmbeddingStore:
+    def __init__(self, path=EMBEDDING_DIR, model=EMBEDDING_MODEL):
+        self.path = path
+        self.model = model
+        self.vectors_path = os.path.join(path, "vectors.f16")
+        self.meta_path = os.path.join(path, "meta.json")
+        self.ids, self.dim = [], None
+        self.row_of = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("model") != self.model:
+            print(f"Embedding model changed ({meta.get('model')} → {self.model}); rebuilding the store.")
+            shutil.rmtree(self.path, ignore_errors=True)
+            return
+        self.ids, self.dim = meta["ids"], meta["dim"]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rows(self):
+        if self.row_of is None or len(self.row_of) != len(self.ids):
+            self.row_of = {pid: i for i, pid in enumerate(self.ids)}
+        return self.row_of
+
+    def vectors(self):
+        """Read-only (rows × dim) float16 view of every stored embedding."""
+        if not self.ids:
+            return np.zeros((0, self.dim or 0), dtype=np.float16)
+        return np.memmap(self.vectors_path, dtype=np.float16, mode="r", shape=(len(self.ids), self.dim))
+
+    def rows(self, ids):
+        """Row number per id, -1 where the post has no embedding yet."""
+        row_of = self._rows()
+        return np.array([row_of.get(str(pid), -1) for pid in ids], dtype=np.int64)
+
+    def get(self, ids):
+        """float32 embeddings for ids (zeros for unknown ids)."""
+        rows = self.rows(ids)
+        out = np.zeros((len(rows), self.dim or 0), dtype=np.float32)
+        known = rows >= 0
+        if known.any():
+            out[known] = self.vectors()[rows[known]]
+        return out
+
+    def add(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype=np.float16)
+        if len(ids) == 0:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        self.dim = self.dim or vectors.shape[1]
+        start, end = len(self.ids), len(self.ids) + len(ids)
+        row_bytes = self.dim * 2
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        with open(self.vectors_path, "r+b" if size else "w+b") as f:
+            if size < end * row_bytes:
+                # Grow in steps so appends do not resize the file every run
+                f.truncate((end + GROW_ROWS) * row_bytes)
+        mm = np.memmap(self.vectors_path, dtype=np.float16, mode="r+", offset=start * row_bytes,
+                       shape=(end - start, self.dim))
+        mm[:] = vectors
+        mm.flush()
+        del mm
+        self.ids = self.ids + [str(pid) for pid in ids]
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"model": self.model, "dim": self.dim, "ids": self.ids}, f)
+        os.replace(tmp, self.meta_path)
+
+    def ensure(self, ids, texts, batch_size=EMBEDDING_BATCH_SIZE):
+        """Encode and store posts that have no embedding yet; returns how many were added."""
+        row_of = self._rows()
+        todo, seen = [], set()
+        for pid, text in zip(ids, texts):
+            pid = str(pid)
+            if pid not in row_of and pid not in seen:
+                seen.add(pid)
+                todo.append((pid, "" if text is None else str(text)))
+        for start in range(0, len(todo), batch_size * 16):
+            chunk = todo[start:start + batch_size * 16]
+            self.add([pid for pid, _ in chunk], encode([t for _, t in chunk], batch_size))
+        return len(todo)
+
+
+def run(df=None):
+    from storage import posts_exist, read_posts
+    from nlp.vector_index import VectorIndex
+    if df is None:
+        if not posts_exist():
+            raise SystemExit("No posts in data/posts/. Run app.py first.")
+        df = read_posts(columns=['id', 'title'])
+    store = EmbeddingStore()
+    added = store.ensure(df['id'], df['title'])
+    indexed = VectorIndex(store).update()
+    print(f"✅ Embedded {added} new posts ({len(store)} stored, {indexed} newly indexed)")
+    return store
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    run()
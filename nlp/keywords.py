@@ -1,28 +1,86 @@
 # nlp/keywords.py — Extract keywords with KeyBERT (light)
 from keybert import KeyBERT
-import pandas as pd
 import os
 import sys
 
-sys.stdout.reconfigure(encoding='utf-8')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import posts_exist, read_posts, write_posts
+from nlp.cache import ResultCache, cached_map
+from nlp.embeddings import EMBEDDING_MODEL, EmbeddingStore, get_encoder
 
-os.makedirs("data", exist_ok=True)
-path = "data/reddit_posts.csv"
-if not os.path.exists(path):
-    raise SystemExit("data/reddit_posts.csv not found. Run app.py first.")
+# Same encoder as the embedding store, so stored title embeddings can stand in for KeyBERT's
+KEYWORD_MODEL = EMBEDDING_MODEL
+# Titles per KeyBERT call; candidate n-grams are embedded once per batch
+KEYWORD_BATCH_SIZE = int(os.getenv("KEYWORD_BATCH_SIZE", "256"))
+KEYBERT_ARGS = dict(keyphrase_ngram_range=(1,2), stop_words='english', top_n=1, use_mmr=True)
 
-df = pd.read_csv(path)
-df['title'] = df['title'].fillna("").astype(str)
+_kw_model = None
+def get_model():
+    global _kw_model
+    if _kw_model is None:
+        _kw_model = KeyBERT(model=get_encoder())
+    return _kw_model
 
-kw_model = KeyBERT()  # uses sentence-transformers under the hood (ensure installed)
 def top_keyword(text):
+    """Best keyword, "" when the title has none, or None if KeyBERT failed (not cached, retried later)."""
     try:
-        res = kw_model.extract_keywords(text, keyphrase_ngram_range=(1,2), stop_words='english', top_n=1, use_mmr=True)
+        res = get_model().extract_keywords(text, **KEYBERT_ARGS)
         return res[0][0] if res else ""
-    except Exception as e:
-        # fail-safe
-        return ""
+    except Exception:
+        return None
 
-df['keyword'] = df['title'].apply(top_keyword)
-df.to_csv(path, index=False)
-print("✅ Keywords extracted and saved to data/reddit_posts.csv")
+def extract_keywords_batch(texts, doc_embeddings=None):
+    model = get_model()
+    try:
+        if doc_embeddings is not None:
+            # Title embeddings come from the store; only the batch's candidate n-grams are encoded
+            results = model.extract_keywords(texts, doc_embeddings=doc_embeddings, **KEYBERT_ARGS)
+        elif hasattr(model, "extract_embeddings"):
+            # One encoder pass for the documents and one for the batch's shared vocabulary
+            doc_emb, word_emb = model.extract_embeddings(
+                texts, keyphrase_ngram_range=KEYBERT_ARGS['keyphrase_ngram_range'], stop_words=KEYBERT_ARGS['stop_words'])
+            results = model.extract_keywords(texts, doc_embeddings=doc_emb, word_embeddings=word_emb, **KEYBERT_ARGS)
+        else:
+            results = model.extract_keywords(texts, **KEYBERT_ARGS)
+    except Exception:
+        # e.g. empty vocabulary for the whole batch; fall back to one title at a time
+        return [top_keyword(t) for t in texts]
+    if len(texts) == 1:
+        # KeyBERT unwraps single-document results
+        results = [results]
+    return [res[0][0] if res else "" for res in results]
+
+def extract_keywords(titles, batch_size=KEYWORD_BATCH_SIZE, embeddings=None):
+    titles = list(titles)
+    keywords = []
+    for start in range(0, len(titles), batch_size):
+        batch_emb = None if embeddings is None else embeddings[start:start + batch_size]
+        keywords.extend(extract_keywords_batch(titles[start:start + batch_size], batch_emb))
+    return keywords
+
+def run(df=None, save=True):
+    if df is None:
+        if not posts_exist():
+            raise SystemExit("No posts in data/posts/. Run app.py first.")
+        df = read_posts()
+    df['title'] = df['title'].fillna("").astype(str)
+    cache = ResultCache("keyword", KEYWORD_MODEL, KEYBERT_ARGS)
+    compute = extract_keywords
+    if 'id' in df.columns:
+        store = EmbeddingStore()
+        store.ensure(df['id'], df['title'])
+        id_of = dict(zip(df['title'], df['id']))
+        compute = lambda titles: extract_keywords(titles, embeddings=store.get([id_of[t] for t in titles]))
+    df['keyword'] = cached_map(cache, df['title'], compute)
+    print(f"   Keyword cache: {cache.stats()}")
+    cache.close()
+    if save:
+        write_posts(df)
+        print("✅ Keywords extracted and saved to data/posts/")
+    else:
+        print("✅ Keywords extracted")
+    return df
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    run()
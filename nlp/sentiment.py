@@ -1,13 +1,24 @@
 # nlp/sentiment.py
 import os, time, sys
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 
-sys.stdout.reconfigure(encoding='utf-8')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import posts_exist, read_posts, write_posts
+from nlp.cache import ResultCache, cached_map
 
 load_dotenv()
 
 USE_TRANSFORMER = os.getenv("USE_TRANSFORMER", "false").lower() in ("1","true","yes")
+TRANSFORMER_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+# torch (default), int8 (dynamically quantized Linear layers) or onnx (ONNX Runtime via optimum)
+TRANSFORMER_BACKEND = os.getenv("TRANSFORMER_BACKEND", "torch").lower()
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "64"))
+MAX_TOKENS = 512
+# Light scorer parallelism; inputs no bigger than one chunk are scored in-process
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", str(os.cpu_count() or 1)))
+SENTIMENT_CHUNK_SIZE = int(os.getenv("SENTIMENT_CHUNK_SIZE", "5000"))
 
 try:
     from textblob import TextBlob
@@ -15,21 +26,59 @@ except Exception:
     TextBlob = None
 
 if USE_TRANSFORMER:
-    from transformers import pipeline
-    _pipe = None
-    def get_pipe():
-        global _pipe
-        if _pipe is None:
-            _pipe = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-        return _pipe
-    def transformer_sent(text):
-        try:
-            pipe = get_pipe()
-            out = pipe(text[:512])[0]
-            score = float(out.get("score",0.0))
-            return score if out.get("label","")=="POSITIVE" else -score
-        except:
-            return 0.0
+    import numpy as np
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    _tokenizer = None
+    _model = None
+    def get_model():
+        global _tokenizer, _model
+        if _model is None:
+            _tokenizer = AutoTokenizer.from_pretrained(TRANSFORMER_MODEL)
+            if TRANSFORMER_BACKEND == "onnx":
+                from optimum.onnxruntime import ORTModelForSequenceClassification
+                _model = ORTModelForSequenceClassification.from_pretrained(TRANSFORMER_MODEL, export=True)
+            else:
+                _model = AutoModelForSequenceClassification.from_pretrained(TRANSFORMER_MODEL).eval()
+                if TRANSFORMER_BACKEND == "int8":
+                    _model = torch.quantization.quantize_dynamic(_model, {torch.nn.Linear}, dtype=torch.qint8)
+        return _tokenizer, _model
+
+    def _score_batch(tokenizer, model, texts):
+        batch = tokenizer(texts, padding=True, truncation=True, max_length=MAX_TOKENS, return_tensors="pt")
+        with torch.no_grad():
+            logits = model(**batch).logits
+        probs = torch.softmax(logits.float(), dim=-1).numpy()
+        labels = model.config.id2label
+        return [float(p) if labels[int(label_id)].upper() == "POSITIVE" else -float(p)
+                for label_id, p in zip(probs.argmax(axis=1), probs.max(axis=1))]
+
+    def transformer_sentiments(texts, batch_size=SENTIMENT_BATCH_SIZE):
+        """Signed confidence (+ positive / - negative) for each text, in input order.
+        None for texts that could not be scored; cached_map leaves those uncached."""
+        tokenizer, model = get_model()
+        texts = list(texts)
+        scores = [None] * len(texts)
+        if not texts:
+            return scores
+        # Sort by token length so each batch pads to a similar size
+        lengths = [len(ids) for ids in tokenizer(texts, truncation=True, max_length=MAX_TOKENS)["input_ids"]]
+        order = np.argsort(lengths, kind="stable")
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            try:
+                batch_scores = _score_batch(tokenizer, model, [texts[i] for i in idx])
+            except Exception:
+                # Retry one at a time so a single bad input does not sink the whole batch
+                batch_scores = []
+                for i in idx:
+                    try:
+                        batch_scores.extend(_score_batch(tokenizer, model, [texts[i]]))
+                    except Exception:
+                        batch_scores.append(None)
+            for i, score in zip(idx, batch_scores):
+                scores[i] = score
+        return scores
 
 def textblob_sent(text):
     if not TextBlob or not text:
@@ -39,19 +88,48 @@ def textblob_sent(text):
     except:
         return 0.0
 
-path = "data/reddit_posts.csv"
-if not os.path.exists(path):
-    raise SystemExit("data/reddit_posts.csv missing. Run app.py")
+def _textblob_chunk(texts):
+    return [textblob_sent(t) for t in texts]
 
-df = pd.read_csv(path)
-df['title'] = df['title'].fillna("").astype(str)
+def textblob_sentiments(texts, workers=SENTIMENT_WORKERS, chunk_size=SENTIMENT_CHUNK_SIZE):
+    texts = list(texts)
+    if workers <= 1 or len(texts) <= chunk_size:
+        return _textblob_chunk(texts)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    scores = []
+    # map() yields chunk results in submission order, so output order matches input
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_textblob_chunk, chunks):
+            scores.extend(part)
+    return scores
 
-df['sentiment_light'] = df['title'].apply(textblob_sent)
-if USE_TRANSFORMER:
-    df['sentiment_transformer'] = df['title'].apply(transformer_sent)
-    df['sentiment'] = df['sentiment_transformer'].fillna(df['sentiment_light'])
-else:
-    df['sentiment'] = df['sentiment_light']
+def run(df=None, save=True):
+    if df is None:
+        if not posts_exist():
+            raise SystemExit("No posts in data/posts/. Run app.py")
+        df = read_posts()
+    df['title'] = df['title'].fillna("").astype(str)
+
+    light_cache = ResultCache("sentiment_light", "textblob")
+    df['sentiment_light'] = cached_map(light_cache, df['title'], textblob_sentiments)
+    print(f"   TextBlob cache: {light_cache.stats()}")
+    light_cache.close()
+    if USE_TRANSFORMER:
+        tf_cache = ResultCache("sentiment_transformer", TRANSFORMER_MODEL, {"backend": TRANSFORMER_BACKEND, "max_tokens": MAX_TOKENS})
+        df['sentiment_transformer'] = cached_map(tf_cache, df['title'], transformer_sentiments)
+        print(f"   Transformer cache: {tf_cache.stats()}")
+        tf_cache.close()
+        df['sentiment'] = df['sentiment_transformer'].fillna(df['sentiment_light'])
+    else:
+        df['sentiment'] = df['sentiment_light']
+
+    if save:
+        write_posts(df)
+        print("✅ Sentiment added to data/posts/")
+    else:
+        print("✅ Sentiment scored")
+    return df
 
-df.to_csv(path, index=False)
-print("✅ Sentiment added to data/reddit_posts.csv")
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    run()
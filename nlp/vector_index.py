@@ -0,0 +1,106 @@
+# nlp/vector_index.py — Nearest-neighbour search over the embedding store
+# Uses an HNSW graph (hnswlib) when installed, persisted next to the vectors
+# and extended incrementally with new rows. Without hnswlib it falls back to an
+# exact inner-product search over an in-memory float32 copy of the matrix.
+import os
+import sys
+import json
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nlp.embeddings import EmbeddingStore
+
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = int(os.getenv("ANN_EF_SEARCH", "64"))
+
+
+def hnswlib_available():
+    try:
+        import hnswlib  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class VectorIndex:
+    def __init__(self, store=None, use_hnsw=None):
+        self.store = store or EmbeddingStore()
+        self.use_hnsw = hnswlib_available() if use_hnsw is None else use_hnsw
+        self.index_path = os.path.join(self.store.path, "hnsw.bin")
+        self.meta_path = os.path.join(self.store.path, "hnsw.json")
+        self.index = None
+        self.count = 0
+        self._dense = None
+
+    def _load(self):
+        import hnswlib
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        self.index = hnswlib.Index(space="ip", dim=self.store.dim)
+        if (meta.get("model") == self.store.model and meta.get("count", 0) <= len(self.store)
+                and os.path.exists(self.index_path)):
+            self.index.load_index(self.index_path, max_elements=max(len(self.store), 1))
+            self.count = meta["count"]
+        else:
+            self.index.init_index(max_elements=max(len(self.store), 1), ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+            self.count = 0
+        self.index.set_ef(HNSW_EF_SEARCH)
+
+    def update(self):
+        """Index rows added to the store since the last update; returns how many."""
+        total = len(self.store)
+        if not self.use_hnsw or total == 0:
+            self._dense = None
+            return 0
+        if self.index is None:
+            self._load()
+        added = total - self.count
+        if added <= 0:
+            return 0
+        if self.index.get_max_elements() < total:
+            self.index.resize_index(total)
+        vectors = self.store.vectors()
+        for start in range(self.count, total, 10000):
+            end = min(start + 10000, total)
+            self.index.add_items(np.asarray(vectors[start:end], dtype=np.float32), np.arange(start, end))
+        self.count = total
+        tmp = self.index_path + ".tmp"
+        self.index.save_index(tmp)
+        os.replace(tmp, self.index_path)
+        with open(self.meta_path + ".tmp", "w") as f:
+            json.dump({"model": self.store.model, "count": total}, f)
+        os.replace(self.meta_path + ".tmp", self.meta_path)
+        return added
+
+    def search(self, vectors, k=10):
+        """(rows, scores) of the k nearest stored posts for each query vector, best first."""
+        q = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        k = min(k, len(self.store))
+        if k == 0:
+            return np.zeros((len(q), 0), dtype=np.int64), np.zeros((len(q), 0), dtype=np.float32)
+        if self.use_hnsw:
+            if self.index is None:
+                self._load()
+            # An index that lags the store (update() not run yet) would miss the newest posts
+            if self.count == len(self.store):
+                labels, distances = self.index.knn_query(q, k=k)
+                return labels.astype(np.int64), 1.0 - distances  # hnswlib "ip" distance is 1 - dot
+        if self._dense is None or len(self._dense) != len(self.store):
+            self._dense = np.asarray(self.store.vectors(), dtype=np.float32)
+        scores = q @ self._dense.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def similar_posts(self, post_id, k=10):
+        """[(post_id, cosine similarity)] of the k posts most similar to post_id, excluding itself."""
+        row = self.store.rows([post_id])[0]
+        if row < 0:
+            return []
+        rows, scores = self.search(self.store.vectors()[row], k + 1)
+        return [(self.store.ids[r], float(s)) for r, s in zip(rows[0], scores[0]) if r != row][:k]
@@ -4,9 +4,13 @@ import pandas as pd
 import plotly.express as px
 from wordcloud import WordCloud
 import io, os
+from downsample import histogram_figure
+from dashboard_data import pin_version, load_posts, load_rollup, keyword_counts
 
 # Page settings - Must be first Streamlit command
 st.set_page_config(page_title="TrendVision AI - Overview", layout="wide", initial_sidebar_state="expanded")
+# Read one store snapshot for this whole rerun
+pin_version()
 
 # Always load CSS from project root
 css_path = os.path.join(os.path.dirname(__file__), "styles.css")
@@ -27,7 +31,7 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # Functional Top Navigation Bar
-nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1])
+nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1, 1])
 with nav_cols[0]: 
     if st.button("🏠 Home", use_container_width=True): st.switch_page("UI.py")
 with nav_cols[1]: 
@@ -41,29 +45,26 @@ with nav_cols[4]:
 with nav_cols[5]: 
     if st.button("⚔️ Compare", use_container_width=True): st.switch_page("pages/6_subreddit_comparison.py")
 with nav_cols[6]: 
+    if st.button("🌱 Topics", use_container_width=True): st.switch_page("pages/7_emerging_topics.py")
+with nav_cols[7]: 
     if st.button("⚙️ Settings", use_container_width=True): st.switch_page("pages/4_settings.py")
 
 st.title("📊 Market Overview")
 st.markdown("### Top Keywords & Sentiment Analysis")
 
-if not os.path.exists("data/reddit_posts.csv"):
+daily = load_rollup()
+if daily is None:
     st.warning("No data found. Run the pipeline.")
     st.stop()
-
-df = pd.read_csv("data/reddit_posts.csv")
-if 'sentiment' not in df.columns:
-    df['sentiment'] = 0
-else:
-    df['sentiment'] = pd.to_numeric(df['sentiment'], errors='coerce').fillna(0)
-if 'date' not in df.columns and 'created_utc' in df.columns:
-    df['date'] = pd.to_datetime(df['created_utc'], unit='s').dt.date
+df = load_posts(['sentiment'])
+kw_counts = keyword_counts(daily)
 
 col_left, col_right = st.columns([3, 2])
 
-if 'keyword' in df.columns:
+if not kw_counts.empty:
     with col_left:
         st.markdown('<div class="glass-card">', unsafe_allow_html=True)
-        topk = df['keyword'].value_counts().head(10).reset_index()
+        topk = kw_counts.head(10).reset_index()
         topk.columns = ['keyword','count']
         fig = px.bar(topk, x='keyword', y='count', color='count', 
                      color_continuous_scale=['#00BFA6','#7C3AED'],
@@ -77,16 +78,14 @@ else:
 with col_right:
     st.markdown('<div class="glass-card">', unsafe_allow_html=True)
     st.markdown("### 🎭 Sentiment Distribution")
-    fig2 = px.histogram(df, x='sentiment', nbins=20, color_discrete_sequence=['#7C3AED'])
+    fig2 = histogram_figure(df['sentiment'], nbins=20, color='#7C3AED')
     fig2.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='#fafafa', height=350)
     st.plotly_chart(fig2, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
 st.markdown('<div class="glass-card" style="margin-top:20px;">', unsafe_allow_html=True)
 st.markdown("### ☁️ Visual Trend Cloud")
-if 'keyword' in df.columns:
-    text = " ".join(df['keyword'].dropna().astype(str))
-    if text.strip():
-        wc = WordCloud(width=800, height=350, background_color='black', colormap='cool', mode='RGBA').generate(text)
-        st.image(wc.to_image(), use_container_width=True)
+if not kw_counts.empty:
+    wc = WordCloud(width=800, height=350, background_color='black', colormap='cool', mode='RGBA').generate_from_frequencies(kw_counts.to_dict())
+    st.image(wc.to_image(), use_container_width=True)
 st.markdown('</div>', unsafe_allow_html=True)
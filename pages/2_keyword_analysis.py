@@ -1,12 +1,17 @@
 # pages/2_keyword_analysis.py
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 from st_aggrid import AgGrid, GridOptionsBuilder
 import os
+from downsample import box_figure, downsample_lines, histogram_figure, sample_scatter
+from dashboard_data import pin_version, post_grid, load_rollup, keyword_counts, similar_posts
 
 # Page settings - Must be first Streamlit command
 st.set_page_config(page_title="TrendVision AI - Analysis", layout="wide", initial_sidebar_state="expanded")
+# Read one store snapshot for this whole rerun
+pin_version()
 
 # Always load CSS from project root
 css_path = os.path.join(os.path.dirname(__file__), "styles.css")
@@ -27,7 +32,7 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # Functional Top Navigation Bar
-nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1])
+nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1, 1])
 with nav_cols[0]: 
     if st.button("🏠 Home", use_container_width=True): st.switch_page("UI.py")
 with nav_cols[1]: 
@@ -41,43 +46,72 @@ with nav_cols[4]:
 with nav_cols[5]: 
     if st.button("⚔️ Compare", use_container_width=True): st.switch_page("pages/6_subreddit_comparison.py")
 with nav_cols[6]: 
+    if st.button("🌱 Topics", use_container_width=True): st.switch_page("pages/7_emerging_topics.py")
+with nav_cols[7]: 
     if st.button("⚙️ Settings", use_container_width=True): st.switch_page("pages/4_settings.py")
 
 
 st.title("🔍 Keyword Deep Dive")
-if not os.path.exists("data/reddit_posts.csv"):
+grid = post_grid(['id', 'created_utc', 'title', 'keyword', 'score', 'num_comments', 'sentiment'])
+if grid is None:
     st.warning("No data found.")
     st.stop()
 
-df = pd.read_csv("data/reddit_posts.csv")
-if 'sentiment' not in df.columns:
-    df['sentiment'] = 0
-else:
-    df['sentiment'] = pd.to_numeric(df['sentiment'], errors='coerce').fillna(0)
-
-df['created_utc'] = pd.to_numeric(df['created_utc'], errors='coerce')
-df['date'] = pd.to_datetime(df['created_utc'], unit='s').dt.date
-
+df = grid.df
 if 'keyword' not in df.columns:
     st.warning("Keywords not found in data. Please run the pipeline via Settings.")
     st.stop()
 
-df['keyword'] = df['keyword'].astype(str).replace('nan', '')
-kw_list = sorted([k for k in df['keyword'].unique() if k.strip()])
+daily = load_rollup()
+kw_list = sorted([k for k in keyword_counts(daily).index if k.strip()])
 
 selected = st.selectbox("Select keyword", ["(all)"]+kw_list)
-shown = df if selected=="(all)" else df[df['keyword']==selected]
+keyword = None if selected=="(all)" else selected
 
 st.markdown("### 📋 Raw Data Explorer")
-gb = GridOptionsBuilder.from_dataframe(shown[['date','title','keyword','score','sentiment']])
-gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=10)
-gb.configure_default_column(groupable=True, sortable=True, filter=True)
-gb.configure_column("sentiment", type=["numericColumn","numberColumnFilter"], precision=2)
-AgGrid(shown[['date','title','keyword','score','sentiment']], gridOptions=gb.build(), height=350)
+# Sorting, filtering and paging happen here; only the visible page is sent to the browser
+SORTS = {"Newest": ("created_utc", True), "Oldest": ("created_utc", False), "Top score": ("score", True),
+         "Most comments": ("num_comments", True), "Most positive": ("sentiment", True), "Most negative": ("sentiment", False)}
+f1, f2, f3, f4 = st.columns([3, 2, 1, 1])
+with f1:
+    search = st.text_input("Title contains", key="grid_search")
+with f2:
+    sort_label = st.selectbox("Sort by", list(SORTS), key="grid_sort")
+with f3:
+    page_size = st.selectbox("Rows", [10, 25, 50, 100], key="grid_page_size")
+positions = grid.query(keyword, search, *SORTS[sort_label])
+n_pages = max(1, -(-len(positions) // page_size))
+with f4:
+    # Keyed on the query so a new filter starts again at page 1
+    page = st.number_input("Page", min_value=1, max_value=n_pages, value=1,
+                           key=f"grid_page:{selected}:{search}:{sort_label}:{page_size}")
+window = grid.page(positions, page - 1, page_size, ['date','title','keyword','score','sentiment'])
+gb = GridOptionsBuilder.from_dataframe(window)
+gb.configure_default_column(sortable=False, filter=False)
+gb.configure_column("sentiment", type=["numericColumn"], precision=2)
+AgGrid(window, gridOptions=gb.build(), height=min(350, 60 + 30 * len(window)) if len(window) else 100, key="grid_window")
+st.caption(f"{len(positions):,} posts · page {page} of {n_pages}")
+
+st.markdown("### 🧭 Similar Posts")
+recent = grid.page(grid.query(keyword, sort='created_utc', descending=True), 0, 500)
+if not recent.empty:
+    titles = dict(zip(recent['id'], recent['title']))
+    pick = st.selectbox("Find posts similar to", list(titles), format_func=lambda pid: titles[pid])
+    matches = similar_posts(pick, k=10)
+    if matches is None:
+        st.info("No post embeddings yet. Run the pipeline via Settings.")
+    elif matches:
+        sim = pd.DataFrame(matches, columns=['id', 'similarity'])
+        sim = sim.merge(df[['id', 'date', 'title', 'keyword', 'score']], on='id', how='left')
+        st.dataframe(sim[['similarity', 'date', 'title', 'keyword', 'score']], hide_index=True,
+                     use_container_width=True, column_config={"similarity": st.column_config.NumberColumn(format="%.2f")})
+    else:
+        st.caption("This post has not been embedded yet.")
 
 st.subheader(f"Sentiment Distribution: {selected}")
+shown = grid.take(grid.rows(keyword), ['sentiment'])
 if not shown.empty:
-    fig = px.histogram(shown, x='sentiment', nbins=25, color_discrete_sequence=['#00BFA6'], marginal="box")
+    fig = histogram_figure(shown['sentiment'], nbins=25, color='#00BFA6', box=True)
     fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='#fafafa', bargap=0.1)
     st.plotly_chart(fig, use_container_width=True)
 
@@ -93,7 +127,7 @@ if len(kw_list) >= 2:
         b = st.selectbox("Keyword B", kw_list, index=1, key="comp_b")
     
     if a and b:
-        cmp_df = df[df['keyword'].isin([a,b])].copy()
+        cmp_df = grid.take(np.concatenate([grid.rows(a), grid.rows(b)])).copy()
         
         # Metrics
         m1, m2, m3, m4 = st.columns(4)
@@ -106,13 +140,14 @@ if len(kw_list) >= 2:
         with m4: st.markdown('<div class="glass-card">', unsafe_allow_html=True); st.metric(f"{b} Sent", f"{df_b['sentiment'].mean():.2f}"); st.markdown('</div>', unsafe_allow_html=True)
 
         st.markdown("#### ❤️ Sentiment Comparison")
-        fig_box = px.box(cmp_df, x='keyword', y='sentiment', color='keyword', 
-                         color_discrete_map={a: '#00BFA6', b: '#7C3AED'})
+        fig_box = box_figure({a: df_a['sentiment'], b: df_b['sentiment']},
+                             colors={a: '#00BFA6', b: '#7C3AED'}, y_title='sentiment')
         fig_box.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='#fafafa')
         st.plotly_chart(fig_box, use_container_width=True)
 
         st.markdown("#### 📈 Volume Trends")
-        cmp_agg = cmp_df.groupby(['date','keyword']).size().reset_index(name='count')
+        cmp_agg = daily[daily['keyword'].isin([a,b])].groupby(['date','keyword'])['posts'].sum().reset_index(name='count')
+        cmp_agg = downsample_lines(cmp_agg, 'date', 'count', color='keyword')
         if not cmp_agg.empty:
             fig2 = px.line(cmp_agg, x='date', y='count', color='keyword', markers=True, 
                            color_discrete_map={a: '#00BFA6', b: '#7C3AED'})
@@ -130,13 +165,16 @@ if len(kw_list) >= 2:
             st.markdown("#### 💠 Engagement vs. Sentiment")
             st.caption("Do positive or negative posts get more upvotes?")
             cmp_df['num_comments'] = cmp_df['num_comments'].fillna(0)
-            fig_scatter = px.scatter(cmp_df, x='sentiment', y='score', color='keyword', 
+            points = sample_scatter(cmp_df, by='keyword')
+            fig_scatter = px.scatter(points, x='sentiment', y='score', color='keyword', 
                                      size='num_comments', hover_data=['title'],
                                      color_discrete_map={a: '#00BFA6', b: '#7C3AED'},
                                      labels={'score': 'Upvotes', 'sentiment': 'Sentiment Score'},
                                      opacity=0.8)
             fig_scatter.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='#fafafa')
             st.plotly_chart(fig_scatter, use_container_width=True)
+            if len(points) < len(cmp_df):
+                st.caption(f"Showing a sample of {len(points):,} of {len(cmp_df):,} posts.")
             
         with col_adv2:
             st.markdown("#### 📊 Average Engagement")
@@ -3,6 +3,7 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import os
+from dashboard_data import load_forecast, load_series_forecast
 
 # Page settings - Must be first Streamlit command
 st.set_page_config(page_title="TrendVision AI - Forecast", layout="wide", initial_sidebar_state="expanded")
@@ -23,7 +24,7 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # Functional Top Navigation Bar
-nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1])
+nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1, 1])
 with nav_cols[0]: 
     if st.button("🏠 Home", use_container_width=True): st.switch_page("UI.py")
 with nav_cols[1]: 
@@ -37,23 +38,22 @@ with nav_cols[4]:
 with nav_cols[5]: 
     if st.button("⚔️ Compare", use_container_width=True): st.switch_page("pages/6_subreddit_comparison.py")
 with nav_cols[6]: 
+    if st.button("🌱 Topics", use_container_width=True): st.switch_page("pages/7_emerging_topics.py")
+with nav_cols[7]: 
     if st.button("⚙️ Settings", use_container_width=True): st.switch_page("pages/4_settings.py")
 
 st.title("🔮 AI Trend Forecast")
 
-if not os.path.exists("data/forecast.csv"):
+df = load_forecast()
+if df is None:
     st.warning("No forecast data found. Please run the pipeline via Settings.")
     st.stop()
-
-df = pd.read_csv("data/forecast.csv")
 # Prophet outputs 'ds' as date string, 'yhat' as value
 
 if df.empty:
     st.warning("Forecast data is empty. Try running the pipeline again.")
     st.stop()
 
-df['ds'] = pd.to_datetime(df['ds'])
-
 st.markdown('<div class="glass-card">', unsafe_allow_html=True)
 st.markdown("### 📈 AI Post Volume Forecast")
 st.caption("Predicting community engagement for the next 7 days using Prophet AI.")
@@ -65,4 +65,23 @@ st.plotly_chart(fig, use_container_width=True)
 st.markdown('</div>', unsafe_allow_html=True)
 
 with st.expander("View Raw Forecast Data"):
-    st.dataframe(df)
\ No newline at end of file
+    st.dataframe(df)
+
+series = load_series_forecast()
+if series is not None and not series.empty:
+    st.markdown('<div class="glass-card">', unsafe_allow_html=True)
+    st.markdown("### 🧩 Forecast by Keyword & Subreddit")
+    kind = st.radio("Series type", ["keyword", "subreddit"], horizontal=True)
+    of_kind = series[series['kind'] == kind]
+    if of_kind.empty:
+        st.info(f"No {kind} series had enough history to forecast.")
+    else:
+        # Rank by total predicted volume so the busiest series come first
+        ranked = of_kind.groupby('name')['yhat'].sum().sort_values(ascending=False).index.tolist()
+        picked = st.multiselect(f"Compare {kind}s", ranked, default=ranked[:3])
+        shown = of_kind[of_kind['name'].isin(picked)]
+        fig_s = px.line(shown, x='ds', y='yhat', color='name', markers=True)
+        fig_s.update_layout(xaxis_title="", yaxis_title="Predicted Posts", plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='#fafafa', height=400)
+        st.plotly_chart(fig_s, use_container_width=True)
+        st.caption(f"Model: {of_kind['model'].iat[0]}")
+    st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
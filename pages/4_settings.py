@@ -1,8 +1,10 @@
 # pages/4_settings.py
 import streamlit as st
-import subprocess
-import sys
 import os
+import time
+import pandas as pd
+from pipeline import DEFAULT_STAGES, read_status, request_run
+from scheduler import JOBS
 
 # Page settings - Must be first Streamlit command
 st.set_page_config(page_title="TrendVision AI - Settings", layout="wide", initial_sidebar_state="expanded")
@@ -23,7 +25,7 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # Functional Top Navigation Bar
-nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1])
+nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1, 1])
 with nav_cols[0]: 
     if st.button("🏠 Home", use_container_width=True): st.switch_page("UI.py")
 with nav_cols[1]: 
@@ -37,78 +39,111 @@ with nav_cols[4]:
 with nav_cols[5]: 
     if st.button("⚔️ Compare", use_container_width=True): st.switch_page("pages/6_subreddit_comparison.py")
 with nav_cols[6]: 
+    if st.button("🌱 Topics", use_container_width=True): st.switch_page("pages/7_emerging_topics.py")
+with nav_cols[7]: 
     if st.button("⚙️ Settings", use_container_width=True): st.switch_page("pages/4_settings.py")
 
 st.title("⚙️ Control Panel")
 
 st.info("Ensure your `.env` file is configured with Reddit API credentials before running the pipeline.")
 
+# Runs are queued for the scheduler (pipeline.request_run) rather than executed inside the dashboard process
+step_labels = {
+    "fetch": "1. Fetch Reddit data",
+    "comments": "2. Fetch new comments",
+    "embeddings": "3. Embed new posts",
+    "keywords": "4. Extract semantic keywords",
+    "topics": "5. Assign topics",
+    "sentiment": "6. Analyze sentiment",
+    "rollups": "7. Materialize dashboard rollups",
+    "topic_trends": "8. Rank emerging topics",
+    "news": "9. Prefetch news for top keywords",
+    "alerts": "10. Send spike / topic / rising-post alerts",
+    "forecast": "11. Generate predictive forecast",
+    "forecast_series": "12. Forecast keyword & subreddit series",
+}
+
+pipeline_status = read_status()
+heartbeat = pipeline_status.get("scheduler", {}).get("heartbeat", {}).get("at")
+scheduler_up = bool(heartbeat) and time.time() - heartbeat < 2 * 60
+
+
+def ago(ts):
+    if not ts:
+        return "never"
+    mins = (time.time() - ts) / 60
+    return f"{mins:.0f} min ago" if mins < 120 else f"{mins / 60:.1f} h ago"
+
+
+def queue_run(stages, label):
+    request_run(stages)
+    st.toast(f"Queued: {label}")
+    if not scheduler_up:
+        st.warning("Queued, but the scheduler is not running. Start it with `python scheduler.py` to execute the run.")
+
+
 col1, col2 = st.columns([2, 1])
 
 with col1:
     st.subheader("🚀 Data Pipeline Control")
 
     if st.button("🔥 Run Full Pipeline (All Steps)", type="primary", use_container_width=True):
-        with st.status("Executing full intelligence pipeline...", expanded=True) as status:
-            st.write("1. Fetching Reddit data...")
-            subprocess.run([sys.executable, "app.py"], check=True)
-            st.write("2. Extracting semantic keywords...")
-            subprocess.run([sys.executable, os.path.join("nlp", "keywords.py")], check=True)
-            st.write("3. Analyzing sentiment patterns...")
-            subprocess.run([sys.executable, os.path.join("nlp", "sentiment.py")], check=True)
-            st.write("4. Generating predictive forecast...")
-            subprocess.run([sys.executable, os.path.join("forecast", "forecast.py")], check=True)
-            status.update(label="Pipeline Complete!", state="complete", expanded=False)
-        st.success("System initialized successfully!")
+        queue_run(DEFAULT_STAGES, "full pipeline")
 
     st.markdown("---")
     st.subheader("🛠️ Individual Steps")
-    
-    if st.button("1. Fetch Data (app.py)", use_container_width=True):
-        with st.spinner("Fetching data from Reddit..."):
-            res = subprocess.run([sys.executable, "app.py"], capture_output=True, text=True)
-            if res.returncode == 0:
-                st.success("Data fetched successfully!")
-                with st.expander("View Logs"):
-                    st.code(res.stdout)
-            else:
-                st.error("Error fetching data")
-                st.code(res.stderr)
-
-    if st.button("2. Extract Keywords (nlp/keywords.py)", use_container_width=True):
-        with st.spinner("Extracting keywords (this may take a moment)..."):
-            res = subprocess.run([sys.executable, os.path.join("nlp", "keywords.py")], capture_output=True, text=True)
-            if res.returncode == 0:
-                st.success("Keywords extracted!")
-                with st.expander("View Logs"):
-                    st.code(res.stdout)
-            else:
-                st.error("Extraction failed")
-                st.code(res.stderr)
-
-    if st.button("3. Analyze Sentiment (nlp/sentiment.py)", use_container_width=True):
-        with st.spinner("Analyzing sentiment..."):
-            res = subprocess.run([sys.executable, os.path.join("nlp", "sentiment.py")], capture_output=True, text=True)
-            if res.returncode == 0:
-                st.success("Sentiment analysis complete!")
-                with st.expander("View Logs"):
-                    st.code(res.stdout)
-            else:
-                st.error("Analysis failed")
-                st.code(res.stderr)
-
-    if st.button("4. Generate Forecast (forecast/forecast.py)", use_container_width=True):
-        with st.spinner("Generating forecast..."):
-            res = subprocess.run([sys.executable, os.path.join("forecast", "forecast.py")], capture_output=True, text=True)
-            if res.returncode == 0:
-                st.success("Forecast generated!")
-                with st.expander("View Logs"):
-                    st.code(res.stdout)
-            else:
-                st.error("Forecasting failed")
-                st.code(res.stderr)
+
+    # Each step queues what it needs to be visible on the dashboards, not just the one stage
+    steps = [
+        ("1. Fetch & Process New Posts", JOBS["ingest"][1]),
+        ("2. Extract Keywords", ["keywords", "rollups"]),
+        ("3. Analyze Sentiment", ["sentiment", "rollups"]),
+        ("4. Generate Forecast", JOBS["forecast"][1]),
+    ]
+    for label, stages in steps:
+        if st.button(label, use_container_width=True):
+            queue_run(stages, label)
+        st.caption(" → ".join(stages))
+
+    pending = pipeline_status.get("requests", [])
+    if pending:
+        st.info("⏳ Waiting for the scheduler:\n\n" + "\n\n".join(
+            f"{' → '.join(r['stages'])} (queued {ago(r.get('requested_at'))}"
+            + (f", {r['attempts']} failed attempts)" if r.get('attempts') else ")") for r in pending))
 
 with col2:
+    st.subheader("🩺 Pipeline Status")
+    if st.button("🔄 Refresh status", use_container_width=True):
+        st.rerun()
+
+    if scheduler_up:
+        st.success(f"Scheduler running (last heartbeat {ago(heartbeat)})")
+    else:
+        st.warning("Scheduler not running. Start it with `python scheduler.py`.")
+
+    stages = pipeline_status.get("stages", {})
+    if stages:
+        order = list(step_labels) + [name for name in stages if name not in step_labels]
+        st.dataframe(pd.DataFrame([
+            {"Stage": step_labels.get(name, name), "State": s.get("state"), "Last success": ago(s.get("last_success")),
+             "Duration (s)": round(s.get("duration") or 0, 1)}
+            for name in order if (s := stages.get(name))
+        ]), hide_index=True, use_container_width=True)
+        for name, s in stages.items():
+            if s.get("state") == "failed":
+                st.error(f"{name}: {s.get('error')}")
+    jobs = pipeline_status.get("jobs", {})
+    if jobs:
+        st.dataframe(pd.DataFrame([
+            {"Job": name, "State": j.get("state"), "Last success": ago(j.get("last_success")),
+             "Next run": time.strftime('%H:%M', time.localtime(j['next_run'])) if j.get("next_run") else "—"}
+            for name, j in jobs.items()
+        ]), hide_index=True, use_container_width=True)
+        for name, j in jobs.items():
+            if j.get("state") == "failed":
+                st.error(f"{name}: {j.get('error')}")
+
+    st.markdown("---")
     st.subheader("⚙️ Configuration")
     st.markdown("To update your API credentials or subreddit list, please edit the `.env` file in the project root directory directly for security reasons.")
     st.warning("The environment file is now hidden from the UI to protect your sensitive API keys.")
\ No newline at end of file
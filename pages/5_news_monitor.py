@@ -1,11 +1,15 @@
 # pages/5_news_monitor.py
 import streamlit as st
 import pandas as pd
-import feedparser
 import os
+import time
+from dashboard_data import pin_version, load_rollup, keyword_counts
+from news_service import NewsService
 
 # Page settings - Must be first Streamlit command
 st.set_page_config(page_title="TrendVision AI - News", layout="wide", initial_sidebar_state="expanded")
+# Read one store snapshot for this whole rerun
+pin_version()
 
 # Load CSS
 css_path = os.path.join(os.path.dirname(__file__), "..", "styles.css")
@@ -23,7 +27,7 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # Functional Top Navigation Bar
-nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1])
+nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1, 1])
 with nav_cols[0]: 
     if st.button("🏠 Home", use_container_width=True): st.switch_page("UI.py")
 with nav_cols[1]: 
@@ -37,28 +41,42 @@ with nav_cols[4]:
 with nav_cols[5]: 
     if st.button("⚔️ Compare", use_container_width=True): st.switch_page("pages/6_subreddit_comparison.py")
 with nav_cols[6]: 
+    if st.button("🌱 Topics", use_container_width=True): st.switch_page("pages/7_emerging_topics.py")
+with nav_cols[7]: 
     if st.button("⚙️ Settings", use_container_width=True): st.switch_page("pages/4_settings.py")
 
 st.title("📰 Global News Monitor")
 st.markdown("### Connect Reddit Trends to Real-World Events")
 
-if not os.path.exists("data/reddit_posts.csv"):
+daily = load_rollup()
+if daily is None:
     st.warning("No data found. Please run the pipeline first.")
     st.stop()
 
-df = pd.read_csv("data/reddit_posts.csv")
-
-if 'keyword' not in df.columns:
+kw_counts = keyword_counts(daily)
+if kw_counts.empty:
     st.warning("Keywords not extracted yet. Run the pipeline.")
     st.stop()
 
 # Get top keywords
-top_keywords = df['keyword'].value_counts().head(10).index.tolist()
+top_keywords = [k for k in kw_counts.index if str(k).strip()][:10]
 
 if not top_keywords:
     st.info("No keywords found to search for.")
     st.stop()
 
+@st.cache_data(ttl=60, show_spinner="Fetching latest news...")
+def load_news(keywords):
+    # Served from data/news_cache.db; only keywords past their TTL (normally prefetched by the
+    # pipeline) hit the network, all at once, so radio clicks never wait on a feed
+    service = NewsService()
+    service.refresh(keywords)
+    news = {kw: service.get(kw) for kw in keywords}
+    service.close()
+    return news
+
+news = load_news(tuple(top_keywords))
+
 col1, col2 = st.columns([1, 3])
 
 with col1:
@@ -68,15 +86,15 @@ with col1:
 with col2:
     st.subheader(f"Latest News: {selected_kw.title()}")
     
-    # Fetch Google News RSS
-    rss_url = f"https://news.google.com/rss/search?q={selected_kw.replace(' ', '+')}&hl=en-US&gl=US&ceid=US:en"
-    feed = feedparser.parse(rss_url)
-    
-    if not feed.entries:
+    entries, fetched = news[selected_kw]
+    if fetched:
+        st.caption(f"Updated {max(0, (time.time() - fetched) / 60):.0f} min ago")
+
+    if not entries:
         st.info("No recent news found for this topic.")
     
-    for entry in feed.entries[:8]:
+    for entry in entries[:8]:
         with st.container():
-            st.markdown(f"#### [{entry.title}]({entry.link})")
-            st.caption(f"📅 {entry.published} | 🔗 {entry.source.title}")
+            st.markdown(f"#### [{entry['title']}]({entry['link']})")
+            st.caption(f"📅 {entry['published']} | 🔗 {entry['source']}")
             st.markdown("---")
\ No newline at end of file
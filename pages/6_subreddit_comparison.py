@@ -2,9 +2,12 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import os
+from dashboard_data import pin_version, load_rollup
 
 # Page settings - Must be first Streamlit command
 st.set_page_config(page_title="TrendVision AI - Comparison", layout="wide", initial_sidebar_state="expanded")
+# Read one store snapshot for this whole rerun
+pin_version()
 
 # Load CSS
 css_path = os.path.join(os.path.dirname(__file__), "..", "styles.css")
@@ -22,7 +25,7 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # Functional Top Navigation Bar
-nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1])
+nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1, 1])
 with nav_cols[0]: 
     if st.button("🏠 Home", use_container_width=True): st.switch_page("UI.py")
 with nav_cols[1]: 
@@ -36,27 +39,29 @@ with nav_cols[4]:
 with nav_cols[5]: 
     if st.button("⚔️ Compare", use_container_width=True): st.switch_page("pages/6_subreddit_comparison.py")
 with nav_cols[6]: 
+    if st.button("🌱 Topics", use_container_width=True): st.switch_page("pages/7_emerging_topics.py")
+with nav_cols[7]: 
     if st.button("⚙️ Settings", use_container_width=True): st.switch_page("pages/4_settings.py")
 
 st.title("⚔️ Community Intelligence")
 st.markdown("### Compare Subreddit Performance & Sentiment")
 
-if not os.path.exists("data/reddit_posts.csv"):
+daily = load_rollup()
+if daily is None:
     st.warning("No data found. Please run the pipeline first.")
     st.stop()
 
-df = pd.read_csv("data/reddit_posts.csv")
-
-if 'subreddit' not in df.columns:
+if daily['subreddit'].isna().all():
     st.error("Subreddit data missing.")
     st.stop()
 
-# Aggregation
-sub_stats = df.groupby('subreddit').agg({
-    'id': 'count',
-    'score': 'mean',
-    'num_comments': 'mean',
-    'sentiment': 'mean'
+# Aggregation (from the daily rollup: sums / post counts = means)
+totals = daily.groupby('subreddit')[['posts', 'score_sum', 'comments_sum', 'sentiment_sum']].sum()
+sub_stats = pd.DataFrame({
+    'posts': totals['posts'],
+    'score': totals['score_sum'] / totals['posts'],
+    'num_comments': totals['comments_sum'] / totals['posts'],
+    'sentiment': totals['sentiment_sum'] / totals['posts'],
 }).reset_index()
 
 sub_stats.columns = ['Subreddit', 'Post Volume', 'Avg Score', 'Avg Comments', 'Avg Sentiment']
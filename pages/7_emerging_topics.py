@@ -0,0 +1,89 @@
+# pages/7_emerging_topics.py
+import streamlit as st
+import plotly.express as px
+import os
+from downsample import downsample_lines
+from dashboard_data import load_topic_trends, load_emerging_topics
+
+# Page settings - Must be first Streamlit command
+st.set_page_config(page_title="TrendVision AI - Topics", layout="wide", initial_sidebar_state="expanded")
+
+# Load CSS
+css_path = os.path.join(os.path.dirname(__file__), "..", "styles.css")
+if os.path.exists(css_path):
+    with open(css_path) as f:
+        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+
+# Sidebar Branding
+with st.sidebar:
+    st.markdown("""
+        <div style="padding: 10px; text-align: center;">
+            <h2 style="color: #7C3AED; margin-bottom: 0;">TV AI</h2>
+            <hr style="margin: 10px 0; border-color: rgba(255,255,255,0.1);">
+        </div>
+    """, unsafe_allow_html=True)
+
+# Functional Top Navigation Bar
+nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1, 1])
+with nav_cols[0]: 
+    if st.button("🏠 Home", use_container_width=True): st.switch_page("UI.py")
+with nav_cols[1]: 
+    if st.button("📊 Overview", use_container_width=True): st.switch_page("pages/1_overview.py")
+with nav_cols[2]: 
+    if st.button("🔍 Analysis", use_container_width=True): st.switch_page("pages/2_keyword_analysis.py")
+with nav_cols[3]: 
+    if st.button("🔮 Forecast", use_container_width=True): st.switch_page("pages/3_forecast.py")
+with nav_cols[4]: 
+    if st.button("📰 News", use_container_width=True): st.switch_page("pages/5_news_monitor.py")
+with nav_cols[5]: 
+    if st.button("⚔️ Compare", use_container_width=True): st.switch_page("pages/6_subreddit_comparison.py")
+with nav_cols[6]: 
+    if st.button("🌱 Topics", use_container_width=True): st.switch_page("pages/7_emerging_topics.py")
+with nav_cols[7]: 
+    if st.button("⚙️ Settings", use_container_width=True): st.switch_page("pages/4_settings.py")
+
+st.title("🌱 Emerging Topics")
+
+ranking = load_emerging_topics()
+if ranking is None or ranking.empty:
+    st.warning("No topic trends yet. Set USE_BERTOPIC=true in `.env` and run the pipeline via Settings.")
+    st.stop()
+
+view = st.radio("Window", ["hourly", "daily"], horizontal=True, format_func=str.capitalize)
+st.caption("Topics are scored by how far their recent volume sits above their own baseline "
+           "(hourly: last 6h vs. the 48h before; daily: last 3 days vs. the 14 before).")
+ranked = ranking[ranking['freq'] == view].reset_index(drop=True)
+
+st.markdown('<div class="glass-card">', unsafe_allow_html=True)
+st.markdown("### 🚀 Fastest-growing topics")
+top = ranked.head(15)
+fig = px.bar(top.iloc[::-1], x='score', y='name', orientation='h', color='sentiment',
+             color_continuous_scale='RdYlGn', range_color=(-1, 1),
+             hover_data=['recent_posts', 'growth', 'acceleration'])
+fig.update_layout(xaxis_title="Trend score", yaxis_title="", plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='#fafafa', height=450)
+st.plotly_chart(fig, use_container_width=True)
+st.markdown('</div>', unsafe_allow_html=True)
+
+with st.expander("View Ranking"):
+    st.dataframe(ranked[['name', 'recent_posts', 'recent_rate', 'baseline_rate', 'growth', 'acceleration', 'score', 'sentiment']],
+                 hide_index=True, use_container_width=True)
+
+series = load_topic_trends("h" if view == "hourly" else "D")
+if series is not None and not series.empty:
+    st.markdown('<div class="glass-card">', unsafe_allow_html=True)
+    st.markdown("### 📈 Topic Volume & Sentiment")
+    names = dict(zip(ranked['topic'], ranked['name']))
+    picked = st.multiselect("Topics", list(names), default=list(names)[:3], format_func=lambda t: names[t])
+    shown = series[series['topic'].isin(picked)].assign(name=lambda d: d['topic'].map(names))
+    volume = downsample_lines(shown, 'ts', 'posts', color='name')
+    sentiment = downsample_lines(shown[shown['posts'] > 0], 'ts', 'sentiment', color='name')
+    c1, c2 = st.columns(2)
+    with c1:
+        fig_v = px.line(volume, x='ts', y='posts', color='name')
+        fig_v.update_layout(xaxis_title="", yaxis_title="Posts", plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='#fafafa')
+        st.plotly_chart(fig_v, use_container_width=True)
+    with c2:
+        fig_s = px.line(sentiment, x='ts', y='sentiment', color='name')
+        fig_s.update_layout(xaxis_title="", yaxis_title="Mean sentiment", plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='#fafafa')
+        st.plotly_chart(fig_s, use_container_width=True)
+    st.markdown('</div>', unsafe_allow_html=True)
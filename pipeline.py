@@ -0,0 +1,366 @@
+# pipeline.py — In-process pipeline runner
+# Runs ingestion → NLP → rollups → forecast inside one interpreter. The posts frame is
+# loaded once and handed between stages in memory; NLP models stay loaded in
+# their modules for the life of the process (e.g. the scheduler).
+# Each stage keeps its own CLI (python app.py, python nlp/keywords.py, ...).
+# Runs hold an exclusive file lock so the scheduler and dashboard buttons never
+# write the data files at the same time, and record per-stage status/freshness
+# in data/pipeline_status.json for the dashboard to display. Dashboard buttons queue
+# runs in the same file (request_run) for the scheduler to pick up.
+# After a fetch, the NLP stages only process the days that received posts, and
+# only those day partitions are rewritten when the run saves.
+import os
+import sys
+import json
+import time
+import uuid
+import contextlib
+import pandas as pd
+from storage import DATA_DIR, partition_keys, posts_exist, read_posts, rewrite_partitions, write_posts
+
+LOCK_PATH = os.path.join(DATA_DIR, "pipeline.lock")
+STATUS_PATH = os.path.join(DATA_DIR, "pipeline_status.json")
+STATUS_LOCK_PATH = os.path.join(DATA_DIR, "pipeline_status.lock")
+
+
+class PipelineError(Exception):
+    def __init__(self, stage, error):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class PipelineBusy(PipelineError):
+    def __init__(self):
+        Exception.__init__(self, "Another pipeline run is in progress.")
+        self.stage = None
+        self.error = None
+
+
+def _try_lock(f):
+    try:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except ImportError:
+        import msvcrt
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    try:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    except ImportError:
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def _file_lock(path, timeout=None, poll=0.5):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(path, "a+") as f:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not _try_lock(f):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise PipelineBusy()
+            time.sleep(poll)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+def pipeline_lock(timeout=None):
+    """Exclusive, cross-process lock on the data files. timeout=None waits forever."""
+    return _file_lock(LOCK_PATH, timeout)
+
+
+def read_status():
+    """{"stages": {name: {...}}, "jobs": {...}, "requests": [...]} as last written by pipeline runs and the scheduler."""
+    try:
+        with open(STATUS_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"stages": {}, "jobs": {}}
+
+
+@contextlib.contextmanager
+def _edit_status():
+    """Read-modify-write of the status file. The scheduler, pipeline runs, the stream ingester
+    and the dashboard all write it, so edits are serialized by their own short-lived lock."""
+    with _file_lock(STATUS_LOCK_PATH, poll=0.05):
+        status = read_status()
+        yield status
+        tmp = f"{STATUS_PATH}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(status, f, indent=2, default=str)
+        os.replace(tmp, STATUS_PATH)
+
+
+def update_status(section, name, **fields):
+    with _edit_status() as status:
+        status.setdefault(section, {}).setdefault(name, {}).update(fields)
+
+
+def request_run(stages):
+    """Queue a run for the scheduler (e.g. from a dashboard button) instead of running it in-process."""
+    with _edit_status() as status:
+        status.setdefault("requests", []).append({"id": uuid.uuid4().hex, "stages": list(stages),
+                                                  "requested_at": time.time(), "attempts": 0})
+
+
+def pending_requests():
+    """Queued run requests, oldest first. They stay queued until finish_request()."""
+    return list(read_status().get("requests", []))
+
+
+def finish_request(request_id):
+    with _edit_status() as status:
+        status["requests"] = [r for r in status.get("requests", []) if r.get("id") != request_id]
+
+
+def retry_request(request_id, delay):
+    """Count a failed attempt and leave the request queued until `delay` seconds from now."""
+    with _edit_status() as status:
+        for r in status.get("requests", []):
+            if r.get("id") == request_id:
+                r.update(attempts=r.get("attempts", 0) + 1, retry_at=time.time() + delay)
+
+
+class PipelineContext:
+    """Shared state for one run: the in-memory posts frame and which parts of it need saving."""
+
+    def __init__(self):
+        self._posts = None
+        # Whole frame replaced (full rewrite) vs. only some day partitions changed
+        self.dirty = False
+        self.dirty_partitions = set()
+        # Dates that received new posts in this run; None = unknown (fetch did not run)
+        self.changed_days = None
+        self.rollup = None
+        self.topic_ranking = None
+
+    def posts(self):
+        if self._posts is None:
+            if not posts_exist():
+                raise SystemExit("No posts in data/posts/. Run the fetch stage first.")
+            self._posts = read_posts()
+        return self._posts
+
+    def work(self, column):
+        """Rows a stage deriving `column` has to process. When fetch ran, that is only the
+        days that received posts plus rows still missing the column; otherwise every row."""
+        df = self.posts()
+        if self.changed_days is None or column not in df.columns:
+            return df
+        days = pd.to_datetime(pd.to_numeric(df['created_utc'], errors='coerce'), unit='s').dt.date
+        return df[days.isin(self.changed_days) | df[column].isna()].copy()
+
+    def set_posts(self, df):
+        self._posts = df
+        self.dirty = True
+
+    def update_posts(self, rows):
+        """Merge rows (a subset of posts(), same index) back; only their days are rewritten on save."""
+        if rows.empty:
+            return
+        if len(rows) == len(self._posts) and rows.index.equals(self._posts.index):
+            self.set_posts(rows)
+            return
+        # Rows a stage handed back unchanged (e.g. titles that still have no keyword) are not rewritten
+        old = self._posts.loc[rows.index]
+        if list(old.columns) == list(rows.columns):
+            # The store saves "" as null, so the two mean the same here
+            old, new = old.mask(old.eq("")), rows.mask(rows.eq(""))
+            same = ((old == new) | (old.isna() & new.isna())).all(axis=1)
+            rows = rows[~same]
+            if rows.empty:
+                return
+        self._posts = pd.concat([self._posts.drop(index=rows.index), rows]).sort_index()
+        self.dirty_partitions.update(partition_keys(rows))
+        if self.changed_days is not None:
+            # Rollups must pick up days whose rows gained derived columns too
+            days = pd.to_datetime(pd.to_numeric(rows['created_utc'], errors='coerce'), unit='s').dt.date
+            self.changed_days.update(d for d in days if d == d)
+
+    def invalidate(self):
+        self._posts = None
+
+    def save(self):
+        if self._posts is None:
+            return
+        if self.dirty:
+            write_posts(self._posts)
+        elif self.dirty_partitions:
+            rewrite_partitions(self._posts[partition_keys(self._posts).isin(self.dirty_partitions)])
+        self.dirty = False
+        self.dirty_partitions = set()
+
+
+def stage_fetch(ctx):
+    from app import fetch_reddit_data
+    delta = fetch_reddit_data()
+    ctx.changed_days = set()
+    if delta is not None and not delta.empty:
+        ctx.changed_days = set(pd.to_datetime(delta['created_utc'], unit='s').dt.date)
+    ctx.invalidate()
+
+
+def stage_comments(ctx):
+    import comments
+    comments.run(ctx.posts())
+
+
+def stage_embeddings(ctx):
+    from nlp import embeddings
+    embeddings.run(ctx.posts())
+
+
+def stage_keywords(ctx):
+    from nlp import keywords
+    rows = ctx.work('keyword')
+    if not rows.empty:
+        ctx.update_posts(keywords.run(rows, save=False))
+
+
+def stage_topics(ctx):
+    import topic_model
+    df = ctx.posts()
+    before = df['topic'].astype("Int64").fillna(-2) if 'topic' in df.columns else None
+    # A refit needs the whole frame; only rows whose topic changed are written back.
+    # run() assigns topics in place, so it gets a copy to keep ctx's frame as the "before" side.
+    after = topic_model.run(df.copy(), save=False)
+    if before is None or 'topic' not in after.columns:
+        if 'topic' in after.columns:
+            ctx.set_posts(after)
+        return
+    changed = after['topic'].astype("Int64").fillna(-2).ne(before).to_numpy()
+    ctx.update_posts(after[changed].copy())
+
+
+def stage_sentiment(ctx):
+    from nlp import sentiment
+    rows = ctx.work('sentiment')
+    if not rows.empty:
+        ctx.update_posts(sentiment.run(rows, save=False))
+
+
+def stage_rollups(ctx):
+    import rollups
+    ctx.rollup = rollups.run(ctx.posts(), days=ctx.changed_days)
+
+
+def stage_topic_trends(ctx):
+    import topic_trends
+    ctx.topic_ranking = topic_trends.run(ctx.posts())
+
+
+def stage_news(ctx):
+    import news_service
+    news_service.run(ctx.rollup)
+
+
+def stage_alerts(ctx):
+    from alert import run_checks
+    run_checks(ctx.posts(), ctx.topic_ranking)
+
+
+def stage_forecast(ctx):
+    from forecast import forecast
+    forecast.run(ctx.posts())
+
+
+def stage_forecast_series(ctx):
+    from forecast import batch
+    batch.run(ctx.rollup)
+
+
+# name -> (function, upstream stages)
+STAGES = {
+    "fetch": (stage_fetch, []),
+    "comments": (stage_comments, ["fetch"]),
+    "embeddings": (stage_embeddings, ["fetch"]),
+    "keywords": (stage_keywords, ["fetch", "embeddings"]),
+    "topics": (stage_topics, ["embeddings"]),
+    "sentiment": (stage_sentiment, ["keywords"]),
+    "rollups": (stage_rollups, ["sentiment"]),
+    "topic_trends": (stage_topic_trends, ["topics", "sentiment"]),
+    "news": (stage_news, ["rollups"]),
+    "alerts": (stage_alerts, ["keywords", "topic_trends"]),
+    "forecast": (stage_forecast, ["fetch"]),
+    "forecast_series": (stage_forecast_series, ["rollups"]),
+}
+DEFAULT_STAGES = ["fetch", "comments", "embeddings", "keywords", "topics", "sentiment", "rollups", "topic_trends", "news", "alerts", "forecast", "forecast_series"]
+
+
+def resolve_order(stages):
+    """Topologically order the requested stages (dependencies outside the request are not added)."""
+    requested = set(stages)
+    order, visiting = [], set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Cycle in pipeline stages at '{name}'")
+        visiting.add(name)
+        for dep in STAGES[name][1]:
+            if dep in requested:
+                visit(dep)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in stages:
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage '{name}'. Choose from: {', '.join(STAGES)}")
+        visit(name)
+    return order
+
+
+def run_pipeline(stages=None, on_stage=None, lock_timeout=None):
+    """Run stages in dependency order; returns {stage: seconds}.
+
+    on_stage(name) is called before each stage starts (e.g. to update a UI).
+    Raises PipelineBusy if the lock is not free within lock_timeout seconds,
+    and PipelineError on the first failing stage.
+    """
+    order = resolve_order(stages or DEFAULT_STAGES)
+    with pipeline_lock(lock_timeout):
+        ctx = PipelineContext()
+        timings = {}
+        for name in order:
+            fn = STAGES[name][0]
+            if on_stage:
+                on_stage(name)
+            started = time.time()
+            start = time.perf_counter()
+            try:
+                fn(ctx)
+            except (Exception, SystemExit) as e:
+                ctx.save()
+                timings[name] = time.perf_counter() - start
+                update_status("stages", name, last_run=started, duration=timings[name], state="failed", error=str(e))
+                raise PipelineError(name, e) from e
+            timings[name] = time.perf_counter() - start
+            update_status("stages", name, last_run=started, last_success=time.time(),
+                          duration=timings[name], state="ok", error=None)
+            print(f"⏱️ {name}: {timings[name]:.2f}s")
+        ctx.save()
+    return timings
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    try:
+        timings = run_pipeline(sys.argv[1:] or None)
+    except PipelineError as e:
+        sys.exit(f"❌ {e}")
+    print(f"✅ Pipeline finished in {sum(timings.values()):.2f}s")
@@ -0,0 +1,85 @@
+# post_grid.py — Indexed, server-side paging over the posts frame
+# Built once per store version and shared by every dashboard session. A
+# keyword → row-position index replaces boolean masks over the whole frame, and
+# each sortable column's order is computed once, so a keyword's rows come out
+# sorted by ranking their positions rather than re-sorting the frame. Pages
+# only ever slice the visible window out of the result.
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+SORTABLE = ('created_utc', 'score', 'num_comments', 'sentiment')
+MAX_CACHED_QUERIES = 32
+
+
+class PostGrid:
+    def __init__(self, df):
+        df = df.reset_index(drop=True)
+        if 'keyword' in df.columns:
+            df['keyword'] = df['keyword'].fillna("").astype(str).replace('nan', '')
+        self.df = df
+        self.by_keyword = df.groupby('keyword', sort=False).indices if 'keyword' in df.columns else {}
+        self._ranks = {}
+        self._titles = None
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    def rows(self, keyword=None):
+        """Row positions for a keyword (all rows for None), in store order."""
+        if keyword is None:
+            return np.arange(len(self.df))
+        return self.by_keyword.get(keyword, np.array([], dtype=np.intp))
+
+    def _order(self, column, descending):
+        """(order, rank): positions sorted by column, and each position's place in that order."""
+        key = (column, descending)
+        if key not in self._ranks:
+            values = pd.to_numeric(self.df[column], errors='coerce').to_numpy(dtype=float)
+            # Missing values sort last in both directions
+            order = np.argsort(-values if descending else values, kind='stable')
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            self._ranks[key] = (order, rank)
+        return self._ranks[key]
+
+    def _matching(self, positions, search):
+        if self._titles is None:
+            self._titles = self.df['title'].fillna("").astype(str).str.lower().to_numpy()
+        titles = pd.Series(self._titles[positions])
+        return positions[titles.str.contains(search.lower(), regex=False).to_numpy()]
+
+    def query(self, keyword=None, search=None, sort='created_utc', descending=True):
+        """Positions of rows with the keyword whose title contains search, in sort order."""
+        search = (search or "").strip()
+        key = (keyword, search, sort, descending)
+        with self._lock:
+            if key in self._queries:
+                self._queries.move_to_end(key)
+                return self._queries[key]
+        order, rank = self._order(sort, descending)
+        if keyword is None and not search:
+            positions = order
+        else:
+            positions = self.rows(keyword)
+            if search:
+                positions = self._matching(positions, search)
+            positions = positions[np.argsort(rank[positions], kind='stable')]
+        with self._lock:
+            self._queries[key] = positions
+            while len(self._queries) > MAX_CACHED_QUERIES:
+                self._queries.popitem(last=False)
+        return positions
+
+    def page(self, positions, page, page_size, columns=None):
+        """The rows on one page (0-based) of a query result."""
+        window = positions[page * page_size:(page + 1) * page_size]
+        frame = self.df.iloc[window]
+        return frame[list(columns)] if columns else frame
+
+    def take(self, positions, columns=None):
+        frame = self.df.iloc[positions]
+        return frame[list(columns)] if columns else frame
@@ -0,0 +1,95 @@
+# rollups.py — Pre-aggregated tables materialized by the pipeline
+# One row per (date, subreddit, keyword) with post counts and sentiment/score/
+# comment sums. Dashboards derive daily volume, top keywords and subreddit stats
+# from this small table instead of grouping the raw posts on every render.
+import os
+import sys
+import uuid
+import pandas as pd
+from storage import DATA_DIR, posts_exist, read_posts
+
+ROLLUP_DIR = os.path.join(DATA_DIR, "rollups")
+DAILY_PATH = os.path.join(ROLLUP_DIR, "daily.parquet")
+KEYS = ['date', 'subreddit', 'keyword']
+ROLLUP_SOURCE_COLUMNS = ['created_utc', 'subreddit', 'keyword', 'sentiment', 'score', 'num_comments']
+
+
+def build_daily(df):
+    df = df.copy()
+    for col in ('subreddit', 'keyword'):
+        if col not in df.columns:
+            df[col] = None
+    for col in ('sentiment', 'score', 'num_comments'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0) if col in df.columns else 0.0
+    df['date'] = pd.to_datetime(pd.to_numeric(df['created_utc'], errors='coerce'), unit='s').dt.date
+    daily = df.groupby(KEYS, dropna=False).agg(
+        posts=('created_utc', 'size'),
+        sentiment_sum=('sentiment', 'sum'),
+        score_sum=('score', 'sum'),
+        comments_sum=('num_comments', 'sum'),
+    ).reset_index()
+    return daily
+
+
+def read_daily():
+    if not os.path.exists(DAILY_PATH):
+        return None
+    return pd.read_parquet(DAILY_PATH)
+
+
+def _save(df):
+    os.makedirs(ROLLUP_DIR, exist_ok=True)
+    tmp = f"{DAILY_PATH}.tmp-{uuid.uuid4().hex}"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, DAILY_PATH)
+
+
+def update_rollups(df, days=None):
+    """Materialize rollups from the posts frame.
+
+    days: dates whose posts changed since the last run. Only those dates are
+    recomputed and merged into the existing table; None rebuilds everything.
+    """
+    existing = read_daily() if days is not None else None
+    if existing is None:
+        daily = build_daily(df)
+    else:
+        days = set(days)
+        if not days:
+            return existing
+        post_days = pd.to_datetime(pd.to_numeric(df['created_utc'], errors='coerce'), unit='s').dt.date
+        fresh = build_daily(df[post_days.isin(days)])
+        daily = pd.concat([existing[~existing['date'].isin(days)], fresh], ignore_index=True)
+    daily = daily.sort_values('date', kind='stable').reset_index(drop=True)
+    _save(daily)
+    print(f"✅ Rollups updated ({len(daily)} rows) in {ROLLUP_DIR}/")
+    return daily
+
+
+def add_posts(df):
+    """Fold posts that are not counted yet (e.g. a stream micro-batch) into the rollups.
+
+    The sums are additive, so the existing table is updated without reading the
+    store. Without a table yet, the next rollups stage builds one from the store.
+    """
+    existing = read_daily()
+    if existing is None or df.empty:
+        return existing
+    daily = pd.concat([existing, build_daily(df)], ignore_index=True)
+    daily = daily.groupby(KEYS, dropna=False, sort=False).sum().reset_index()
+    daily = daily.sort_values('date', kind='stable').reset_index(drop=True)
+    _save(daily)
+    return daily
+
+
+def run(df=None, days=None):
+    if df is None:
+        if not posts_exist():
+            raise SystemExit("No posts in data/posts/. Run app.py first.")
+        df = read_posts(columns=ROLLUP_SOURCE_COLUMNS)
+    return update_rollups(df, days)
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    run()
@@ -0,0 +1,95 @@
+# scheduler.py — Long-running pipeline scheduler
+# Runs pipeline stages on per-job intervals in one process, e.g. ingestion every
+# few minutes and forecasting hourly. Every run goes through run_pipeline, which
+# holds the pipeline lock, so a job never overlaps another job or a dashboard
+# button. Job heartbeats and next-run times go to data/pipeline_status.json
+# next to the per-stage freshness the dashboard reads. Runs queued from the
+# dashboard (pipeline.request_run) are picked up within REQUEST_POLL_SECONDS.
+#   python scheduler.py           # run forever
+#   python scheduler.py --once    # run every job once and exit (e.g. from cron)
+import os
+import sys
+import time
+from dotenv import load_dotenv
+from pipeline import (PipelineBusy, PipelineError, finish_request, pending_requests, retry_request,
+                      run_pipeline, update_status)
+load_dotenv()
+
+INGEST_MINUTES = float(os.getenv("SCHEDULE_INGEST_MINUTES", "5"))
+FORECAST_MINUTES = float(os.getenv("SCHEDULE_FORECAST_MINUTES", "60"))
+# Wait before retrying a job that found the lock held or failed
+RETRY_SECONDS = float(os.getenv("SCHEDULE_RETRY_SECONDS", "60"))
+LOCK_WAIT_SECONDS = 30
+REQUEST_POLL_SECONDS = 5
+# A queued run that still fails after this many attempts is dropped (its error stays in the job status)
+MAX_REQUEST_ATTEMPTS = 5
+
+JOBS = {
+    "ingest": (INGEST_MINUTES, ["fetch", "comments", "embeddings", "keywords", "topics", "sentiment", "rollups", "topic_trends", "news", "alerts"]),
+    "forecast": (FORECAST_MINUTES, ["forecast", "forecast_series"]),
+}
+
+
+def run_job(name, stages):
+    """Run one job; returns True on success, False if it should be retried soon."""
+    print(f"▶️ [{time.strftime('%H:%M:%S')}] {name}: {', '.join(stages)}")
+    update_status("jobs", name, last_run=time.time(), state="running")
+    try:
+        timings = run_pipeline(stages, lock_timeout=LOCK_WAIT_SECONDS)
+    except PipelineBusy:
+        print(f"⏳ {name}: another run holds the pipeline lock; retrying in {RETRY_SECONDS:.0f}s")
+        update_status("jobs", name, state="busy")
+        return False
+    except PipelineError as e:
+        print(f"❌ {name}: {e}")
+        update_status("jobs", name, state="failed", error=str(e))
+        return False
+    update_status("jobs", name, state="ok", last_success=time.time(),
+                  duration=sum(timings.values()), error=None)
+    return True
+
+
+def run_requests(now=None):
+    """Run the queued requests that are due. A request leaves the queue once it succeeds;
+    busy or failed ones are retried after RETRY_SECONDS. Returns the requests still queued."""
+    now = time.time() if now is None else now
+    for request in pending_requests():
+        if request.get("retry_at", 0) > now:
+            continue
+        if run_job("requested", request["stages"]):
+            finish_request(request["id"])
+        elif request.get("attempts", 0) + 1 >= MAX_REQUEST_ATTEMPTS:
+            print(f"❌ Giving up on requested run {', '.join(request['stages'])} after {MAX_REQUEST_ATTEMPTS} attempts")
+            finish_request(request["id"])
+        else:
+            retry_request(request["id"], RETRY_SECONDS)
+    return pending_requests()
+
+
+def run_forever(jobs=JOBS):
+    next_run = {name: 0.0 for name in jobs}
+    print(f"🕒 Scheduler started: " + ", ".join(f"{n} every {m:g} min" for n, (m, _) in jobs.items()))
+    while True:
+        run_requests()
+        now = time.time()
+        for name, (minutes, stages) in jobs.items():
+            if now < next_run[name]:
+                continue
+            ok = run_job(name, stages)
+            next_run[name] = time.time() + (minutes * 60 if ok else RETRY_SECONDS)
+            update_status("jobs", name, next_run=next_run[name], interval_minutes=minutes)
+        update_status("scheduler", "heartbeat", at=time.time(), pid=os.getpid())
+        time.sleep(max(1.0, min(REQUEST_POLL_SECONDS, min(next_run.values()) - time.time())))
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    if "--once" in sys.argv[1:]:
+        # Requests that fail stay queued for the next run
+        failed = run_requests(now=float("inf"))
+        failed += [name for name, (_, stages) in JOBS.items() if not run_job(name, stages)]
+        sys.exit(1 if failed else 0)
+    try:
+        run_forever()
+    except KeyboardInterrupt:
+        print("👋 Scheduler stopped.")
@@ -0,0 +1,189 @@
+# snapshots.py — Append-only score / comment-count history per post
+# Every fetch that sees a post (app.py, the stream ingester, the comments
+# stage's live count lookups) records (post_id, ts, score, num_comments). A
+# snapshot is only written when score or num_comments changed since the last
+# one, so values carry forward between rows. Rows go to
+# data/snapshots/day=YYYY-MM-DD/part-*.parquet; the last value per post is kept
+# in data/snapshot_state.db for the change check.
+# Velocity and acceleration are computed for all posts at once from the value
+# at now, now - window and now - 2·window (as-of lookups on the step series).
+import os
+import sys
+import time
+import uuid
+import sqlite3
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from storage import DATA_DIR, PARTITION_COL
+
+SNAPSHOTS_DIR = os.path.join(DATA_DIR, "snapshots")
+STATE_DB = os.path.join(DATA_DIR, "snapshot_state.db")
+VELOCITY_WINDOW_HOURS = float(os.getenv("SNAPSHOT_VELOCITY_HOURS", "1"))
+# Only snapshots this recent are read for velocity; older posts have stopped moving
+LOOKBACK_HOURS = float(os.getenv("SNAPSHOT_LOOKBACK_HOURS", "72"))
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("post_id", pa.string()),
+    ("ts", pa.float64()),
+    ("score", pa.int32()),
+    ("num_comments", pa.int32()),
+])
+VALUES = ["score", "num_comments"]
+
+
+class SnapshotState:
+    """Last recorded (score, num_comments) per post."""
+
+    def __init__(self, path=STATE_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS last (post_id TEXT PRIMARY KEY, ts REAL, score INTEGER, num_comments INTEGER)")
+        self.conn.commit()
+
+    def last(self, ids):
+        ids = list(ids)
+        rows = []
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(self.conn.execute(
+                f"SELECT post_id, score, num_comments FROM last WHERE post_id IN ({placeholders})", chunk))
+        return pd.DataFrame(rows, columns=["post_id", "last_score", "last_comments"])
+
+    def update(self, df):
+        self.conn.executemany("INSERT OR REPLACE INTO last (post_id, ts, score, num_comments) VALUES (?, ?, ?, ?)",
+                              zip(df['post_id'], df['ts'].astype(float), df['score'].astype(int), df['num_comments'].astype(int)))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def changed(observed, last):
+    """Rows of observed whose score or num_comments differ from the last snapshot (or that have none)."""
+    merged = observed.merge(last, on="post_id", how="left")
+    keep = (merged['last_score'].isna()
+            | (merged['score'] != merged['last_score'])
+            | (merged['num_comments'] != merged['last_comments']))
+    return observed[keep.to_numpy()]
+
+
+def _write(df):
+    days = pd.to_datetime(df['ts'], unit='s', utc=True).dt.strftime("%Y-%m-%d")
+    for day, part in df.groupby(days, sort=False):
+        part_dir = os.path.join(SNAPSHOTS_DIR, f"{PARTITION_COL}={day}")
+        os.makedirs(part_dir, exist_ok=True)
+        path = os.path.join(part_dir, f"part-{uuid.uuid4().hex}.parquet")
+        tmp = os.path.join(part_dir, f".{os.path.basename(path)}.tmp")
+        # Sorted by post so each post's run of rows compresses together
+        part = part.sort_values(['post_id', 'ts'], kind='stable')
+        pq.write_table(pa.Table.from_pandas(part, schema=SNAPSHOT_SCHEMA, preserve_index=False), tmp, compression="zstd")
+        os.replace(tmp, path)
+
+
+def record(posts, ts=None, id_col="id"):
+    """Snapshot the score/num_comments of the given posts; returns how many rows were written."""
+    if posts is None or len(posts) == 0:
+        return 0
+    observed = pd.DataFrame({
+        "post_id": posts[id_col].astype(str).to_numpy(),
+        "ts": float(ts if ts is not None else time.time()),
+        "score": pd.to_numeric(posts['score'], errors='coerce').fillna(0).astype(int).to_numpy(),
+        "num_comments": pd.to_numeric(posts['num_comments'], errors='coerce').fillna(0).astype(int).to_numpy(),
+    }).drop_duplicates(subset=['post_id'], keep='last')
+    state = SnapshotState()
+    fresh = changed(observed, state.last(observed['post_id']))
+    if not fresh.empty:
+        _write(fresh)
+        state.update(fresh)
+    state.close()
+    return len(fresh)
+
+
+def read_snapshots(post_ids=None, since=None):
+    if not os.path.isdir(SNAPSHOTS_DIR):
+        return pd.DataFrame(columns=SNAPSHOT_SCHEMA.names)
+    partitioning = ds.partitioning(pa.schema([(PARTITION_COL, pa.string())]), flavor="hive")
+    dataset = ds.dataset(SNAPSHOTS_DIR, format="parquet", partitioning=partitioning)
+    flt = None
+    if since is not None:
+        since_day = pd.to_datetime(since, unit="s", utc=True).strftime("%Y-%m-%d")
+        flt = (ds.field(PARTITION_COL) >= since_day) & (ds.field("ts") >= float(since))
+    if post_ids is not None:
+        ids = ds.field("post_id").isin([str(i) for i in post_ids])
+        flt = ids if flt is None else flt & ids
+    return dataset.to_table(columns=SNAPSHOT_SCHEMA.names, filter=flt).to_pandas()
+
+
+def _value_at(snaps, ids, t):
+    """Last snapshot value at or before t for each id; before a post's first snapshot, that first value."""
+    query = pd.DataFrame({"post_id": ids, "t": t}).sort_values("t", kind="stable")
+    at = pd.merge_asof(query, snaps, left_on="t", right_on="ts", by="post_id", direction="backward")
+    first = snaps.groupby("post_id")[VALUES].first()
+    at = at.set_index("post_id").reindex(ids)
+    return at[VALUES].fillna(first.reindex(ids)).to_numpy(dtype=float)
+
+
+def velocity(snaps=None, now=None, window_hours=VELOCITY_WINDOW_HOURS, created=None):
+    """Per post: current score/num_comments, their change per hour over the last window
+    (velocity) and the change in that rate against the window before (acceleration, per hour²).
+
+    created (post_id -> created_utc) adds a zero point at creation, so a post first
+    seen mid-window is credited with the votes it gathered since it was posted.
+    """
+    now = time.time() if now is None else now
+    if snaps is None:
+        snaps = read_snapshots(since=now - LOOKBACK_HOURS * 3600)
+    if snaps.empty:
+        return pd.DataFrame(columns=["post_id", "score", "num_comments", "score_velocity", "comment_velocity",
+                                     "score_acceleration", "comment_acceleration", "last_change"])
+    snaps = snaps[snaps['ts'] <= now]
+    if created is not None:
+        origin = pd.Series(created, dtype=float).dropna()
+        origin = origin[origin.index.isin(snaps['post_id'].unique())]
+        snaps = pd.concat([snaps, pd.DataFrame({"post_id": origin.index.astype(str), "ts": origin.to_numpy(),
+                                                 "score": 0, "num_comments": 0})], ignore_index=True)
+    snaps = snaps.astype({"score": float, "num_comments": float}).sort_values("ts", kind="stable")
+    ids = snaps['post_id'].unique()
+    w = window_hours * 3600
+    v_now, v_mid, v_old = (_value_at(snaps, ids, t) for t in (now, now - w, now - 2 * w))
+    recent = (v_now - v_mid) / window_hours
+    previous = (v_mid - v_old) / window_hours
+    accel = (recent - previous) / window_hours
+    return pd.DataFrame({
+        "post_id": ids,
+        "score": v_now[:, 0].astype(int),
+        "num_comments": v_now[:, 1].astype(int),
+        "score_velocity": recent[:, 0],
+        "comment_velocity": recent[:, 1],
+        "score_acceleration": accel[:, 0],
+        "comment_acceleration": accel[:, 1],
+        "last_change": snaps.groupby("post_id")['ts'].max().reindex(ids).to_numpy(),
+    }).sort_values("score_velocity", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def rising_posts(top_n=20, now=None, window_hours=VELOCITY_WINDOW_HOURS):
+    """The fastest-rising posts joined with their title/subreddit/keyword."""
+    from storage import posts_exist, read_posts
+    now = time.time() if now is None else now
+    since = now - LOOKBACK_HOURS * 3600
+    if not posts_exist():
+        return None
+    posts = read_posts(columns=['id', 'title', 'subreddit', 'keyword', 'created_utc'], since=since)
+    posts['id'] = posts['id'].astype(str)
+    created = pd.to_numeric(posts.set_index('id')['created_utc'], errors='coerce')
+    vel = velocity(read_snapshots(since=since), now, window_hours, created)
+    vel = vel[vel['score_velocity'] > 0].head(top_n)
+    return vel.merge(posts.drop(columns=['created_utc']), left_on="post_id", right_on="id", how="left").drop(columns=['id'])
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    top = rising_posts()
+    if top is None or top.empty:
+        print("No snapshots yet.")
+    else:
+        pd.set_option("display.width", 200)
+        print(top[['post_id', 'subreddit', 'score', 'score_velocity', 'comment_velocity', 'score_acceleration', 'title']].to_string(index=False))
@@ -0,0 +1,163 @@
+# spike_detector.py — Streaming, per-key spike detection
+# Keeps a rolling counter per key (total, subreddit:<name>, keyword:<kw>) in
+# fixed time buckets (hourly by default). Each closed bucket updates an EWMA of
+# the count and an EWMA of the absolute deviation, both O(1) per event. The
+# bucket in progress is scored against that baseline on every event, so a burst
+# is flagged as soon as its posts are ingested instead of after a full day.
+# State lives in data/spike_state.db: only the keys a batch touches are loaded
+# and upserted, and keys with no event for SPIKE_KEY_TTL_HOURS are dropped
+# (most keywords occur a handful of times and would otherwise pile up forever).
+import os
+import math
+import time
+import sqlite3
+import pandas as pd
+
+STATE_DB = os.path.join("data", "spike_state.db")
+BUCKET_MINUTES = int(os.getenv("SPIKE_BUCKET_MINUTES", "60"))
+ALPHA = float(os.getenv("SPIKE_EWMA_ALPHA", "0.1"))
+Z_THRESHOLD = float(os.getenv("SPIKE_Z_THRESHOLD", "4"))
+MIN_COUNT = int(os.getenv("SPIKE_MIN_COUNT", "5"))
+WARMUP_BUCKETS = int(os.getenv("SPIKE_WARMUP_BUCKETS", "24"))
+KEY_TTL_HOURS = float(os.getenv("SPIKE_KEY_TTL_HOURS", "168"))
+# Cap on zero-count updates applied when a key has been quiet for a long gap
+MAX_GAP_UPDATES = 24 * 7
+# Mean absolute deviation → standard deviation for normally distributed counts
+MAD_TO_SIGMA = 1.2533
+
+BUCKET, COUNT, MEAN, DEV, SEEN, ALERTED, LAST_SEEN = range(7)
+COLUMNS = "key, bucket, count, mean, dev, seen, alerted, last_seen"
+
+
+class SpikeDetector:
+    def __init__(self, path=STATE_DB, bucket_minutes=BUCKET_MINUTES, alpha=ALPHA,
+                 z_threshold=Z_THRESHOLD, min_count=MIN_COUNT, warmup=WARMUP_BUCKETS, key_ttl_hours=KEY_TTL_HOURS):
+        self.bucket_seconds = bucket_minutes * 60
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_count = min_count
+        self.warmup = warmup
+        self.key_ttl = key_ttl_hours * 3600
+        # Keys loaded or touched since the last save
+        self.keys = {}
+        self.watermark = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value REAL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS keys (key TEXT PRIMARY KEY, bucket INTEGER, count INTEGER, "
+                          "mean REAL, dev REAL, seen INTEGER, alerted INTEGER, last_seen REAL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS keys_last_seen ON keys (last_seen)")
+        self.conn.commit()
+        self._load()
+
+    def _load(self):
+        meta = dict(self.conn.execute("SELECT name, value FROM meta"))
+        if meta.get("bucket_seconds") not in (None, self.bucket_seconds):
+            # Baselines in other bucket sizes are not comparable; start over
+            self.conn.execute("DELETE FROM keys")
+            self.conn.execute("DELETE FROM meta")
+            self.conn.commit()
+            return
+        self.watermark = meta.get("watermark", 0.0)
+
+    def _fetch(self, keys):
+        """Load the stored state of keys not in memory yet."""
+        keys = [k for k in set(keys) if k not in self.keys]
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self.conn.execute(f"SELECT {COLUMNS} FROM keys WHERE key IN ({placeholders})", chunk):
+                self.keys[row[0]] = list(row[1:])
+
+    def save(self):
+        """Upsert the keys touched since the last save and drop keys idle past the TTL."""
+        self.conn.executemany(f"INSERT OR REPLACE INTO keys ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              ((key, *s) for key, s in self.keys.items()))
+        self.conn.execute("DELETE FROM keys WHERE last_seen < ?", (self.watermark - self.key_ttl,))
+        self.conn.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                              [("bucket_seconds", self.bucket_seconds), ("watermark", self.watermark)])
+        self.conn.commit()
+        self.keys = {}
+
+    def close(self):
+        self.conn.close()
+
+    def _close(self, s, count):
+        err = count - s[MEAN]
+        s[MEAN] += self.alpha * err
+        s[DEV] += self.alpha * (abs(err) - s[DEV])
+        s[SEEN] += 1
+
+    def _advance(self, s, bucket):
+        gap = bucket - s[BUCKET]
+        if gap <= 0:
+            return
+        self._close(s, s[COUNT])
+        for _ in range(min(gap - 1, MAX_GAP_UPDATES)):
+            self._close(s, 0)
+        s[BUCKET], s[COUNT] = bucket, 0
+
+    def score(self, s):
+        sigma = max(MAD_TO_SIGMA * s[DEV], math.sqrt(max(s[MEAN], 1.0)))
+        return (s[COUNT] - s[MEAN]) / sigma
+
+    def observe(self, key, ts, live=True):
+        """Count one event; returns an alert dict if this key's current bucket just became a spike."""
+        bucket = int(ts // self.bucket_seconds)
+        s = self.keys.get(key)
+        if s is None:
+            s = self.keys[key] = [bucket, 0, 0.0, 0.0, 0, None, ts]
+        if bucket < s[BUCKET]:
+            return None  # late event for a bucket that is already closed
+        s[LAST_SEEN] = max(s[LAST_SEEN], ts)
+        self._advance(s, bucket)
+        s[COUNT] += 1
+        if not live or s[SEEN] < self.warmup or s[COUNT] < self.min_count or s[ALERTED] == bucket:
+            return None
+        z = self.score(s)
+        if z < self.z_threshold:
+            return None
+        s[ALERTED] = bucket
+        return {
+            "key": key,
+            "bucket_start": bucket * self.bucket_seconds,
+            "count": s[COUNT],
+            "baseline": round(s[MEAN], 2),
+            "z": round(z, 2),
+        }
+
+    def process(self, df, now=None):
+        """Feed posts newer than the watermark; returns the alerts they triggered.
+
+        Buckets older than the previous one are replayed to build baselines but never alert,
+        so the first run over history does not page for old bursts.
+        """
+        if df is None or df.empty or 'created_utc' not in df.columns:
+            return []
+        ts = pd.to_numeric(df['created_utc'], errors='coerce')
+        new = df[ts > self.watermark].assign(_ts=ts).sort_values('_ts', kind='stable')
+        if new.empty:
+            return []
+        now = time.time() if now is None else now
+        live_from = (int(now // self.bucket_seconds) - 1) * self.bucket_seconds
+        none = [None] * len(new)
+        subs = new['subreddit'].tolist() if 'subreddit' in new.columns else none
+        kws = new['keyword'].tolist() if 'keyword' in new.columns else none
+        events = []
+        for t, sub, kw in zip(new['_ts'].tolist(), subs, kws):
+            keys = ["total"]
+            if isinstance(sub, str) and sub:
+                keys.append(f"subreddit:{sub}")
+            if isinstance(kw, str) and kw:
+                keys.append(f"keyword:{kw}")
+            events.append((t, keys))
+        self._fetch(key for _, keys in events for key in keys)
+        alerts = []
+        for t, keys in events:
+            live = t >= live_from
+            for key in keys:
+                alert = self.observe(key, t, live)
+                if alert:
+                    alerts.append(alert)
+        self.watermark = float(new['_ts'].iloc[-1])
+        return alerts
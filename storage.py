@@ -0,0 +1,347 @@
+# storage.py — Columnar post store (date-partitioned Parquet)
+# Replaces data/reddit_posts.csv as the system of record. Posts live under
+# data/posts/day=YYYY-MM-DD/part-*.parquet so readers can project only the
+# columns they need and prune by date.
+#
+# Part files are immutable. Every write commits a new snapshot: a manifest in
+# data/posts/_versions/ listing the files that make up the store, after which
+# data/posts/CURRENT is atomically switched to it. Readers that pin a version
+# see one consistent snapshot however many writes land meanwhile. The last
+# STORE_KEEP_VERSIONS snapshots are kept for rollback; files no kept snapshot
+# references are deleted. Each manifest also carries the snapshot's unified
+# schema, so opening it does not read every file's footer. Appends add small
+# files; once a day has STORE_COMPACT_FILES of them they are merged into one.
+import os
+import sys
+import json
+import base64
+import glob
+import time
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DATA_DIR = "data"
+POSTS_DIR = os.path.join(DATA_DIR, "posts")
+LEGACY_CSV = os.path.join(DATA_DIR, "reddit_posts.csv")
+VERSIONS_DIR = os.path.join(POSTS_DIR, "_versions")
+CURRENT_FILE = os.path.join(POSTS_DIR, "CURRENT")
+PARTITION_COL = "day"
+KEEP_VERSIONS = int(os.getenv("STORE_KEEP_VERSIONS", "5"))
+# Unreferenced part files younger than this may belong to a write that has not committed yet
+ORPHAN_GRACE_SECONDS = 3600
+# An append that leaves a day with this many part files under COMPACT_SMALL_BYTES merges them
+COMPACT_MIN_FILES = int(os.getenv("STORE_COMPACT_FILES", "8"))
+COMPACT_SMALL_BYTES = 16 * 1024 * 1024
+
+# Storage types for the columns the pipeline knows about. Anything else is inferred.
+POST_SCHEMA = {
+    "id": pa.string(),
+    "title": pa.string(),
+    "score": pa.int64(),
+    "url": pa.string(),
+    "num_comments": pa.int64(),
+    "created_utc": pa.float64(),
+    "selftext": pa.string(),
+    "subreddit": pa.string(),
+    "keyword": pa.string(),
+    "sentiment_light": pa.float64(),
+    "sentiment_transformer": pa.float64(),
+    "sentiment": pa.float64(),
+    "topic": pa.int64(),
+}
+# Integer columns where a missing value means 0 (like the CSV did); others keep nulls
+ZERO_FILLED = {"score", "num_comments"}
+
+
+def _coerce(df):
+    df = df.copy()
+    for col, typ in POST_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        if pa.types.is_string(typ):
+            # Keep CSV semantics: empty strings are stored as nulls
+            s = df[col].astype(object)
+            df[col] = s.where(s.notna() & (s.astype(str) != ""), None).map(lambda v: v if v is None else str(v))
+        elif pa.types.is_integer(typ):
+            values = pd.to_numeric(df[col], errors="coerce")
+            df[col] = values.fillna(0).astype("int64") if col in ZERO_FILLED else values.astype("Int64")
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df
+
+
+def _arrow_schema(df):
+    fields = []
+    for col in df.columns:
+        if col in POST_SCHEMA:
+            fields.append(pa.field(col, POST_SCHEMA[col]))
+        else:
+            fields.append(pa.Schema.from_pandas(df[[col]], preserve_index=False).field(col))
+    return pa.schema(fields)
+
+
+def partition_keys(df):
+    """The day partition ("YYYY-MM-DD", or "unknown") each row is stored under."""
+    ts = pd.to_datetime(pd.to_numeric(df["created_utc"], errors="coerce"), unit="s", utc=True)
+    return ts.dt.strftime("%Y-%m-%d").fillna("unknown")
+
+
+def _write_partitions(df, root=POSTS_DIR):
+    """Write df as new part files; returns their paths relative to root."""
+    df = _coerce(df.reset_index(drop=True))
+    schema = _arrow_schema(df)
+    days = partition_keys(df)
+    written = []
+    for day, part in df.groupby(days, sort=False):
+        rel = f"{PARTITION_COL}={day}/part-{uuid.uuid4().hex}.parquet"
+        os.makedirs(os.path.join(root, os.path.dirname(rel)), exist_ok=True)
+        table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+        pq.write_table(table, os.path.join(root, rel), compression="zstd")
+        written.append(rel)
+    return written
+
+
+def _day(rel):
+    return rel.split("/", 1)[0][len(PARTITION_COL) + 1:]
+
+
+def _compact(files, days):
+    """Merge the small part files of each of days into one new file once there are COMPACT_MIN_FILES of them."""
+    small = {}
+    for rel in files:
+        if _day(rel) in days and os.path.getsize(os.path.join(POSTS_DIR, rel)) < COMPACT_SMALL_BYTES:
+            small.setdefault(_day(rel), []).append(rel)
+    for day, parts in small.items():
+        if len(parts) < COMPACT_MIN_FILES:
+            continue
+        dataset = _dataset([os.path.join(POSTS_DIR, rel) for rel in parts])
+        table = dataset.to_table(columns=[c for c in dataset.schema.names if c != PARTITION_COL])
+        rel = f"{PARTITION_COL}={day}/part-{uuid.uuid4().hex}.parquet"
+        pq.write_table(table, os.path.join(POSTS_DIR, rel), compression="zstd")
+        files = [f for f in files if f not in parts] + [rel]
+    return files
+
+
+def _atomic_write(path, text):
+    tmp = f"{path}.tmp-{uuid.uuid4().hex}"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _loose_files():
+    root = len(POSTS_DIR) + 1
+    return sorted(p[root:].replace(os.sep, "/")
+                  for p in glob.glob(os.path.join(POSTS_DIR, f"{PARTITION_COL}=*", "*.parquet")))
+
+
+def _manifest(version):
+    try:
+        with open(os.path.join(VERSIONS_DIR, f"{version}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def list_versions():
+    """Snapshot ids still on disk, oldest first."""
+    return sorted(os.path.basename(p)[:-5] for p in glob.glob(os.path.join(VERSIONS_DIR, "v*.json")))
+
+
+def _read_current():
+    try:
+        with open(CURRENT_FILE) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _snapshot_schema(files, parent):
+    """Unified schema of files, reading only the footers of files the parent snapshot does not have."""
+    old = _manifest(parent) if parent else None
+    known = set(old["files"]) if old and old.get("schema") else set()
+    schemas = [_decode_schema(old["schema"])] if known & set(files) else []
+    schemas += [pq.read_schema(os.path.join(POSTS_DIR, rel)) for rel in files if rel not in known]
+    return pa.unify_schemas(schemas) if schemas else None
+
+
+def _decode_schema(text):
+    return pa.ipc.read_schema(pa.py_buffer(base64.b64decode(text)))
+
+
+def _commit(files, parent=None):
+    """Publish a snapshot made of files and point CURRENT at it."""
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    versions = list_versions()
+    version = f"v{int(versions[-1][1:]) + 1 if versions else 1:06d}"
+    schema = _snapshot_schema(files, parent)
+    manifest = {"version": version, "parent": parent, "created": time.time(), "files": sorted(files),
+                "schema": None if schema is None else base64.b64encode(schema.serialize().to_pybytes()).decode()}
+    _atomic_write(os.path.join(VERSIONS_DIR, f"{version}.json"), json.dumps(manifest))
+    _atomic_write(CURRENT_FILE, version)
+    _prune()
+    return version
+
+
+def _prune(keep=KEEP_VERSIONS):
+    """Drop snapshots beyond the newest keep + 1 (and never CURRENT), then their unreferenced files."""
+    versions = list_versions()
+    kept = set(versions[-(keep + 1):]) | {_read_current()}
+    for version in versions:
+        if version not in kept:
+            os.remove(os.path.join(VERSIONS_DIR, f"{version}.json"))
+    referenced = set()
+    for version in kept:
+        manifest = _manifest(version)
+        if manifest:
+            referenced.update(manifest["files"])
+    cutoff = time.time() - ORPHAN_GRACE_SECONDS
+    for rel in _loose_files():
+        path = os.path.join(POSTS_DIR, rel)
+        if rel not in referenced and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+    for part_dir in glob.glob(os.path.join(POSTS_DIR, f"{PARTITION_COL}=*")):
+        if not os.listdir(part_dir):
+            os.rmdir(part_dir)
+
+
+def _current():
+    version = _read_current()
+    if version is None and _loose_files():
+        # Store written before snapshots existed: adopt its files as the first version
+        version = _commit(_loose_files())
+    return version
+
+
+def _snapshot(version=None):
+    """Absolute part-file paths and schema (None for manifests written before it was kept) of a
+    snapshot (default: current). A pinned version that has been pruned raises FileNotFoundError."""
+    version = version or _current()
+    if version is None:
+        return [], None
+    manifest = _manifest(version)
+    if manifest is None:
+        raise FileNotFoundError(f"Snapshot {version} no longer exists")
+    schema = _decode_schema(manifest["schema"]) if manifest.get("schema") else None
+    return [os.path.join(POSTS_DIR, rel) for rel in manifest["files"]], schema
+
+
+def _files(version=None):
+    return _snapshot(version)[0]
+
+
+def _dataset(files, schema=None):
+    schema = schema or pa.unify_schemas([pq.read_schema(f) for f in files])
+    schema = schema.append(pa.field(PARTITION_COL, pa.string()))
+    partitioning = ds.partitioning(pa.schema([(PARTITION_COL, pa.string())]), flavor="hive")
+    return ds.dataset(files, format="parquet", schema=schema, partitioning=partitioning,
+                      partition_base_dir=POSTS_DIR)
+
+
+def store_version():
+    """Id of the current snapshot ("0" when empty); cheap enough to check on each dashboard rerun.
+    Pass it as version= to keep reading that snapshot while newer ones are written."""
+    return _current() or "0"
+
+
+def rollback(version):
+    """Point CURRENT back at an earlier snapshot that is still kept."""
+    if _manifest(version) is None:
+        raise FileNotFoundError(f"Snapshot {version} no longer exists")
+    _atomic_write(CURRENT_FILE, version)
+
+
+def migrate_csv(path=LEGACY_CSV):
+    """One-time import of the legacy CSV into the Parquet store."""
+    if not os.path.exists(path) or _files():
+        return False
+    df = pd.read_csv(path)
+    write_posts(df)
+    os.replace(path, path + ".migrated")
+    print(f"✅ Migrated {len(df)} posts from {path} to {POSTS_DIR}/")
+    return True
+
+
+def posts_exist():
+    migrate_csv()
+    return bool(_files())
+
+
+def post_columns(version=None):
+    files, schema = _snapshot(version) if posts_exist() else ([], None)
+    if not files:
+        return []
+    return [c for c in _dataset(files, schema).schema.names if c != PARTITION_COL]
+
+
+def read_posts(columns=None, since=None, version=None):
+    """Load posts as a DataFrame.
+
+    columns: only read these columns (missing ones are skipped, like CSV headers).
+    since: unix timestamp; only posts created at or after it are returned.
+    version: snapshot id from store_version(); defaults to the current one.
+    """
+    files, schema = _snapshot(version) if posts_exist() else ([], None)
+    if not files:
+        return pd.DataFrame(columns=columns or [])
+    dataset = _dataset(files, schema)
+    names = [c for c in dataset.schema.names if c != PARTITION_COL]
+    if columns is not None:
+        names = [c for c in columns if c in names]
+    flt = None
+    if since is not None:
+        since_day = pd.to_datetime(since, unit="s", utc=True).strftime("%Y-%m-%d")
+        flt = (ds.field(PARTITION_COL) >= since_day) & (ds.field("created_utc") >= float(since))
+    return dataset.to_table(columns=names, filter=flt).to_pandas()
+
+
+def write_posts(df):
+    """Replace the whole store with df as a new snapshot; returns its version."""
+    parent = _current()
+    return _commit(_write_partitions(df), parent)
+
+
+def rewrite_partitions(df):
+    """Replace only the day partitions df covers as a new snapshot; df must hold every
+    row of those days. Other partitions keep their existing files. Returns the version."""
+    if df.empty:
+        return None
+    parent = _current()
+    days = set(partition_keys(df))
+    files = _manifest(parent)["files"] if parent else []
+    kept = [rel for rel in files if _day(rel) not in days]
+    return _commit(kept + _write_partitions(df), parent)
+
+
+def append_posts(df):
+    """Add rows as a new snapshot without rewriting existing partitions (apart from
+    compacting the small files of the days df lands in)."""
+    if df.empty:
+        return None
+    parent = _current()
+    files = _manifest(parent)["files"] if parent else []
+    return _commit(_compact(files + _write_partitions(df), set(partition_keys(df))), parent)
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        src = sys.argv[2] if len(sys.argv) > 2 else LEGACY_CSV
+        if not migrate_csv(src):
+            print("Nothing to migrate (no CSV found or store already populated).")
+    elif len(sys.argv) > 1 and sys.argv[1] == "versions":
+        current = store_version()
+        for version in list_versions():
+            manifest = _manifest(version)
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(manifest["created"]))
+            print(f"{'*' if version == current else ' '} {version}  {created}  {len(manifest['files'])} files")
+    elif len(sys.argv) > 2 and sys.argv[1] == "rollback":
+        rollback(sys.argv[2])
+        print(f"✅ CURRENT → {sys.argv[2]}")
+    else:
+        print("Usage: python storage.py migrate [path/to/reddit_posts.csv]\n"
+              "       python storage.py versions\n"
+              "       python storage.py rollback <version>")
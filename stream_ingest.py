@@ -0,0 +1,328 @@
+# stream_ingest.py — Real-time ingestion from the subreddit submission streams
+# Follows every configured subreddit's submission stream instead of polling
+# hot/new, and groups new posts into micro-batches (STREAM_BATCH_SIZE posts or
+# STREAM_BATCH_SECONDS, whichever comes first). Each batch goes straight through
+# embeddings → keywords → sentiment, is appended to the post store, folded into
+# the dashboard rollups and fed to the spike detector. Batches are committed under the pipeline lock.
+#
+# Restarts resume without gaps or duplicates: the seen-ID index and per-subreddit
+# high-water marks in data/ingest_state.db are the checkpoint. On (re)connect,
+# /new is paged back to each high-water mark before following the stream, and a
+# batch's ids are written to data/stream_checkpoint.json before it is appended,
+# so a crash between the append and the checkpoint is reconciled on startup.
+#   python stream_ingest.py                            # follow the live streams
+#   python stream_ingest.py --record posts.jsonl       # ...and record every post
+#   python stream_ingest.py --replay posts.jsonl       # feed recorded posts instead
+#   python stream_ingest.py --replay posts.jsonl --speed 60   # at 60× real time
+# Replays write to ./data like live runs; run them from a scratch directory.
+import os
+import sys
+import json
+import time
+import pandas as pd
+from dotenv import load_dotenv
+from storage import DATA_DIR, append_posts, read_posts
+from ingest_state import IngestState
+import snapshots
+import rollups
+from pipeline import PipelineBusy, pipeline_lock, update_status
+load_dotenv()
+
+CHECKPOINT_PATH = os.path.join(DATA_DIR, "stream_checkpoint.json")
+BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "50"))
+BATCH_SECONDS = float(os.getenv("STREAM_BATCH_SECONDS", "30"))
+# How long a batch waits for a pipeline run to release the lock before it is retried
+LOCK_WAIT_SECONDS = 10
+# Posts held while batches keep failing; beyond this the oldest are dropped (the next fetch job
+# still finds them through /new) so a long outage cannot grow the buffer without limit
+MAX_HELD_ROWS = int(os.getenv("STREAM_MAX_HELD_ROWS", str(20 * BATCH_SIZE)))
+MAX_RETRY_SECONDS = 600
+RECONNECT_SECONDS = 5
+MAX_RECONNECT_SECONDS = 300
+
+
+class RedditSource:
+    """Post rows from the live submission streams; yields None whenever the stream is idle."""
+
+    def __init__(self, state, subreddits=None):
+        from app import SUBREDDITS
+        self.state = state
+        self.subreddits = subreddits or SUBREDDITS
+        # Stream items carry Reddit's capitalisation; marks are kept under the configured names
+        self.names = {sub.lower(): sub for sub in self.subreddits}
+
+    def catch_up(self, reddit):
+        """Posts newer than each subreddit's high-water mark, so a restart leaves no gap."""
+        from app import fetch_new, note_short_run
+        rows = []
+        for sub in self.subreddits:
+            posts, reached = fetch_new(reddit, sub, self.state.high_water_mark(sub))
+            print(f"   r/{sub}: {len(posts)} posts since the last checkpoint")
+            if reached or not posts:
+                self.state.reached(sub)
+            else:
+                note_short_run(self.state, sub, posts[-1]['created_utc'])
+            rows.extend(reversed(posts))
+        return rows
+
+    def __iter__(self):
+        from app import make_reddit, process_post, REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET
+        from fetcher import TokenBucket, is_retryable, REQUESTS_PER_MIN
+        if not REDDIT_CLIENT_ID or not REDDIT_CLIENT_SECRET:
+            sys.exit("❌ Error: Reddit API credentials (ID or Secret) are missing in .env file.")
+        limiter = TokenBucket(REQUESTS_PER_MIN / 60.0)
+        wait = RECONNECT_SECONDS
+        while True:
+            try:
+                reddit = make_reddit(limiter)
+                yield from self.catch_up(reddit)
+                stream = reddit.subreddit("+".join(self.subreddits)).stream.submissions(pause_after=0)
+                print(f"📡 Following {len(self.subreddits)} subreddit streams...")
+                for post in stream:
+                    if post is None:
+                        yield None
+                        continue
+                    wait = RECONNECT_SECONDS
+                    name = post.subreddit.display_name
+                    yield process_post(post, self.names.get(name.lower(), name))
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                print(f"⚠️ Stream interrupted ({e}); reconnecting in {wait:.0f}s")
+                time.sleep(wait)
+                wait = min(wait * 2, MAX_RECONNECT_SECONDS)
+
+
+class ReplaySource:
+    """Recorded posts (JSONL from --record, CSV or Parquet) in created_utc order.
+
+    speed=0 replays as fast as possible; otherwise gaps between posts are slept
+    through at `speed`× real time, yielding None while idle like the live stream.
+    """
+
+    def __init__(self, path, speed=0.0):
+        self.path = path
+        self.speed = speed
+
+    def load(self):
+        if self.path.endswith(".parquet"):
+            df = pd.read_parquet(self.path)
+        elif self.path.endswith(".csv"):
+            df = pd.read_csv(self.path)
+        else:
+            df = pd.read_json(self.path, lines=True, dtype={"id": str})
+        df['created_utc'] = pd.to_numeric(df['created_utc'], errors='coerce')
+        df = df.sort_values('created_utc', kind='stable')
+        return df.astype(object).where(df.notna(), None).to_dict("records")
+
+    def __iter__(self):
+        previous = None
+        for row in self.load():
+            ts = row.get('created_utc')
+            if self.speed > 0 and previous is not None and ts is not None:
+                pause = (ts - previous) / self.speed
+                while pause > 0:
+                    time.sleep(min(pause, 1.0))
+                    pause -= 1.0
+                    if pause > 0:
+                        yield None
+            previous = ts if ts is not None else previous
+            yield row
+
+
+class Recorder:
+    """Appends every incoming post as a JSON line that ReplaySource can play back."""
+
+    def __init__(self, path):
+        self.f = open(path, "a", encoding="utf-8")
+
+    def write(self, row):
+        self.f.write(json.dumps(row, default=str) + "\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class MicroBatcher:
+    def __init__(self, max_rows=BATCH_SIZE, max_seconds=BATCH_SECONDS, clock=time.monotonic,
+                 max_held=MAX_HELD_ROWS, max_retry_seconds=MAX_RETRY_SECONDS):
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.clock = clock
+        self.max_held = max_held
+        self.max_retry_seconds = max_retry_seconds
+        self.rows = []
+        self.started = None
+        self.failures = 0
+        self.retry_at = None
+        self.dropped = 0
+
+    def add(self, row):
+        if not self.rows:
+            self.started = self.clock()
+        self.rows.append(row)
+        if len(self.rows) > self.max_held:
+            drop = len(self.rows) - self.max_held
+            if not self.dropped:
+                print(f"⚠️ Holding more than {self.max_held} posts; dropping the oldest until a batch succeeds")
+            self.rows = self.rows[drop:]
+            self.dropped += drop
+
+    def due(self):
+        if not self.rows or (self.retry_at is not None and self.clock() < self.retry_at):
+            return False
+        return len(self.rows) >= self.max_rows or self.clock() - self.started >= self.max_seconds
+
+    def defer(self, failed=False):
+        """Keep the rows and try again after one window (e.g. while the pipeline lock is held),
+        or after an exponentially growing wait when the batch failed."""
+        self.started = self.clock()
+        if failed:
+            self.failures += 1
+            wait = min(self.max_seconds * 2 ** (self.failures - 1), self.max_retry_seconds)
+        else:
+            wait = self.max_seconds
+        self.retry_at = self.started + wait
+        return wait
+
+    def take(self):
+        rows, self.rows = self.rows, []
+        self.failures, self.retry_at, self.dropped = 0, None, 0
+        return rows
+
+
+def _write_checkpoint(ids, since, days):
+    tmp = CHECKPOINT_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"pending": ids, "since": since, "days": days}, f)
+    os.replace(tmp, CHECKPOINT_PATH)
+
+
+def _days(ts):
+    return sorted({str(d) for d in pd.to_datetime(ts, unit='s').dt.date.dropna()})
+
+
+def recover(state):
+    """Finish a batch that was appended but not fully committed (crash or error after the append).
+
+    Its posts are marked seen, the rollups of its days are rebuilt from the store (so
+    they count it exactly once whether or not add_posts ran) and it is spike-checked.
+    """
+    from alert import check_for_spikes
+    try:
+        with open(CHECKPOINT_PATH) as f:
+            pending = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    ids = set(pending.get("pending") or [])
+    stored = pd.DataFrame()
+    if ids:
+        since = pending.get("since")
+        stored = read_posts(columns=rollups.ROLLUP_SOURCE_COLUMNS + ['id'], since=since)
+        days = set(pd.to_datetime(pending.get("days") or _days(stored['created_utc'][stored['id'].isin(ids)])).date)
+        if days and rollups.read_daily() is not None:
+            rollups.update_rollups(stored, days)
+        stored = stored[stored['id'].isin(ids)]
+        state.record(stored)
+        # The detector's watermark skips whatever it already saw
+        check_for_spikes(stored)
+    os.remove(CHECKPOINT_PATH)
+    if len(stored):
+        print(f"🩹 Recovered checkpoint for {len(stored)} posts from an interrupted batch")
+    return len(stored)
+
+
+def process_batch(rows, state, replay=False):
+    """NLP, store and spike-check one micro-batch; returns the posts that were new."""
+    from nlp import embeddings, keywords, sentiment
+    from alert import check_for_spikes
+    df = pd.DataFrame(rows).drop_duplicates(subset=['id'], keep='last')
+    df['id'] = df['id'].astype(str)
+    snapshots.record(df)
+    df = df[~df['id'].isin(state.seen(df['id']))].reset_index(drop=True)
+    if df.empty:
+        return df
+    df['created_utc'] = pd.to_numeric(df['created_utc'], errors='coerce')
+    embeddings.run(df)
+    df = keywords.run(df, save=False)
+    df = sentiment.run(df, save=False)
+    # From the append until the checkpoint is removed, a failure is finished by recover()
+    since = float(df['created_utc'].min())
+    _write_checkpoint(df['id'].tolist(), float(pd.Timestamp(since, unit='s').floor('D').timestamp()), _days(df['created_utc']))
+    append_posts(df)
+    # The next fetch stage skips these ids, so it would not report their days as changed
+    rollups.add_posts(df)
+    state.record(df)
+    # Replayed posts are judged at their own time, so a recorded burst alerts like it did live
+    check_for_spikes(df, now=float(df['created_utc'].max()) if replay else None)
+    os.remove(CHECKPOINT_PATH)
+    return df
+
+
+def flush(batcher, state, replay=False):
+    try:
+        with pipeline_lock(timeout=LOCK_WAIT_SECONDS):
+            added = process_batch(batcher.rows, state, replay)
+    except PipelineBusy:
+        print(f"⏳ Pipeline run in progress; holding {len(batcher.rows)} posts for the next window")
+        batcher.defer()
+        return None
+    except Exception as e:
+        # Anything already appended is finished by recover(); the rest is retried with backoff
+        wait = batcher.defer(failed=True)
+        print(f"❌ Batch of {len(batcher.rows)} posts failed: {e}; retrying in {wait:.0f}s")
+        update_status("jobs", "stream", state="failed", error=str(e))
+        try:
+            with pipeline_lock(timeout=LOCK_WAIT_SECONDS):
+                recover(state)
+        except Exception as recover_error:
+            print(f"   ⚠️ Recovery deferred to the next start: {recover_error}")
+        return None
+    batcher.take()
+    if len(added):
+        print(f"✅ [{time.strftime('%H:%M:%S')}] Stored {len(added)} new posts")
+    update_status("jobs", "stream", state="ok", last_success=time.time(), posts=len(added))
+    return added
+
+
+def run(source=None, record_path=None, replay=False):
+    state = IngestState()
+    with pipeline_lock():
+        recover(state)
+    source = source if source is not None else RedditSource(state)
+    recorder = Recorder(record_path) if record_path else None
+    batcher = MicroBatcher()
+    total = 0
+    try:
+        for row in source:
+            if row is not None:
+                batcher.add(row)
+                if recorder:
+                    recorder.write(row)
+            if batcher.due():
+                added = flush(batcher, state, replay)
+                total += len(added) if added is not None else 0
+        # A replay has ended: commit what is left
+        if batcher.rows:
+            added = flush(batcher, state, replay)
+            total += len(added) if added is not None else 0
+    finally:
+        if recorder:
+            recorder.close()
+        state.close()
+    return total
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    args = sys.argv[1:]
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args and args.index(name) + 1 < len(args) else default
+    replay_path = option("--replay")
+    source = ReplaySource(replay_path, float(option("--speed", "0"))) if replay_path else None
+    try:
+        total = run(source, record_path=option("--record"), replay=bool(replay_path))
+        print(f"🏁 Stream ended: {total} new posts stored")
+    except KeyboardInterrupt:
+        print("👋 Stream ingester stopped.")
@@ -0,0 +1,5 @@
+# tests/conftest.py — The modules are top-level scripts run from the repo root
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
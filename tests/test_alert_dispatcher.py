@@ -0,0 +1,80 @@
+# Queued alerts are deduplicated by key, coalesced per flush and held back during the cooldown
+import types
+import pytest
+import alert_dispatcher
+from alert_dispatcher import AlertDispatcher
+
+
+class RecordingTransport:
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+
+    def send(self, text):
+        if self.fail:
+            raise ConnectionError("down")
+        self.sent.append(text)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(alert_dispatcher, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def make(tmp_path, transport, cooldown_minutes=60):
+    return AlertDispatcher(transport, path=str(tmp_path / "queue.db"), cooldown_minutes=cooldown_minutes)
+
+
+def test_duplicate_keys_are_queued_once(tmp_path, clock):
+    transport = RecordingTransport()
+    d = make(tmp_path, transport)
+    assert d.enqueue("spike ai", "keyword:ai")
+    assert not d.enqueue("spike ai again", "keyword:ai")
+    assert d.enqueue("spike rust", "keyword:rust")
+    assert d.flush() == 2
+    # Both alerts go out together in one digest
+    assert len(transport.sent) == 1
+    assert "spike ai" in transport.sent[0] and "spike rust" in transport.sent[0]
+    assert "again" not in transport.sent[0]
+    d.close()
+
+
+def test_cooldown_drops_repeats_until_it_expires(tmp_path, clock):
+    transport = RecordingTransport()
+    d = make(tmp_path, transport, cooldown_minutes=60)
+    d.enqueue("spike ai", "keyword:ai")
+    d.flush()
+    clock[0] += 59 * 60
+    assert not d.enqueue("spike ai", "keyword:ai")
+    clock[0] += 2 * 60
+    assert d.enqueue("spike ai", "keyword:ai")
+    d.flush()
+    assert transport.sent == ["spike ai", "spike ai"]
+    d.close()
+
+
+def test_failed_delivery_keeps_alerts_queued(tmp_path, clock):
+    d = make(tmp_path, RecordingTransport(fail=True))
+    d.enqueue("spike ai", "keyword:ai")
+    assert d.flush() == 0
+    assert len(d.pending()) == 1
+    # Not delivered, so no cooldown starts; the key is still deduplicated against the queue
+    assert not d.enqueue("spike ai", "keyword:ai")
+    d.transport = RecordingTransport()
+    assert d.flush() == 1
+    assert d.pending() == []
+    d.close()
+
+
+def test_queue_survives_restarts(tmp_path, clock):
+    d = make(tmp_path, RecordingTransport(fail=True))
+    d.enqueue("spike ai", "keyword:ai")
+    d.flush()
+    d.close()
+    transport = RecordingTransport()
+    d = make(tmp_path, transport)
+    assert d.flush() == 1
+    assert transport.sent == ["spike ai"]
+    d.close()
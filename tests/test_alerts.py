@@ -0,0 +1,55 @@
+# The alerts stage sends everything its checks find as one digest
+import sys
+import types
+import pandas as pd
+import pytest
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, text):
+        self.sent.append(text)
+
+
+class FakeDetector:
+    watermark = None
+    bucket_seconds = 3600
+
+    def process(self, df, now=None):
+        return [{"key": "keyword:ai", "bucket_start": 0, "count": 40, "baseline": 4.0, "z": 6.0}]
+
+    def save(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def transport(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import alert, alert_dispatcher
+    transport = RecordingTransport()
+    monkeypatch.setattr(alert_dispatcher, "_transport", transport)
+    monkeypatch.setattr(alert, "SpikeDetector", FakeDetector)
+    rising = pd.DataFrame({"post_id": ["p1"], "subreddit": ["python"], "title": ["Big news"], "score": [900],
+                           "score_velocity": [800.0], "comment_velocity": [50.0], "score_acceleration": [1.0]})
+    monkeypatch.setitem(sys.modules, "snapshots", types.SimpleNamespace(rising_posts=lambda top_n: rising))
+    return transport
+
+
+def test_run_checks_sends_one_digest(transport):
+    import alert
+    ranking = pd.DataFrame({"topic": [3], "name": ["3_rust_cargo"], "freq": ["hourly"], "score": [9.0],
+                            "recent_posts": [25], "growth": [5.0], "sentiment": [0.2]})
+    alert.run_checks(pd.DataFrame({"created_utc": [0.0], "subreddit": ["python"], "keyword": ["ai"]}), ranking)
+    assert len(transport.sent) == 1
+    assert all(s in transport.sent[0] for s in ("keyword 'ai'", "3_rust_cargo", "Big news"))
+
+
+def test_standalone_check_still_sends(transport):
+    import alert
+    alert.check_rising_posts()
+    assert len(transport.sent) == 1 and "Big news" in transport.sent[0]
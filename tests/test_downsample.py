@@ -0,0 +1,53 @@
+# Chart helpers must stay within their point budget and keep the shape of the data
+import numpy as np
+import pandas as pd
+from downsample import box_stats, downsample_lines, lttb, sample_scatter
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[437] = 50.0
+    keep = lttb(x, y, 20)
+    assert len(keep) == 20
+    assert keep[0] == 0 and keep[-1] == 999
+    assert 437 in keep
+    assert list(keep) == sorted(keep)
+
+
+def test_lines_stay_within_budget_with_many_series():
+    df = pd.DataFrame({"x": np.tile(np.arange(3), 50), "y": np.repeat(np.arange(50, dtype=float), 3),
+                       "series": np.repeat([f"s{i}" for i in range(50)], 3)})
+    out = downsample_lines(df, "x", "y", color="series", budget=100)
+    assert len(out) <= 100
+    # The largest series are the ones kept
+    assert "s49" in set(out["series"]) and "s0" not in set(out["series"])
+
+
+def test_lines_split_the_budget_between_series():
+    df = pd.DataFrame({"x": np.tile(np.arange(500), 2), "y": np.random.default_rng(0).random(1000),
+                       "series": np.repeat(["a", "b"], 500)})
+    out = downsample_lines(df, "x", "y", color="series", budget=100)
+    assert out.groupby("series").size().to_dict() == {"a": 50, "b": 50}
+
+
+def test_scatter_stays_within_budget_with_many_groups():
+    df = pd.DataFrame({"v": np.arange(10000), "g": np.arange(10000) % 5000})
+    out = sample_scatter(df, budget=2000, by="g")
+    assert len(out) <= 2000
+
+
+def test_scatter_keeps_small_groups_visible_when_it_can():
+    df = pd.DataFrame({"v": np.arange(10003), "g": ["big"] * 10000 + ["tiny"] * 3})
+    out = sample_scatter(df, budget=500, by="g")
+    assert len(out) <= 500
+    assert set(out["g"]) == {"big", "tiny"}
+    # Same points on every call
+    pd.testing.assert_frame_equal(out, sample_scatter(df, budget=500, by="g"))
+
+
+def test_box_stats_uses_tukey_whiskers():
+    stats = box_stats([1, 2, 3, 4, 100])
+    assert (stats["q1"], stats["median"], stats["q3"]) == ([2.0], [3.0], [4.0])
+    assert (stats["lowerfence"], stats["upperfence"]) == ([1.0], [4.0])
+    assert box_stats([]) is None
@@ -0,0 +1,119 @@
+# The shared TokenBucket must keep every worker thread under the request budget;
+# failed fetches are retried with backoff unless the error is permanent
+import threading
+import time
+import types
+import pytest
+from prawcore.exceptions import NotFound, ResponseException
+import fetcher
+from fetcher import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(fetcher, "time", clock)
+    return clock
+
+
+def test_bucket_stays_under_its_rate(clock):
+    bucket = TokenBucket(10.0, capacity=5)
+    start = clock.now
+    for _ in range(105):
+        bucket.acquire()
+    # The first 5 come from the initial burst, the other 100 at 10 per second
+    assert clock.now - start >= 10.0
+    assert clock.now - start < 10.5
+
+
+def test_exhausted_window_blocks_until_reset(clock):
+    bucket = TokenBucket(10.0)
+    bucket.acquire()
+    start = clock.now
+    bucket.update_from_headers({"x-ratelimit-remaining": "0", "x-ratelimit-reset": "30"})
+    bucket.acquire()
+    assert clock.now - start >= 30.0
+
+
+def test_headers_slow_the_rate_down(clock):
+    bucket = TokenBucket(10.0, capacity=1)
+    bucket.update_from_headers({"x-ratelimit-remaining": "20", "x-ratelimit-reset": "40"})
+    assert bucket.rate == pytest.approx(0.5)
+    start = clock.now
+    for _ in range(11):
+        bucket.acquire()
+    assert clock.now - start >= 19.0
+
+
+def test_threads_share_one_budget():
+    bucket = TokenBucket(50.0, capacity=1)
+    bucket.acquire()
+    start = time.monotonic()
+    threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(10)]) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 40 tokens at 50 per second, no matter how many threads ask for them
+    assert time.monotonic() - start >= 40 / 50.0 - 0.05
+
+
+class FakeEndpoint:
+    """Answers each item with the queued HTTP status codes in turn, then with a page of posts."""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        with self.lock:
+            self.calls.append(item)
+            codes = self.statuses.get(item, [])
+            status = codes.pop(0) if codes else 200
+        response = types.SimpleNamespace(status_code=status)
+        if status == 404:
+            raise NotFound(response)
+        if status != 200:
+            raise ResponseException(response)
+        return [f"{item}-post"]
+
+
+def test_retryable_errors():
+    response = lambda status: types.SimpleNamespace(status_code=status)
+    assert fetcher.is_retryable(ResponseException(response(503)))
+    assert fetcher.is_retryable(ConnectionError("reset by peer"))
+    assert not fetcher.is_retryable(ResponseException(response(403)))
+    assert not fetcher.is_retryable(NotFound(response(404)))
+
+
+def test_fetch_concurrently_retries_with_backoff(clock, monkeypatch):
+    monkeypatch.setattr(fetcher.random, "random", lambda: 0.5)
+    endpoint = FakeEndpoint({"flaky": [503, 429], "gone": [404], "down": [503] * 10})
+    start = clock.now
+    results = fetcher.fetch_concurrently(["ok", "flaky", "gone", "down"], endpoint, max_workers=4)
+
+    assert [item for item, _, _ in results] == ["ok", "flaky", "gone", "down"]
+    assert results[0][1:] == (["ok-post"], None)
+    assert results[1][1:] == (["flaky-post"], None)
+    assert isinstance(results[2][2], NotFound)
+    assert isinstance(results[3][2], ResponseException)
+    # A 404 is not retried; a dead endpoint gets MAX_RETRIES more tries
+    assert endpoint.calls.count("gone") == 1
+    assert endpoint.calls.count("flaky") == 3
+    assert endpoint.calls.count("down") == fetcher.MAX_RETRIES + 1
+    # Backoff doubles each attempt (jitter pinned to 1x), summed across the worker threads
+    backoff = fetcher.BACKOFF_BASE
+    expected = backoff * (1 + 2) + backoff * sum(2 ** i for i in range(fetcher.MAX_RETRIES))
+    assert clock.now - start == pytest.approx(expected)
@@ -0,0 +1,39 @@
+# Vectorized Holt-Winters over many series and the history filter in front of it
+import numpy as np
+import pandas as pd
+import pytest
+from forecast.batch import build_series, holt_winters, long_enough
+
+
+def test_constant_series_forecasts_flat():
+    yhat = holt_winters(np.full((2, 28), 5.0), horizon=7)
+    assert yhat.shape == (2, 7)
+    assert yhat == pytest.approx(np.full((2, 7), 5.0))
+
+
+def test_weekly_pattern_carries_into_the_forecast():
+    week = np.array([10, 10, 10, 10, 10, 2, 2], dtype=float)
+    yhat = holt_winters(np.tile(week, 8)[None, :], horizon=7)[0]
+    assert yhat == pytest.approx(week, abs=1.0)
+
+
+def test_series_are_forecast_independently_and_never_negative():
+    trend = np.arange(28, dtype=float)
+    falling = np.maximum(27 - 3 * np.arange(28), 0).astype(float)
+    yhat = holt_winters(np.vstack([trend, falling]), horizon=7)
+    # Each series matches its forecast when run alone
+    assert yhat[0] == pytest.approx(holt_winters(trend[None, :], horizon=7)[0])
+    assert yhat[0][-1] > yhat[0][0] > 20
+    assert (yhat >= 0).all()
+
+
+def test_build_series_and_history_filter():
+    days = pd.date_range("2024-01-01", periods=20, freq="D").date
+    daily = pd.DataFrame({"date": list(days) + [days[-1]], "subreddit": "python",
+                          "keyword": ["ai"] * 20 + ["rust"], "posts": 1})
+    matrix, meta = build_series(daily, history_days=20)
+    assert matrix.shape == (4, 20)
+    assert matrix.loc["total"].iloc[-1] == 2 and matrix.loc["keyword:rust"].sum() == 1
+    assert meta.loc["subreddit:python", "kind"] == "subreddit"
+    assert dict(zip(matrix.index, long_enough(matrix, min_days=14))) == {
+        "keyword:ai": True, "keyword:rust": False, "subreddit:python": True, "total": True}
@@ -0,0 +1,65 @@
+# High-water marks: same-second posts are kept, short backfills hold the mark for a bounded number of runs
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+import app
+import ingest_state
+from ingest_state import IngestState
+
+
+class FakeReddit:
+    def __init__(self, times):
+        self.posts = [SimpleNamespace(id=f"p{t}-{i}", title="t", score=1, url="", num_comments=0,
+                                      created_utc=t, selftext="") for i, t in enumerate(times)]
+
+    def subreddit(self, name):
+        return SimpleNamespace(new=lambda limit: iter(self.posts[:limit]))
+
+
+def posts(*times, sub="python"):
+    return pd.DataFrame({"id": [f"x{t}" for t in times], "subreddit": sub, "created_utc": [float(t) for t in times]})
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ingest_state, "MAX_SHORT_RUNS", 2)
+    state = IngestState(str(tmp_path / "state.db"))
+    yield state
+    state.close()
+
+
+def test_fetch_new_keeps_posts_from_the_marks_second(monkeypatch):
+    monkeypatch.setattr(app, "BACKFILL_LIMIT", 10)
+    fetched, reached = app.fetch_new(FakeReddit([12, 10, 10, 9]), "python", 10)
+    assert [p["created_utc"] for p in fetched] == [12, 10, 10]
+    assert reached
+
+
+def test_fetch_new_reports_a_short_backfill(monkeypatch):
+    monkeypatch.setattr(app, "BACKFILL_LIMIT", 2)
+    fetched, reached = app.fetch_new(FakeReddit([12, 11, 10, 9]), "python", 5)
+    assert len(fetched) == 2
+    assert not reached
+
+
+def test_short_runs_hold_the_mark_then_record_a_gap(state):
+    state.record(posts(100))
+    assert state.short_run("python", 500)
+    state.record(posts(600))
+    assert state.high_water_mark("python") == 100
+    assert state.short_run("python", 700)
+    # Third short run in a row: the gap is given up and the mark moves on
+    assert not state.short_run("python", 800)
+    assert state.gaps()[0][:3] == ("python", 100.0, 800.0)
+    state.record(posts(900))
+    assert state.high_water_mark("python") == 900
+
+
+def test_reaching_the_mark_resets_the_count(state):
+    state.record(posts(100))
+    assert state.short_run("python", 500)
+    assert state.short_run("python", 500)
+    state.reached("python")
+    assert state.short_run("python", 500)
+    assert state.gaps() == []
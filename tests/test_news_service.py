@@ -0,0 +1,89 @@
+# RSS refetches send the stored ETag; a 304 keeps serving the cached entries
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from news_service import NewsService
+
+FEED = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>news</title>
+<item><title>AI chips sell out</title><link>https://example.com/1</link>
+<pubDate>Mon, 06 Jan 2025 10:00:00 GMT</pubDate></item>
+<item><title>Rust 2.0 announced</title><link>https://example.com/2</link>
+<pubDate>Mon, 06 Jan 2025 09:00:00 GMT</pubDate></item>
+</channel></rss>"""
+ETAG = '"v1"'
+
+
+@pytest.fixture
+def feed_server():
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(dict(self.headers))
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.end_headers()
+                return
+            if server.failing:
+                self.send_response(503)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("Content-Length", str(len(FEED)))
+            self.end_headers()
+            self.wfile.write(FEED)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    server.failing = False
+    server.requests_seen = requests_seen
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make(tmp_path, server):
+    url = f"http://127.0.0.1:{server.server_port}/rss?q={{query}}"
+    return NewsService(path=str(tmp_path / "news.db"), api_key=None, rss_url=url, max_workers=2)
+
+
+def test_not_modified_reuses_cached_entries(tmp_path, feed_server):
+    service = make(tmp_path, feed_server)
+    assert service.refresh(["ai"]) == {}
+    entries, first_fetch = service.get("ai")
+    assert [e["title"] for e in entries] == ["AI chips sell out", "Rust 2.0 announced"]
+
+    assert service.refresh(["ai"], force=True) == {}
+    assert feed_server.requests_seen[-1].get("If-None-Match") == ETAG
+    cached, second_fetch = service.get("ai")
+    assert cached == entries
+    assert second_fetch >= first_fetch
+    service.close()
+
+
+def test_fresh_keywords_are_not_refetched(tmp_path, feed_server):
+    service = make(tmp_path, feed_server)
+    service.refresh(["ai", "rust"])
+    assert len(feed_server.requests_seen) == 2
+    assert service.stale(["ai", "rust", "go"]) == ["go"]
+    service.refresh(["ai", "rust"])
+    assert len(feed_server.requests_seen) == 2
+    service.close()
+
+
+def test_failed_refresh_keeps_serving_the_cache(tmp_path, feed_server):
+    service = make(tmp_path, feed_server)
+    feed_server.failing = True
+    failed = service.refresh(["go"])
+    assert "go" in failed
+    assert service.get("go") == ([], None)
+    # Never fetched successfully, so it stays stale and is retried next time
+    assert service.stale(["go"]) == ["go"]
+    service.close()
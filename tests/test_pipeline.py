@@ -0,0 +1,96 @@
+# PipelineContext merges stage output back and rewrites only the day partitions it touched
+import sys
+import types
+import pandas as pd
+import pytest
+
+DAY = 86400
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import storage
+    posts = pd.DataFrame({
+        "id": [f"p{i}" for i in range(6)],
+        "title": [f"post {i}" for i in range(6)],
+        "created_utc": [float(DAY * (i // 2)) for i in range(6)],
+        "subreddit": "python",
+        "topic": [0, 0, 1, 1, 2, 2],
+    })
+    storage.write_posts(posts)
+    return storage
+
+
+def saved(storage):
+    return storage.read_posts().sort_values("id").reset_index(drop=True)
+
+
+def test_stage_topics_saves_reassigned_topics(store, monkeypatch):
+    import pipeline
+
+    def assign(df, save=True):
+        # Like topic_model.run: topics are assigned on the frame it is given
+        df.loc[df["id"] == "p5", "topic"] = 7
+        return df
+
+    monkeypatch.setitem(sys.modules, "topic_model", types.SimpleNamespace(run=assign))
+    ctx = pipeline.PipelineContext()
+    pipeline.stage_topics(ctx)
+    assert ctx.dirty_partitions == {"1970-01-03"}
+    ctx.save()
+    assert saved(store)["topic"].tolist() == [0, 0, 1, 1, 2, 7]
+
+
+def test_update_posts_only_marks_changed_days(store):
+    import pipeline
+    ctx = pipeline.PipelineContext()
+    rows = ctx.posts().iloc[[0, 2]].copy()
+    rows.loc[rows.index[1], "topic"] = 9
+    ctx.update_posts(rows)
+    assert ctx.dirty_partitions == {"1970-01-02"}
+    ctx.save()
+    assert saved(store)["topic"].tolist() == [0, 0, 9, 1, 2, 2]
+
+
+def test_update_posts_treats_empty_and_missing_strings_alike(store):
+    import pipeline
+    ctx = pipeline.PipelineContext()
+    df = ctx.posts()
+    # The store keeps "" as null; a stage handing back "" for those rows changed nothing
+    rows = df.assign(keyword="").iloc[[0, 1]]
+    ctx._posts = df.assign(keyword=None)
+    ctx.update_posts(rows)
+    assert ctx.dirty_partitions == set()
+
+
+def test_work_selects_changed_days_and_missing_values(store):
+    import pipeline
+    import datetime
+    ctx = pipeline.PipelineContext()
+    ctx._posts = ctx.posts().assign(keyword=["a", "b", "c", None, "e", "f"])
+    ctx.changed_days = {datetime.date(1970, 1, 1)}
+    assert sorted(ctx.work("keyword")["id"]) == ["p0", "p1", "p3"]
+    # Without a fetch every row is reprocessed
+    ctx.changed_days = None
+    assert len(ctx.work("keyword")) == 6
+
+
+def test_updated_days_count_as_changed_for_rollups(store):
+    import pipeline
+    import datetime
+    ctx = pipeline.PipelineContext()
+    ctx.changed_days = set()
+    rows = ctx.posts().iloc[[4]].copy()
+    rows["topic"] = 5
+    ctx.update_posts(rows)
+    assert ctx.changed_days == {datetime.date(1970, 1, 3)}
+
+
+def test_set_posts_rewrites_the_whole_store(store):
+    import pipeline
+    ctx = pipeline.PipelineContext()
+    ctx.set_posts(ctx.posts().iloc[:2])
+    ctx.save()
+    assert saved(store)["id"].tolist() == ["p0", "p1"]
+    assert not ctx.dirty and ctx.dirty_partitions == set()
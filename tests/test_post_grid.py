@@ -0,0 +1,50 @@
+# Indexed paging must return the same rows as filtering and sorting the frame directly
+import numpy as np
+import pandas as pd
+from post_grid import PostGrid
+
+
+def frame():
+    return pd.DataFrame({
+        "id": ["a", "b", "c", "d", "e"],
+        "title": ["Rust 2.0", "AI news", "More AI", "rust tips", "Untitled"],
+        "keyword": ["rust", "ai", "ai", "rust", None],
+        "score": [5, 50, np.nan, 20, 1],
+        "created_utc": [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+
+
+def ids(grid, positions):
+    return grid.take(positions)["id"].tolist()
+
+
+def test_keyword_rows_in_sort_order():
+    grid = PostGrid(frame())
+    assert ids(grid, grid.query("rust", sort="score")) == ["d", "a"]
+    assert ids(grid, grid.query("rust", sort="score", descending=False)) == ["a", "d"]
+    assert ids(grid, grid.query(sort="created_utc")) == ["e", "d", "c", "b", "a"]
+    # Missing keywords are grouped under "" and unknown ones match nothing
+    assert ids(grid, grid.query("")) == ["e"]
+    assert len(grid.query("python")) == 0
+
+
+def test_missing_values_sort_last_both_ways():
+    grid = PostGrid(frame())
+    assert ids(grid, grid.query("ai", sort="score"))[-1] == "c"
+    assert ids(grid, grid.query("ai", sort="score", descending=False))[-1] == "c"
+
+
+def test_search_is_case_insensitive_and_cached():
+    grid = PostGrid(frame())
+    assert ids(grid, grid.query(search="RUST")) == ["d", "a"]
+    first = grid.query(search=" ai ")
+    assert ids(grid, first) == ["c", "b"]
+    assert grid.query(search="ai") is first
+
+
+def test_page_slices_the_result():
+    grid = PostGrid(frame())
+    positions = grid.query(sort="created_utc", descending=False)
+    assert grid.page(positions, 1, 2)["id"].tolist() == ["c", "d"]
+    assert grid.page(positions, 2, 2, columns=["id", "score"]).columns.tolist() == ["id", "score"]
+    assert grid.page(positions, 3, 2).empty
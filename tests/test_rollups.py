@@ -0,0 +1,47 @@
+# Incremental rollup updates must match a full rebuild from the posts
+import pandas as pd
+import pytest
+
+DAY = 86400
+
+
+@pytest.fixture
+def rollups(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import rollups
+    return rollups
+
+
+def posts(n, day, keyword="ai"):
+    return pd.DataFrame({"created_utc": [day * DAY + i * 60.0 for i in range(n)], "subreddit": "python",
+                         "keyword": keyword, "sentiment": 0.5, "score": 10, "num_comments": 2})
+
+
+def normalized(daily):
+    return daily.sort_values(["date", "subreddit", "keyword"]).reset_index(drop=True)
+
+
+def test_build_daily_sums_per_key(rollups):
+    daily = rollups.build_daily(pd.concat([posts(3, 0), posts(2, 0, keyword=None), posts(1, 1)]))
+    row = daily[(daily["keyword"] == "ai") & (daily["date"] == pd.Timestamp(0, unit="s").date())].iloc[0]
+    assert (row["posts"], row["sentiment_sum"], row["score_sum"], row["comments_sum"]) == (3, 1.5, 30, 6)
+    # Posts without a keyword keep their own row instead of being dropped
+    assert daily["keyword"].isna().sum() == 1
+    assert daily["posts"].sum() == 6
+
+
+def test_changed_days_match_a_full_rebuild(rollups):
+    df = pd.concat([posts(3, 0), posts(2, 1)], ignore_index=True)
+    rollups.update_rollups(df)
+    df = pd.concat([df, posts(4, 1, keyword="rust")], ignore_index=True)
+    updated = rollups.update_rollups(df, days={pd.Timestamp(DAY, unit="s").date()})
+    assert normalized(updated).equals(normalized(rollups.build_daily(df)))
+
+
+def test_add_posts_folds_in_new_rows(rollups):
+    df = posts(3, 0)
+    assert rollups.add_posts(df) is None  # nothing to add to until the rollups stage builds the table
+    rollups.update_rollups(df)
+    new = pd.concat([posts(2, 0), posts(1, 2, keyword="rust")], ignore_index=True)
+    added = rollups.add_posts(new)
+    assert normalized(added).equals(normalized(rollups.build_daily(pd.concat([df, new]))))
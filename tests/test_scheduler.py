@@ -0,0 +1,34 @@
+# Queued runs stay queued until the scheduler manages to run them
+import pytest
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import scheduler
+    return scheduler
+
+
+def test_busy_or_failed_request_stays_queued(scheduler, monkeypatch):
+    import pipeline
+    outcomes = [False, True]
+    monkeypatch.setattr(scheduler, "run_job", lambda name, stages: outcomes.pop(0))
+    pipeline.request_run(["fetch"])
+
+    pending = scheduler.run_requests(now=0)
+    assert [r["stages"] for r in pending] == [["fetch"]]
+    assert pending[0]["attempts"] == 1
+    # Not retried before its backoff is up
+    assert scheduler.run_requests(now=0) == pending
+    assert outcomes == [True]
+
+    assert scheduler.run_requests(now=float("inf")) == []
+
+
+def test_request_dropped_after_max_attempts(scheduler, monkeypatch):
+    import pipeline
+    monkeypatch.setattr(scheduler, "run_job", lambda name, stages: False)
+    pipeline.request_run(["fetch"])
+    for _ in range(scheduler.MAX_REQUEST_ATTEMPTS - 1):
+        assert scheduler.run_requests(now=float("inf"))
+    assert scheduler.run_requests(now=float("inf")) == []
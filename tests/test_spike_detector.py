@@ -0,0 +1,64 @@
+# Per-key EWMA baselines flag a burst in the current bucket, not old ones
+import pandas as pd
+import pytest
+from spike_detector import SpikeDetector
+
+HOUR = 3600
+
+
+@pytest.fixture
+def make(tmp_path):
+    detectors = []
+
+    def make(**kwargs):
+        d = SpikeDetector(path=str(tmp_path / "spikes.db"), **{"warmup": 5, "min_count": 5, **kwargs})
+        detectors.append(d)
+        return d
+    yield make
+    for d in detectors:
+        d.close()
+
+
+def posts(hours, per_hour, keyword="ai"):
+    return pd.DataFrame({"created_utc": [h * HOUR + i for h in hours for i in range(per_hour)],
+                         "subreddit": "python", "keyword": keyword})
+
+
+def test_burst_after_steady_baseline_alerts_once(make):
+    d = make()
+    now = 10 * HOUR
+    assert d.process(posts(range(10), 2), now=now) == []
+    alerts = d.process(posts([10], 30), now=now)
+    keys = {a["key"] for a in alerts}
+    assert keys == {"total", "subreddit:python", "keyword:ai"}
+    ai = next(a for a in alerts if a["key"] == "keyword:ai")
+    assert ai["bucket_start"] == 10 * HOUR and ai["count"] >= 5 and ai["baseline"] < 3
+    # Later posts in the same bucket do not alert again
+    assert d.process(posts([10], 31).iloc[30:], now=now) == []
+
+
+def test_replayed_history_builds_baselines_without_alerting(make):
+    d = make()
+    history = pd.concat([posts(range(10), 2), posts([10], 30), posts(range(11, 20), 2)], ignore_index=True)
+    assert d.process(history, now=100 * HOUR) == []
+
+
+def test_state_survives_a_restart_and_ignores_old_posts(make):
+    d = make()
+    d.process(posts(range(10), 2), now=10 * HOUR)
+    d.save()
+    d.close()
+    d = make()
+    assert d.watermark == pytest.approx(9 * HOUR + 1)
+    # At or before the watermark: already counted
+    assert d.process(posts(range(9), 50), now=10 * HOUR) == []
+    assert len(d.process(posts([10], 30), now=10 * HOUR)) == 3
+
+
+def test_idle_keys_expire(make):
+    d = make(key_ttl_hours=24)
+    d.process(posts([0], 2, keyword="rare"), now=0)
+    d.process(posts([100], 2, keyword="ai"), now=100 * HOUR)
+    d.save()
+    stored = {k for (k,) in d.conn.execute("SELECT key FROM keys")}
+    assert "keyword:rare" not in stored and "keyword:ai" in stored
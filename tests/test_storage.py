@@ -0,0 +1,83 @@
+# Versioned Parquet post store: appends, compaction and the schema kept in each manifest
+import pandas as pd
+import pytest
+
+DAY = 86400
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import storage
+    return storage
+
+
+def posts(ids, day=0, **extra):
+    return pd.DataFrame({"id": ids, "title": [f"post {i}" for i in ids],
+                         "created_utc": float(day * DAY), "subreddit": "python", **extra})
+
+
+def day_files(storage, day):
+    return [f for f in storage._manifest(storage.store_version())["files"] if storage._day(f) == day]
+
+
+def test_appends_compact_small_files_of_the_day(storage, monkeypatch):
+    monkeypatch.setattr(storage, "COMPACT_MIN_FILES", 3)
+    storage.append_posts(posts(["a"], day=1))
+    for i in range(2):
+        storage.append_posts(posts([f"p{i}"]))
+    assert len(day_files(storage, "1970-01-01")) == 2
+
+    storage.append_posts(posts(["p2"], score=[5]))
+    assert len(day_files(storage, "1970-01-01")) == 1
+    assert len(day_files(storage, "1970-01-02")) == 1
+    df = storage.read_posts().set_index("id")
+    assert sorted(df.index) == ["a", "p0", "p1", "p2"]
+    assert df.loc["p2", "score"] == 5
+
+
+def test_manifest_schema_spares_reading_part_footers(storage, monkeypatch):
+    storage.append_posts(posts(["p0"]))
+    storage.append_posts(posts(["p1"], day=1, keyword=["ai"]))
+    calls = []
+    read_schema = storage.pq.read_schema
+    monkeypatch.setattr(storage.pq, "read_schema", lambda f: calls.append(f) or read_schema(f))
+
+    df = storage.read_posts(columns=["id", "keyword"]).set_index("id")
+    assert calls == []
+    assert df.loc["p1", "keyword"] == "ai" and pd.isna(df.loc["p0", "keyword"])
+    # Committing only reads the footers of the new files
+    storage.append_posts(posts(["p2"], day=2))
+    assert len(calls) == 1
+
+
+def test_pinned_version_keeps_reading_its_snapshot(storage):
+    first = storage.write_posts(posts(["p0", "p1"]))
+    storage.append_posts(posts(["p2"], day=1))
+    assert sorted(storage.read_posts(version=first)["id"]) == ["p0", "p1"]
+    assert sorted(storage.read_posts()["id"]) == ["p0", "p1", "p2"]
+    assert storage._manifest(storage.store_version())["parent"] == first
+
+
+def test_rollback_restores_an_earlier_snapshot(storage):
+    first = storage.write_posts(posts(["p0"]))
+    storage.rewrite_partitions(posts(["p0"], title=["edited"]))
+    storage.rollback(first)
+    assert storage.store_version() == first
+    assert storage.read_posts()["title"].tolist() == ["post p0"]
+    with pytest.raises(FileNotFoundError):
+        storage.rollback("v999999")
+
+
+def test_old_snapshots_are_pruned(storage, monkeypatch):
+    monkeypatch.setattr(storage, "ORPHAN_GRACE_SECONDS", -1)
+    first = storage.write_posts(posts(["p0"]))
+    for i in range(storage.KEEP_VERSIONS + 1):
+        storage.write_posts(posts([f"p{i}"]))
+    assert first not in storage.list_versions()
+    assert len(storage.list_versions()) == storage.KEEP_VERSIONS + 1
+    with pytest.raises(FileNotFoundError):
+        storage.read_posts(version=first)
+    # Files only the pruned snapshots used are gone
+    kept = {f for v in storage.list_versions() for f in storage._manifest(v)["files"]}
+    assert set(storage._loose_files()) == kept
@@ -0,0 +1,126 @@
+# Replaying a recorded stream must be deterministic and idempotent
+import json
+import sqlite3
+import sys
+import types
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def stream(tmp_path, monkeypatch):
+    """stream_ingest with the NLP stages replaced by cheap deterministic stand-ins."""
+    import nlp
+    embeddings = types.SimpleNamespace(run=lambda df: None)
+    keywords = types.SimpleNamespace(run=lambda df, save=True: df.assign(keyword=df['title'].str.split().str[0].str.lower()))
+    sentiment = types.SimpleNamespace(run=lambda df, save=True: df.assign(sentiment=df['score'] / 100.0))
+    for name, module in (("embeddings", embeddings), ("keywords", keywords), ("sentiment", sentiment)):
+        monkeypatch.setitem(sys.modules, f"nlp.{name}", module)
+        monkeypatch.setattr(nlp, name, module, raising=False)
+    import stream_ingest
+    return stream_ingest
+
+
+def recording(path, n=40):
+    rows = [{"id": f"p{i}", "title": f"{'ai' if i % 3 else 'rust'} post {i}", "score": i, "url": "",
+             "num_comments": i % 5, "created_utc": 1_700_000_000 + 90 * i, "selftext": "",
+             "subreddit": "technology" if i % 2 else "python"} for i in range(n)]
+    # The recording holds every post twice, as a reconnecting stream would re-deliver them
+    with open(path, "w") as f:
+        for row in rows + rows[::2]:
+            f.write(json.dumps(row) + "\n")
+    return rows
+
+
+def replay(stream, workdir, path, monkeypatch):
+    monkeypatch.chdir(workdir)
+    added = stream.run(stream.ReplaySource(str(path)), replay=True)
+    from storage import read_posts
+    posts = read_posts().sort_values('id').reset_index(drop=True)
+    with sqlite3.connect("data/ingest_state.db") as conn:
+        marks = dict(conn.execute("SELECT subreddit, created_utc FROM marks"))
+        seen = {r[0] for r in conn.execute("SELECT id FROM seen")}
+    return added, posts, marks, seen
+
+
+def test_replay_stores_each_post_once(stream, tmp_path, monkeypatch):
+    rows = recording(tmp_path / "posts.jsonl")
+    (tmp_path / "run").mkdir()
+    added, posts, marks, seen = replay(stream, tmp_path / "run", tmp_path / "posts.jsonl", monkeypatch)
+    assert added == len(rows)
+    assert sorted(posts['id']) == sorted(r['id'] for r in rows)
+    assert seen == {r['id'] for r in rows}
+    assert marks == {"technology": rows[-1]['created_utc'], "python": rows[-2]['created_utc']}
+    assert not (tmp_path / "run" / "data" / "stream_checkpoint.json").exists()
+
+
+def test_replay_is_deterministic_and_idempotent(stream, tmp_path, monkeypatch):
+    recording(tmp_path / "posts.jsonl")
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+    _, posts_a, marks_a, seen_a = replay(stream, tmp_path / "a", tmp_path / "posts.jsonl", monkeypatch)
+    _, posts_b, marks_b, seen_b = replay(stream, tmp_path / "b", tmp_path / "posts.jsonl", monkeypatch)
+    pd.testing.assert_frame_equal(posts_a, posts_b)
+    assert (marks_a, seen_a) == (marks_b, seen_b)
+
+    # Replaying into a store that already has everything adds nothing and leaves the checkpoint alone
+    added, posts_again, marks_again, seen_again = replay(stream, tmp_path / "a", tmp_path / "posts.jsonl", monkeypatch)
+    assert added == 0
+    pd.testing.assert_frame_equal(posts_again, posts_a)
+    assert (marks_again, seen_again) == (marks_a, seen_a)
+    assert not (tmp_path / "a" / "data" / "stream_checkpoint.json").exists()
+
+
+def rollup_totals(daily):
+    return daily.groupby(['date', 'subreddit', 'keyword'], dropna=False)['posts'].sum().sort_index()
+
+
+def test_failure_after_append_is_recovered_into_rollups(stream, tmp_path, monkeypatch):
+    rows = recording(tmp_path / "posts.jsonl")
+    monkeypatch.chdir(tmp_path)
+    import rollups
+    from storage import read_posts
+    state = stream.IngestState()
+    stream.process_batch(rows[:10], state, replay=True)
+    rollups.run()
+
+    real_add = rollups.add_posts
+    calls = []
+    def flaky(df):
+        calls.append(len(df))
+        if len(calls) == 1:
+            raise OSError("disk full")
+        return real_add(df)
+    monkeypatch.setattr(rollups, "add_posts", flaky)
+
+    batcher = stream.MicroBatcher()
+    for row in rows[10:]:
+        batcher.add(row)
+    assert stream.flush(batcher, state, replay=True) is None
+    # The appended posts were finished by recover(): seen, counted once, checkpoint gone
+    assert not (tmp_path / "data" / "stream_checkpoint.json").exists()
+    assert state.seen([r['id'] for r in rows]) == {r['id'] for r in rows}
+    expected = rollup_totals(rollups.build_daily(read_posts()))
+    pd.testing.assert_series_equal(rollup_totals(rollups.read_daily()), expected)
+    # The retry finds nothing new and does not count the posts a second time
+    batcher.retry_at = None
+    assert len(stream.flush(batcher, state, replay=True)) == 0
+    pd.testing.assert_series_equal(rollup_totals(rollups.read_daily()), expected)
+    state.close()
+
+
+def test_failed_batches_back_off_and_held_rows_are_capped(stream):
+    now = [0.0]
+    batcher = stream.MicroBatcher(max_rows=3, max_seconds=10, clock=lambda: now[0], max_held=5, max_retry_seconds=35)
+    for i in range(3):
+        batcher.add({"id": str(i)})
+    assert batcher.due()
+    assert [batcher.defer(failed=True) for _ in range(4)] == [10, 20, 35, 35]
+    assert not batcher.due()
+    now[0] += 35
+    assert batcher.due()
+    for i in range(3, 10):
+        batcher.add({"id": str(i)})
+    assert [r["id"] for r in batcher.rows] == ["5", "6", "7", "8", "9"]
+    batcher.take()
+    assert (batcher.failures, batcher.retry_at) == (0, None)
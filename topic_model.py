@@ -1,26 +1,155 @@
 # topic_model.py (optional heavy) — run only if USE_BERTOPIC=true in .env
+# Online topic assignment: the saved model in models/bertopic_model assigns
+# topics to posts that do not have one yet (transform only, no refit). Once
+# enough new posts have arrived since the last fit, a model is fitted on just
+# those posts and merged into the saved one, so existing topic ids stay stable
+# and new themes are appended. Topics are written to the `topic` column of the
+# post store; labels and sizes go to data/topics.parquet.
+#   python topic_model.py          # assign new posts, refit when due
+#   python topic_model.py --full   # refit from scratch over all posts
 import os
+import sys
+import json
+import time
+import shutil
+import pandas as pd
 from dotenv import load_dotenv
 load_dotenv()
+from storage import posts_exist, read_posts, write_posts
+from nlp.embeddings import EMBEDDING_MODEL, EmbeddingStore, get_encoder
+
 USE_BERTOPIC = os.getenv("USE_BERTOPIC","false").lower() in ("1","true","yes")
-if not USE_BERTOPIC:
-    print("BERTopic disabled (USE_BERTOPIC not set).")
-    raise SystemExit
+MODEL_PATH = os.path.join("models", "bertopic_model")
+STATE_PATH = os.path.join("models", "bertopic_state.json")
+TOPICS_PATH = os.path.join("data", "topics.parquet")
+# A refit needs this many posts newer than the last fit and at least this long since it
+REFIT_MIN_POSTS = int(os.getenv("TOPIC_REFIT_MIN_POSTS", "500"))
+REFIT_HOURS = float(os.getenv("TOPIC_REFIT_HOURS", "24"))
+# Topics of a refit this similar to an existing topic are merged into it
+MERGE_MIN_SIMILARITY = float(os.getenv("TOPIC_MERGE_SIMILARITY", "0.7"))
+MIN_FIT_POSTS = 10
 
-import pandas as pd
-from bertopic import BERTopic
-
-df = pd.read_csv("data/reddit_posts.csv")
-texts = df['title'].fillna("").astype(str).tolist()
-if len(texts) < 10:
-    print("Not enough data for topic modelling.")
-    raise SystemExit
-
-topic_model = BERTopic(verbose=False)
-topics, probs = topic_model.fit_transform(texts)
-df['topic'] = topics
-os.makedirs("data", exist_ok=True)
-df.to_csv("data/reddit_posts_topics.csv", index=False)
-os.makedirs("models", exist_ok=True)
-topic_model.save("models/bertopic_model")
-print("✅ Topics saved to data/reddit_posts_topics.csv and model saved.")
+
+def load_state():
+    try:
+        with open(STATE_PATH) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("model") == EMBEDDING_MODEL else None
+
+
+def save_state(fitted_through):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp = STATE_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"model": EMBEDDING_MODEL, "fitted_at": time.time(), "fitted_through": fitted_through}, f)
+    os.replace(tmp, STATE_PATH)
+
+
+def load_model():
+    from bertopic import BERTopic
+    if not os.path.exists(MODEL_PATH):
+        return None
+    return BERTopic.load(MODEL_PATH, embedding_model=get_encoder())
+
+
+def save_model(model):
+    # safetensors keeps topic embeddings and c-TF-IDF only, so loading and transform stay light
+    tmp = f"{MODEL_PATH}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    model.save(tmp, serialization="safetensors", save_ctfidf=True, save_embedding_model=EMBEDDING_MODEL)
+    if os.path.isdir(MODEL_PATH):
+        shutil.rmtree(MODEL_PATH)
+    elif os.path.exists(MODEL_PATH):
+        os.remove(MODEL_PATH)  # pickled model from before online mode
+    os.replace(tmp, MODEL_PATH)
+
+
+def fit(texts, embeddings):
+    from bertopic import BERTopic
+    model = BERTopic(embedding_model=get_encoder(), verbose=False)
+    model.fit(texts, embeddings=embeddings)
+    return model
+
+
+def refit_due(state, df):
+    if state is None:
+        return True
+    newer = int((df['created_utc'] > state["fitted_through"]).sum())
+    return newer >= REFIT_MIN_POSTS and time.time() - state["fitted_at"] >= REFIT_HOURS * 3600
+
+
+def write_topic_info(model, df):
+    info = model.get_topic_info()[['Topic', 'Name']].rename(columns={'Topic': 'topic', 'Name': 'name'})
+    info['words'] = [", ".join(w for w, _ in (model.get_topic(t) or [])[:8]) for t in info['topic']]
+    counts = df['topic'].value_counts()
+    info['posts'] = info['topic'].map(counts).fillna(0).astype(int)
+    os.makedirs(os.path.dirname(TOPICS_PATH), exist_ok=True)
+    tmp = TOPICS_PATH + ".tmp"
+    info.to_parquet(tmp, index=False)
+    os.replace(tmp, TOPICS_PATH)
+
+
+def run(df=None, save=True, full=False):
+    if not USE_BERTOPIC:
+        print("BERTopic disabled (USE_BERTOPIC not set).")
+        return df
+    if df is None:
+        if not posts_exist():
+            raise SystemExit("No posts in data/posts/. Run app.py first.")
+        df = read_posts()
+    if len(df) < MIN_FIT_POSTS:
+        print("Not enough data for topic modelling.")
+        return df
+    df['title'] = df['title'].fillna("").astype(str)
+    df['created_utc'] = pd.to_numeric(df['created_utc'], errors='coerce')
+    if 'topic' not in df.columns:
+        df['topic'] = pd.NA
+    df['topic'] = df['topic'].astype("Int64")
+
+    # Reuse stored title embeddings; only posts not embedded yet go through the encoder
+    store = EmbeddingStore()
+    store.ensure(df['id'], df['title'])
+    state = None if full else load_state()
+    model = None if full else load_model()
+
+    refitted, assigned = True, 0
+    if model is None or state is None:
+        model = fit(df['title'].tolist(), store.get(df['id']))
+        df['topic'] = pd.array(model.topics_, dtype="Int64")
+        todo, assigned = df.index[:0], len(df)
+        print(f"   Fitted topic model on all {len(df)} posts")
+    elif refit_due(state, df):
+        from bertopic import BERTopic
+        window = df.index[df['created_utc'] > state["fitted_through"]]
+        recent = fit(df.loc[window, 'title'].tolist(), store.get(df.loc[window, 'id']))
+        before = len(model.get_topic_info())
+        model = BERTopic.merge_models([model, recent], min_similarity=MERGE_MIN_SIMILARITY)
+        # Posts since the last fit were assigned with the old topics; redo them with the merged set
+        todo = window.union(df.index[df['topic'].isna()])
+        print(f"   Refit on {len(window)} new posts; {len(model.get_topic_info()) - before} new topics merged in")
+    else:
+        refitted = False
+        todo = df.index[df['topic'].isna()]
+
+    if len(todo):
+        topics, _ = model.transform(df.loc[todo, 'title'].tolist(), embeddings=store.get(df.loc[todo, 'id']))
+        df.loc[todo, 'topic'] = pd.array(topics, dtype="Int64")
+        assigned = len(todo)
+    if refitted:
+        save_model(model)
+        save_state(float(df['created_utc'].max()))
+    if refitted or assigned:
+        write_topic_info(model, df)
+    if save and assigned:
+        write_posts(df)
+        print(f"✅ Assigned topics to {assigned} posts and saved to data/posts/")
+    else:
+        print(f"✅ Assigned topics to {assigned} posts")
+    return df
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    run(full="--full" in sys.argv[1:])
@@ -0,0 +1,145 @@
+# topic_trends.py — Per-topic volume/sentiment series and emerging-topic ranking
+# Builds a dense (bucket × topic) matrix of post counts and sentiment sums from
+# the topic assignments, daily and hourly. Every statistic is a pandas rolling
+# window over the time axis of that matrix, so all topics are scored in one pass.
+# A topic is "emerging" when its recent rate is far above its baseline rate.
+# Output: data/topic_trends/{daily,hourly}.parquet (topic, ts, posts, sentiment)
+#         data/topic_trends/emerging.parquet (one ranked row per topic and freq)
+import os
+import sys
+import numpy as np
+import pandas as pd
+from storage import DATA_DIR, posts_exist, read_posts
+from topic_model import TOPICS_PATH
+
+TRENDS_DIR = os.path.join(DATA_DIR, "topic_trends")
+RANKING_PATH = os.path.join(TRENDS_DIR, "emerging.parquet")
+SOURCE_COLUMNS = ['created_utc', 'topic', 'sentiment']
+# freq -> (file name, buckets of history, recent window, baseline window)
+FREQS = {
+    "D": ("daily", 120, 3, 14),
+    "h": ("hourly", 24 * 14, 6, 48),
+}
+
+
+def series_path(freq):
+    return os.path.join(TRENDS_DIR, f"{FREQS[freq][0]}.parquet")
+
+
+def build_series(df, freq="D", history=None, now=None):
+    """Dense (bucket × topic) post-count and sentiment-sum matrices over the last `history` buckets.
+
+    Buckets run up to the one containing `now` (default: the current UTC time), so quiet topics
+    show their recent zeros; that last bucket is still filling up. Outlier posts (topic -1)
+    and posts without a topic are left out."""
+    history = history or FREQS[freq][1]
+    now = pd.Timestamp.now(tz='UTC').tz_localize(None) if now is None else pd.Timestamp(now)
+    frame = pd.DataFrame({
+        'topic': pd.to_numeric(df['topic'], errors='coerce').to_numpy(dtype=float, na_value=np.nan),
+        'ts': pd.to_datetime(pd.to_numeric(df['created_utc'], errors='coerce').to_numpy(), unit='s'),
+        'sentiment': pd.to_numeric(df['sentiment'], errors='coerce').fillna(0).to_numpy()
+                     if 'sentiment' in df.columns else 0.0,
+    })
+    frame = frame[(frame['topic'] >= 0) & frame['ts'].notna()]
+    if frame.empty:
+        return None, None
+    frame['topic'] = frame['topic'].astype(int)
+    frame['ts'] = frame['ts'].dt.floor(freq)
+    buckets = pd.date_range(end=now.floor(freq), periods=history, freq=freq)
+    frame = frame[(frame['ts'] >= buckets[0]) & (frame['ts'] <= buckets[-1])]
+    grouped = frame.groupby(['ts', 'topic'])['sentiment'].agg(['size', 'sum'])
+    counts = grouped['size'].unstack(fill_value=0).reindex(buckets, fill_value=0)
+    sentiment_sum = grouped['sum'].unstack(fill_value=0.0).reindex(buckets, fill_value=0.0)
+    return counts, sentiment_sum
+
+
+def score_topics(counts, sentiment_sum, recent, baseline):
+    """Rank every topic by how far its recent rate sits above its baseline.
+
+    recent_rate: mean posts per bucket over the last `recent` buckets.
+    baseline_rate: mean over the `baseline` buckets before that.
+    growth: (recent + 1) / (baseline + 1).
+    acceleration: change in (recent - baseline) over the last `recent` buckets.
+    score: (recent - baseline) in standard errors of the recent mean (Poisson floor).
+    """
+    X = counts.astype(float)
+    short = X.rolling(recent, min_periods=1).mean()
+    past = X.shift(recent)
+    long = past.rolling(baseline, min_periods=1).mean().fillna(0)
+    spread = past.rolling(baseline, min_periods=2).std().fillna(0)
+    velocity = short - long
+    acceleration = velocity - velocity.shift(recent).fillna(0)
+    # Standard error of a `recent`-bucket mean, from the baseline spread or a Poisson floor
+    sigma = np.maximum(spread, np.sqrt(long.clip(lower=1))) / np.sqrt(recent)
+    score = velocity / sigma
+    recent_posts = X.iloc[-recent:].sum()
+    recent_sentiment = sentiment_sum.iloc[-recent:].sum() / recent_posts.replace(0, np.nan)
+    ranking = pd.DataFrame({
+        'topic': X.columns,
+        'recent_posts': recent_posts.to_numpy().astype(int),
+        'recent_rate': short.iloc[-1].to_numpy(),
+        'baseline_rate': long.iloc[-1].to_numpy(),
+        'growth': ((short.iloc[-1] + 1) / (long.iloc[-1] + 1)).to_numpy(),
+        'acceleration': acceleration.iloc[-1].to_numpy(),
+        'score': score.iloc[-1].to_numpy(),
+        'sentiment': recent_sentiment.fillna(0).to_numpy(),
+    })
+    return ranking.sort_values(['score', 'acceleration'], ascending=False, kind='stable').reset_index(drop=True)
+
+
+def topic_names():
+    if not os.path.exists(TOPICS_PATH):
+        return {}
+    info = pd.read_parquet(TOPICS_PATH)
+    return dict(zip(info['topic'], info['name']))
+
+
+def _save(df, path):
+    os.makedirs(TRENDS_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def read_ranking():
+    if not os.path.exists(RANKING_PATH):
+        return None
+    return pd.read_parquet(RANKING_PATH)
+
+
+def run(df=None, now=None):
+    if df is None:
+        if not posts_exist():
+            raise SystemExit("No posts in data/posts/. Run app.py first.")
+        df = read_posts(columns=SOURCE_COLUMNS)
+    if 'topic' not in df.columns:
+        print("⚠️ No topic assignments yet (enable USE_BERTOPIC and run topic_model.py); skipping topic trends.")
+        return None
+    names = topic_names()
+    rankings = []
+    for freq, (label, history, recent, baseline) in FREQS.items():
+        counts, sentiment_sum = build_series(df, freq, history, now)
+        if counts is None:
+            print("⚠️ No posts with a topic; skipping topic trends.")
+            return None
+        series = pd.DataFrame({
+            'topic': np.tile(counts.columns.to_numpy(), len(counts)),
+            'ts': np.repeat(counts.index.to_numpy(), counts.shape[1]),
+            'posts': counts.to_numpy().ravel(),
+            'sentiment': (sentiment_sum / counts.where(counts > 0)).fillna(0).to_numpy().ravel(),
+        })
+        _save(series, series_path(freq))
+        # The bucket in progress would read as a drop in every topic's rate; score complete buckets only
+        rankings.append(score_topics(counts.iloc[:-1], sentiment_sum.iloc[:-1], recent, baseline).assign(freq=label))
+    ranking = pd.concat(rankings, ignore_index=True)
+    ranking['name'] = ranking['topic'].map(names).fillna(ranking['topic'].astype(str))
+    _save(ranking, RANKING_PATH)
+    top = ranking[ranking['freq'] == "hourly"].head(3)
+    print(f"✅ Topic trends for {ranking['topic'].nunique()} topics → {TRENDS_DIR}/ "
+          f"(top emerging: {', '.join(top['name']) or 'none'})")
+    return ranking
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    run()